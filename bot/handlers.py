@@ -1,14 +1,60 @@
 import os
+import asyncio
 import logging
+import functools
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes, ConversationHandler
 import datetime
 
-from core.pwgen_analyser import analyze_password, format_analysis_for_telegram, generate_password_hashes, get_strength_description
+from core.pwgen_analyser import (
+    AnalysisBusyError,
+    analyze_async,
+    configure_analysis,
+    shutdown_analysis,
+    format_analysis_for_telegram,
+    generate_password_hashes,
+    get_strength_description
+)
 from core.wordlist_gen import WordlistGenerator
-from core.password_gen import PasswordGenerator
-from config import TEMP_DIR
+from core.password_gen import MAX_PASSWORD_LENGTH, PasswordGenerator
+from core.mask_gen import MaskGenerator
+from utils.rules import load_rule_files, default_ruleset
+from utils.cache import WordlistCache
+from utils.filters import WordlistFilter
+from utils.tokens import keyboard_walks
+from utils.word_file import WordFile
+from utils.markov import get_markov_model
+from bot.password_pool import PasswordPool
+from utils.compression import available_formats, open_wordlist_reader, open_wordlist_writer, wordlist_filename
+from config import (
+    TEMP_DIR,
+    MAX_WORDLIST_SIZE,
+    WORDLIST_STREAMING,
+    WORDLIST_WORKERS,
+    WORDLIST_DEDUP_BACKEND,
+    WORDLIST_DEDUP_ERROR_RATE,
+    WORDLIST_RULE_FILES,
+    WORDLIST_LEET_BUDGET,
+    WORDLIST_KEYBOARD_WALKS,
+    WORDLIST_MAX_CANDIDATES,
+    WORDLIST_PARALLEL_THRESHOLD,
+    WORDLIST_SPILL_THRESHOLD,
+    WORDLIST_SPILL_RUN_SIZE,
+    WORDLIST_CACHE_ENABLED,
+    WORDLIST_CACHE_SECRET,
+    WORDLIST_CACHE_MAX_BYTES,
+    WORDLIST_CACHE_TTL,
+    WORDLIST_DEFAULT_FORMAT,
+    TELEGRAM_MAX_DOCUMENT_SIZE,
+    PASSPHRASE_WORDLIST,
+    PRONOUNCEABLE_MODEL,
+    PASSWORD_POOL_SIZE,
+    ANALYSIS_WORKERS,
+    ANALYSIS_MAX_PENDING,
+    ANALYSIS_TIMEOUT,
+    ANALYSIS_ZXCVBN_WINDOW
+)
 from utils.analytics import (
     log_password_analysis,
     log_hash_generation,
@@ -18,6 +64,12 @@ from utils.analytics import (
     log_password_generation
 )
 
+# Logging configuration
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
 # Define conversation states
 (
     WAITING_FOR_NAME,
@@ -31,11 +83,32 @@ from utils.analytics import (
 # Store user data temporarily
 user_data_store = {}
 
-# Logging configuration
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
+# Custom mangling rules are compiled once and shared by every session
+wordlist_rules = load_rule_files(WORDLIST_RULE_FILES) if WORDLIST_RULE_FILES else None
+
+# zxcvbn runs in worker processes so long inputs do not stall other users' updates
+configure_analysis(
+    workers=ANALYSIS_WORKERS,
+    max_pending=ANALYSIS_MAX_PENDING,
+    timeout=ANALYSIS_TIMEOUT,
+    window=ANALYSIS_ZXCVBN_WINDOW
 )
-logger = logging.getLogger(__name__)
+
+# Passphrase dictionary, memory-mapped on the first passphrase request
+passphrase_words = WordFile(PASSPHRASE_WORDLIST) if PASSPHRASE_WORDLIST else None
+
+# Encrypted cache of finished wordlists, shared by every session
+wordlist_cache = None
+if WORDLIST_CACHE_ENABLED:
+    try:
+        wordlist_cache = WordlistCache(
+            os.path.join(TEMP_DIR, "wordlist_cache"),
+            secret=WORDLIST_CACHE_SECRET,
+            max_bytes=WORDLIST_CACHE_MAX_BYTES,
+            ttl=WORDLIST_CACHE_TTL
+        )
+    except Exception as e:
+        logger.error(f"Error setting up wordlist cache: {str(e)}")
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /start is issued."""
@@ -101,8 +174,19 @@ async def analyze_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         # Get password from command arguments
         password = ' '.join(context.args)
         
-        # Analyze the password
-        analysis = analyze_password(password)
+        # Analyze the password in a worker
+        try:
+            analysis = await analyze_async(password)
+        except AnalysisBusyError:
+            await update.message.reply_text(
+                "The analyzer is busy right now. Please try again in a few seconds."
+            )
+            return
+        except asyncio.TimeoutError:
+            await update.message.reply_text(
+                "Sorry, analyzing this password took too long. Please try a shorter one."
+            )
+            return
         
         # Format and send the analysis with hashes
         formatted_analysis = format_analysis_for_telegram(analysis, include_hashes=True, password=password)
@@ -232,7 +316,57 @@ async def start_generation(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     """Start the wordlist generation conversation."""
     # Initialize user data
     user_id = update.effective_user.id
-    user_data_store[user_id] = {'generator': WordlistGenerator()}
+    
+    # Target policy, e.g. /generate min=8 max=16 require=digit,upper
+    try:
+        candidate_filter = WordlistFilter.from_args(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(
+            f"Sorry, {str(e)}.\n"
+            "Use min=N, max=N and require=lower,upper,digit,special, e.g. "
+            "/generate min=8 max=16 require=digit"
+        )
+        return ConversationHandler.END
+    
+    generator = WordlistGenerator(
+        dedup_backend=WORDLIST_DEDUP_BACKEND,
+        dedup_capacity=MAX_WORDLIST_SIZE,
+        dedup_error_rate=WORDLIST_DEDUP_ERROR_RATE,
+        rules=wordlist_rules or default_ruleset(leet_budget=WORDLIST_LEET_BUDGET),
+        candidate_filter=candidate_filter
+    )
+    if WORDLIST_KEYBOARD_WALKS > 0:
+        generator.add_token_source('keyboard', keyboard_walks(WORDLIST_KEYBOARD_WALKS))
+    
+    user_data = {'generator': generator}
+    
+    # File format of the upload, e.g. /generate format=zst, and an optional
+    # mask such as /generate mask={name}?d?d?d?d
+    wordlist_format = WORDLIST_DEFAULT_FORMAT if WORDLIST_DEFAULT_FORMAT in available_formats() else 'txt'
+    if context.args:
+        for arg in context.args:
+            if arg.startswith("format="):
+                requested = arg.split("=", 1)[1].lower()
+                if requested in available_formats():
+                    wordlist_format = requested
+                else:
+                    await update.message.reply_text(
+                        f"Unsupported format '{requested}'. Using {wordlist_format} instead "
+                        f"(available: {', '.join(available_formats())})."
+                    )
+            elif arg.startswith("mask="):
+                user_data['mask'] = arg.split("=", 1)[1]
+            elif arg == "export=rules":
+                # Base words plus a .rule file instead of the expanded wordlist
+                user_data['export'] = 'rules'
+            elif arg.startswith("start="):
+                try:
+                    user_data['mask_start'] = max(0, int(arg.split("=", 1)[1]))
+                except ValueError:
+                    pass
+    
+    user_data['format'] = wordlist_format
+    user_data_store[user_id] = user_data
     
     await update.message.reply_text(
         "I'll help you generate a custom wordlist for password testing.\n\n"
@@ -243,12 +377,49 @@ async def start_generation(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     return WAITING_FOR_NAME
 
+def schedule_precompute(user_id):
+    """
+    Rank the information collected so far in a worker thread while the user
+    types the next answer, so the final step only handles the last answer.
+    
+    Only the in-memory ranked mode is prepared: the ranking runs at
+    MAX_WORDLIST_SIZE, the size the final step sends, and only if the plan is
+    accepted with the current rules and stays below the parallel and spill
+    thresholds. Mask, streaming, parallel and sorted wordlists are generated
+    from scratch at the final step, which would throw the ranking away.
+    
+    Args:
+        user_id (int): The user whose generator should be updated
+    """
+    user_data = user_data_store.get(user_id)
+    # Streamed and mask wordlists are not ranked, so there is nothing to prepare
+    if user_data is None or WORDLIST_STREAMING or user_data.get('mask') or user_data.get('export'):
+        return
+    
+    generator = user_data['generator']
+    
+    def precompute():
+        try:
+            plan = generator.plan(
+                max_candidates=WORDLIST_MAX_CANDIDATES,
+                workers=WORDLIST_WORKERS,
+                parallel_threshold=WORDLIST_PARALLEL_THRESHOLD,
+                spill_threshold=WORDLIST_SPILL_THRESHOLD
+            )
+            if plan['accepted'] and plan['mode'] == "ranked":
+                generator.precompute(MAX_WORDLIST_SIZE)
+        except Exception as e:
+            logger.error(f"Error precomputing wordlist for user {user_id}: {str(e)}")
+    
+    user_data['precompute'] = asyncio.get_running_loop().run_in_executor(None, precompute)
+
 async def process_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Process the name and ask for birthdate."""
     user_id = update.effective_user.id
     name = update.message.text
     
     user_data_store[user_id]['generator'].add_personal_info('name', name)
+    schedule_precompute(user_id)
     
     await update.message.reply_text(
         "Thank you. Please provide your birth date or any significant dates "
@@ -263,6 +434,7 @@ async def process_birthdate(update: Update, context: ContextTypes.DEFAULT_TYPE)
     birthdate = update.message.text
     
     user_data_store[user_id]['generator'].add_personal_info('birthdate', birthdate)
+    schedule_precompute(user_id)
     
     await update.message.reply_text(
         "Got it. Do you have any pets? If yes, please provide their names."
@@ -276,6 +448,7 @@ async def process_pets(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     pets = update.message.text
     
     user_data_store[user_id]['generator'].add_personal_info('pets', pets)
+    schedule_precompute(user_id)
     
     await update.message.reply_text(
         "Please provide any significant places (e.g., hometown, favorite city, workplace)."
@@ -289,6 +462,7 @@ async def process_places(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     places = update.message.text
     
     user_data_store[user_id]['generator'].add_personal_info('places', places)
+    schedule_precompute(user_id)
     
     await update.message.reply_text(
         "What are your hobbies or interests?"
@@ -302,6 +476,7 @@ async def process_hobbies(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     hobbies = update.message.text
     
     user_data_store[user_id]['generator'].add_personal_info('hobbies', hobbies)
+    schedule_precompute(user_id)
     
     await update.message.reply_text(
         "Any additional information you'd like to include? "
@@ -310,6 +485,117 @@ async def process_hobbies(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     return WAITING_FOR_ADDITIONAL
 
+def plan_wordlist_generation(generator):
+    """
+    Plan a wordlist job before running it, lowering the leetspeak budget of the
+    built-in rules until the job fits WORDLIST_MAX_CANDIDATES.
+    
+    Args:
+        generator (WordlistGenerator): The generator holding the user's information
+        
+    Returns:
+        dict: The plan from WordlistGenerator.plan, with 'downscaled' added
+    """
+    def make_plan():
+        return generator.plan(
+            max_candidates=WORDLIST_MAX_CANDIDATES,
+            workers=WORDLIST_WORKERS,
+            parallel_threshold=WORDLIST_PARALLEL_THRESHOLD,
+            streaming=WORDLIST_STREAMING,
+            spill_threshold=WORDLIST_SPILL_THRESHOLD
+        )
+    
+    plan = make_plan()
+    plan['downscaled'] = False
+    
+    # Custom rule files are used as given
+    if wordlist_rules is None:
+        leet_budget = WORDLIST_LEET_BUDGET
+        while not plan['accepted'] and leet_budget > 0:
+            leet_budget -= 1
+            generator.rules = default_ruleset(leet_budget=leet_budget)
+            plan = make_plan()
+            plan['downscaled'] = True
+            logger.info(f"Downscaled wordlist job to a leetspeak budget of {leet_budget}")
+    
+    return plan
+
+async def send_rule_bundle(update: Update, user_id, generator, wordlist_format, categories_provided):
+    """Export the base words and the rule files of a profile and send them."""
+    if not os.path.exists(TEMP_DIR):
+        os.makedirs(TEMP_DIR, exist_ok=True)
+    
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths = []
+    try:
+        bundle = generator.export_rule_bundle(
+            basename=f"custom_{user_id}_{timestamp}",
+            directory=TEMP_DIR,
+            compression=wordlist_format
+        )
+        paths = [bundle['words']] + bundle['rules']
+        filenames = [os.path.basename(path).replace(f"_{user_id}", "", 1) for path in paths]
+        
+        if bundle['word_count'] == 0:
+            raise ValueError("Exported base word list is empty")
+        
+        words_name, rules_names = filenames[0], filenames[1:]
+        rule_options = ''.join(f" -r {name}" for name in rules_names)
+        message = (
+            f"Sending {bundle['word_count']:,} base words and {len(rules_names)} rule files "
+            f"({' x '.join(f'{count:,}' for count in bundle['rule_counts'])} rules, "
+            f"{bundle['word_count'] * bundle['candidates_per_word']:,} candidates). "
+            f"Stack the rule files with e.g. hashcat -a 0 hashes.txt {words_name}{rule_options}"
+        )
+        if wordlist_format == 'zst':
+            message += f" (decompress {words_name} first)"
+        message += (
+            "\nLeetspeak is approximated with substitution rules, so the candidates can differ "
+            "from the wordlist. Use /generate without export=rules for the exact list."
+        )
+        await update.message.reply_text(message)
+        for path, filename in zip(paths, filenames):
+            with open(path, 'rb') as file:
+                await update.message.reply_document(
+                    document=file,
+                    filename=filename
+                )
+        logger.info(f"Rule bundle sent successfully to user {user_id}")
+        
+        # Log wordlist generation for analytics
+        try:
+            await log_wordlist_generation(
+                user_id=user_id,
+                wordlist_size=bundle['word_count'],
+                categories_provided=categories_provided
+            )
+        except Exception as e:
+            logger.error(f"Error logging wordlist generation: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error exporting rule bundle: {str(e)}")
+        await update.message.reply_text(
+            "Sorry, there was an error exporting your word list and rules. "
+            "Please try again later."
+        )
+        
+        # Log error for analytics
+        try:
+            await log_error(
+                user_id=user_id,
+                command="generate_rules",
+                error_type=str(type(e).__name__)
+            )
+        except Exception as log_error:
+            logger.error(f"Error logging error: {str(log_error)}")
+    finally:
+        # Delete the files after sending
+        for path in paths:
+            try:
+                os.remove(path)
+                logger.info(f"Deleted temporary file: {path}")
+            except Exception as e:
+                logger.error(f"Error removing temporary file {path}: {str(e)}")
+
 async def process_additional_and_generate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Process additional information and generate the wordlist."""
     user_id = update.effective_user.id
@@ -325,25 +611,127 @@ async def process_additional_and_generate(update: Update, context: ContextTypes.
             
         user_data = user_data_store[user_id]
         generator = user_data['generator']
+        wordlist_format = user_data.get('format', 'txt')
         
         # Add final piece of information
         generator.add_personal_info('additional', additional)
         
+        # Planning and generation take seconds of CPU, so they run in the
+        # default executor instead of blocking the event loop
+        loop = asyncio.get_running_loop()
+        
         # Collect categories provided for analytics
         categories_provided = list(generator.personal_info.keys())
         
-        # Inform user that generation has started
-        await update.message.reply_text(
-            "Generating your custom wordlist... This may take a moment."
-        )
+        # The rule bundle is expanded by the cracking tool, so it is small enough to skip planning
+        if user_data.get('export') == 'rules':
+            await send_rule_bundle(update, user_id, generator, wordlist_format, categories_provided)
+            return ConversationHandler.END
+        
+        # Masks are enumerated directly, so their size is known exactly
+        mask = None
+        if user_data.get('mask'):
+            try:
+                mask = MaskGenerator.from_profile(user_data['mask'], generator)
+            except ValueError as e:
+                await update.message.reply_text(
+                    f"Sorry, the mask could not be used: {str(e)}. "
+                    "Please start again with /generate."
+                )
+                return ConversationHandler.END
+            
+            mask_start = user_data.get('mask_start', 0)
+            if mask_start >= mask.size:
+                await update.message.reply_text(
+                    f"Sorry, this mask only has {mask.size:,} candidates. "
+                    "Please start again with /generate and a smaller start."
+                )
+                return ConversationHandler.END
+            
+            mask_stop = min(mask_start + MAX_WORDLIST_SIZE, mask.size)
+            message = (
+                f"Generating candidates {mask_start:,} to {mask_stop:,} "
+                f"of the {mask.size:,} candidates of your mask... This may take a moment."
+            )
+            if mask_stop < mask.size:
+                message += f"\nContinue later with /generate mask={mask.mask} start={mask_stop}"
+            await update.message.reply_text(message)
+        else:
+            # Size the job up front instead of finding out after spending the CPU
+            plan = await loop.run_in_executor(None, plan_wordlist_generation, generator)
+            if not plan['accepted']:
+                await update.message.reply_text(
+                    f"Sorry, this information would produce about {plan['candidates']:,} candidates, "
+                    f"which is more than the limit of {WORDLIST_MAX_CANDIDATES:,}. "
+                    "Please start again with /generate and provide fewer words."
+                )
+                return ConversationHandler.END
+        
+            # Inform user that generation has started
+            message = (
+                f"Generating your custom wordlist from about {plan['candidates']:,} candidates "
+                f"(estimated time: {max(1, round(plan['estimated_seconds']))}s)... This may take a moment."
+            )
+            if plan['downscaled']:
+                message += "\nFewer leetspeak variations are used to keep the job within limits."
+            await update.message.reply_text(message)
+        
+        # From WORDLIST_SPILL_THRESHOLD on, the plan picks the sorted mode: there
+        # are too many candidates to rank and sort in memory at once, so they
+        # are ranked and then sorted through runs on disk
+        mode = "mask" if mask is not None else plan['mode']
+        
+        # Look for a finished wordlist of an identical profile
+        cache_key = None
+        cached_wordlist = None
+        # Mask candidates are cheaper to enumerate than to decrypt
+        if wordlist_cache is not None and mode != "mask":
+            try:
+                cache_key = wordlist_cache.make_key(
+                    generator.cache_profile(mode=mode, max_size=MAX_WORDLIST_SIZE)
+                )
+                # Reading decrypts and decompresses the whole entry
+                cached_wordlist = await loop.run_in_executor(None, wordlist_cache.get, cache_key)
+            except Exception as e:
+                logger.error(f"Error reading wordlist cache: {str(e)}")
+        
+        # Let the ranking of the earlier answers finish so only the last one is left;
+        # the other modes do not use it
+        precompute = user_data.pop('precompute', None)
+        if precompute is not None and mode == "ranked" and not cached_wordlist:
+            await precompute
         
         # Generate wordlist
         try:
-            wordlist = generator.generate_wordlist()
-            wordlist_size = len(wordlist)
-            
-            if not wordlist:
-                raise ValueError("Generated wordlist is empty")
+            if cached_wordlist:
+                wordlist = cached_wordlist
+                wordlist_size = len(wordlist)
+            elif mode in ("streaming", "mask", "sorted"):
+                # Candidates are generated while the file is being written below
+                wordlist = None
+                wordlist_size = 0
+            elif mode == "parallel":
+                wordlist = await loop.run_in_executor(
+                    None,
+                    functools.partial(
+                        generator.generate_wordlist_parallel,
+                        workers=WORDLIST_WORKERS,
+                        max_size=MAX_WORDLIST_SIZE
+                    )
+                )
+                wordlist_size = len(wordlist)
+                
+                if not wordlist:
+                    raise ValueError("Generated wordlist is empty")
+            else:
+                wordlist = await loop.run_in_executor(
+                    None,
+                    functools.partial(generator.generate_wordlist, max_size=MAX_WORDLIST_SIZE)
+                )
+                wordlist_size = len(wordlist)
+                
+                if not wordlist:
+                    raise ValueError("Generated wordlist is empty")
                 
             # Create a temporary directory if it doesn't exist
             if not os.path.exists(TEMP_DIR):
@@ -351,15 +739,38 @@ async def process_additional_and_generate(update: Update, context: ContextTypes.
             
             # Generate timestamp for unique filename
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filepath = os.path.join(TEMP_DIR, f"wordlist_{user_id}_{timestamp}.txt")
+            filepath = os.path.join(TEMP_DIR, wordlist_filename(f"wordlist_{user_id}_{timestamp}", wordlist_format))
             
             logger.info(f"Creating wordlist file at: {filepath}")
             
             # Save to file
             try:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    for word in wordlist:
-                        f.write(f"{word}\n")
+                # Compressed formats are encoded while the lines are written
+                with open_wordlist_writer(filepath, wordlist_format) as f:
+                    if wordlist is not None:
+                        await loop.run_in_executor(None, f.writelines, (f"{word}\n" for word in wordlist))
+                    elif mode == "mask":
+                        wordlist_size = await loop.run_in_executor(
+                            None,
+                            functools.partial(mask.write_wordlist, f, max_size=MAX_WORDLIST_SIZE, start=mask_start)
+                        )
+                    elif mode == "sorted":
+                        wordlist_size = await loop.run_in_executor(
+                            None,
+                            functools.partial(
+                                generator.write_sorted_wordlist,
+                                f,
+                                max_size=MAX_WORDLIST_SIZE,
+                                workers=WORDLIST_WORKERS if plan['parallel'] else 1,
+                                spill_dir=TEMP_DIR,
+                                run_size=WORDLIST_SPILL_RUN_SIZE
+                            )
+                        )
+                    else:
+                        wordlist_size = await loop.run_in_executor(
+                            None,
+                            functools.partial(generator.write_wordlist, f, max_size=MAX_WORDLIST_SIZE)
+                        )
                 
                 # Make sure file exists and has content
                 file_size = os.path.getsize(filepath)
@@ -368,40 +779,40 @@ async def process_additional_and_generate(update: Update, context: ContextTypes.
                 if file_size == 0:
                     raise ValueError("Wordlist file is empty")
                 
-                # Send the file - using different approach for sending documents
-                try:
-                    # Simplify document sending by using message.reply_document with open file
-                    with open(filepath, 'rb') as file:
-                        await update.message.reply_text("Wordlist generated successfully. Sending file now...")
-                        await update.message.reply_document(
-                            document=file,
-                            filename=f"custom_wordlist_{timestamp}.txt",
-                            caption=f"Here's your custom wordlist with {len(wordlist)} entries."
-                        )
-                        logger.info(f"Wordlist file sent successfully to user {user_id}")
-                        
-                        # Log wordlist generation for analytics
-                        try:
-                            await log_wordlist_generation(
-                                user_id=user_id,
-                                wordlist_size=wordlist_size,
-                                categories_provided=categories_provided
-                            )
-                        except Exception as e:
-                            logger.error(f"Error logging wordlist generation: {str(e)}")
-                except Exception as e:
-                    logger.error(f"Error sending document: {str(e)}")
-                    # Try an alternative approach with InputFile if available
+                # Keep the result for identical profiles, e.g. a retry after a failed upload
+                if cache_key and not cached_wordlist:
+                    def store_in_cache():
+                        if wordlist is None:
+                            with open_wordlist_reader(filepath, wordlist_format) as f:
+                                wordlist_cache.put(cache_key, (line.rstrip('\n') for line in f))
+                        else:
+                            wordlist_cache.put(cache_key, wordlist)
+                    
+                    # Re-reading, compressing and encrypting the file would block the event loop
                     try:
-                        from telegram import InputFile
-                        await update.message.reply_text("Retrying with alternative method...")
+                        await loop.run_in_executor(None, store_in_cache)
+                    except Exception as e:
+                        logger.error(f"Error writing wordlist cache: {str(e)}")
+                
+                if file_size > TELEGRAM_MAX_DOCUMENT_SIZE:
+                    hint = " Try /generate format=gz for a smaller file." if wordlist_format == 'txt' else ""
+                    await update.message.reply_text(
+                        f"Sorry, the wordlist file is {file_size / (1024 * 1024):.1f} MB, "
+                        f"more than Telegram's limit of {TELEGRAM_MAX_DOCUMENT_SIZE // (1024 * 1024)} MB.{hint}"
+                    )
+                else:
+                    # Send the file - using different approach for sending documents
+                    try:
+                        # Simplify document sending by using message.reply_document with open file
                         with open(filepath, 'rb') as file:
+                            await update.message.reply_text("Wordlist generated successfully. Sending file now...")
                             await update.message.reply_document(
-                                document=InputFile(file),
-                                filename=f"custom_wordlist_{timestamp}.txt",
-                                caption=f"Here's your custom wordlist with {len(wordlist)} entries."
+                                document=file,
+                                filename=wordlist_filename(f"custom_wordlist_{timestamp}", wordlist_format),
+                                caption=f"Here's your custom wordlist with {wordlist_size} entries."
                             )
-                            
+                            logger.info(f"Wordlist file sent successfully to user {user_id}")
+                        
                             # Log wordlist generation for analytics
                             try:
                                 await log_wordlist_generation(
@@ -411,39 +822,64 @@ async def process_additional_and_generate(update: Update, context: ContextTypes.
                                 )
                             except Exception as e:
                                 logger.error(f"Error logging wordlist generation: {str(e)}")
-                    except Exception as inner_e:
-                        logger.error(f"Alternative document sending method failed: {str(inner_e)}")
+                    except Exception as e:
+                        logger.error(f"Error sending document: {str(e)}")
+                        # Try an alternative approach with InputFile if available
+                        try:
+                            from telegram import InputFile
+                            await update.message.reply_text("Retrying with alternative method...")
+                            with open(filepath, 'rb') as file:
+                                await update.message.reply_document(
+                                    document=InputFile(file),
+                                    filename=wordlist_filename(f"custom_wordlist_{timestamp}", wordlist_format),
+                                    caption=f"Here's your custom wordlist with {wordlist_size} entries."
+                                )
+                            
+                                # Log wordlist generation for analytics
+                                try:
+                                    await log_wordlist_generation(
+                                        user_id=user_id,
+                                        wordlist_size=wordlist_size,
+                                        categories_provided=categories_provided
+                                    )
+                                except Exception as e:
+                                    logger.error(f"Error logging wordlist generation: {str(e)}")
+                        except Exception as inner_e:
+                            logger.error(f"Alternative document sending method failed: {str(inner_e)}")
                         
-                        # Last resort: Send as text if wordlist is small enough
-                        if len(wordlist) <= 100:
-                            await update.message.reply_text("Sending wordlist as text message instead...")
-                            # Split into chunks to avoid message length limits
-                            chunk_size = 20
-                            for i in range(0, len(wordlist), chunk_size):
-                                chunk = wordlist[i:i + chunk_size]
-                                message_text = f"Wordlist (part {i//chunk_size + 1}):\n\n" + "\n".join(chunk)
-                                await update.message.reply_text(message_text)
+                            # Last resort: Send as text if wordlist is small enough
+                            if wordlist_size <= 100:
+                                if wordlist is None:
+                                    with open_wordlist_reader(filepath, wordlist_format) as f:
+                                        wordlist = f.read().splitlines()
+                                await update.message.reply_text("Sending wordlist as text message instead...")
+                                # Split into chunks to avoid message length limits
+                                chunk_size = 20
+                                for i in range(0, len(wordlist), chunk_size):
+                                    chunk = wordlist[i:i + chunk_size]
+                                    message_text = f"Wordlist (part {i//chunk_size + 1}):\n\n" + "\n".join(chunk)
+                                    await update.message.reply_text(message_text)
                             
-                            await update.message.reply_text(
-                                f"Wordlist sent as text. Total entries: {len(wordlist)}"
-                            )
+                                await update.message.reply_text(
+                                    f"Wordlist sent as text. Total entries: {wordlist_size}"
+                                )
                             
-                            # Log wordlist generation for analytics
-                            try:
-                                await log_wordlist_generation(
-                                    user_id=user_id,
-                                    wordlist_size=wordlist_size,
-                                    categories_provided=categories_provided
+                                # Log wordlist generation for analytics
+                                try:
+                                    await log_wordlist_generation(
+                                        user_id=user_id,
+                                        wordlist_size=wordlist_size,
+                                        categories_provided=categories_provided
+                                    )
+                                except Exception as e:
+                                    logger.error(f"Error logging wordlist generation: {str(e)}")
+                            else:
+                                # If wordlist is too large, inform the user
+                                await update.message.reply_text(
+                                    "Sorry, there was an error sending your wordlist file. "
+                                    "The wordlist is too large to send as text. "
+                                    "Please try again later."
                                 )
-                            except Exception as e:
-                                logger.error(f"Error logging wordlist generation: {str(e)}")
-                        else:
-                            # If wordlist is too large, inform the user
-                            await update.message.reply_text(
-                                "Sorry, there was an error sending your wordlist file. "
-                                "The wordlist is too large to send as text. "
-                                "Please try again later."
-                            )
                 
                 # Delete the file after sending
                 try:
@@ -537,13 +973,18 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "Generates various hash formats for a password.\n"
         "Includes MD5, SHA1, SHA256, and more.\n\n"
         
-        "📝 */generate*\n"
+        "📝 */generate [options]*\n"
         "Creates a custom wordlist based on your information.\n"
-        "Perfect for testing your own password security.\n\n"
+        "Perfect for testing your own password security.\n"
+        "The file is sent compressed by default to keep uploads small.\n"
+        "Options: format=txt|gz|zst, min=N, max=N, require=lower,upper,digit,special "
+        "to match a password policy, and mask={name}?d?d?d?d to enumerate every candidate "
+        "of a pattern (?l lower, ?u upper, ?d digit, ?s special, ?a any; start=N to continue). "
+        "export=rules sends base words plus a hashcat/John .rule file instead of the full list.\n\n"
         
         "🔐 */generate_password [options]*\n"
         "Creates strong random passwords with customizable options.\n"
-        "Options: length=N, type=passphrase, type=pin, avoid-ambiguous, etc.\n\n"
+        "Options: length=N, type=passphrase, type=pin, type=pronounceable, avoid-ambiguous, no-repeat, etc.\n\n"
         
         "*Security Note:*\n"
         "Your passwords and personal information are never stored."
@@ -551,6 +992,115 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     await update.message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
 
+# Options of /generate_password without arguments
+DEFAULT_PASSWORD_OPTIONS = {
+    "password_type": "random",  # Options: random, passphrase, pin, pronounceable
+    "length": 16,
+    "use_lowercase": True,
+    "use_uppercase": True,
+    "use_digits": True,
+    "use_special": True,
+    "avoid_ambiguous": False,
+    "no_repeat": False,
+}
+
+# Most requested option combinations, kept ready by the password pool
+PASSWORD_POOL_OPTIONS = (
+    DEFAULT_PASSWORD_OPTIONS,
+    {**DEFAULT_PASSWORD_OPTIONS, "use_special": False},
+    {**DEFAULT_PASSWORD_OPTIONS, "password_type": "passphrase"},
+)
+
+def create_password(options):
+    """
+    Generate a password for /generate_password options.
+    
+    Its strength comes from the exact min-entropy of the generator, so zxcvbn is not run.
+    
+    Args:
+        options (dict): Options as in DEFAULT_PASSWORD_OPTIONS
+        
+    Returns:
+        dict: password, description, length (after clamping), analysis and entropy
+    """
+    password_generator = PasswordGenerator()
+    password_type = options["password_type"]
+    length = options["length"]
+    
+    if password_type == "random":
+        length = min(max(length, 4), MAX_PASSWORD_LENGTH)
+        password = password_generator.generate_password(
+            length=length,
+            use_lowercase=options["use_lowercase"],
+            use_uppercase=options["use_uppercase"],
+            use_digits=options["use_digits"],
+            use_special=options["use_special"],
+            avoid_ambiguous=options["avoid_ambiguous"],
+            no_repeat=options["no_repeat"],
+            detailed=True
+        )
+        description = "random password"
+        
+    elif password_type == "passphrase":
+        num_words = min(max(length // 4, 3), 8)  # Convert length to reasonable word count
+        password = password_generator.generate_passphrase(
+            num_words=num_words,
+            capitalize=True,
+            append_number=True,
+            wordlist=passphrase_words,
+            detailed=True
+        )
+        description = f"passphrase with {num_words} words"
+        
+    elif password_type == "pin":
+        length = min(max(length, 4), 12)  # PIN length between 4 and 12
+        password = password_generator.generate_pin(
+            length=length,
+            avoid_patterns=True,
+            detailed=True
+        )
+        description = f"{length}-digit PIN"
+        
+    elif password_type == "pronounceable":
+        length = min(max(length, 4), 64)
+        # The model is loaded once and shared by every request
+        password = password_generator.generate_pronounceable(
+            length=length,
+            capitalize=True,
+            model=get_markov_model(PRONOUNCEABLE_MODEL, TEMP_DIR),
+            detailed=True
+        )
+        description = "pronounceable password"
+        
+    else:
+        raise ValueError(f"Unknown password type '{password_type}'")
+    
+    return {
+        "password": password.value,
+        "description": description,
+        "length": length,
+        "analysis": password.to_analysis(),
+        # Guessing strength; lower than the Shannon entropy for pronounceable passwords
+        "entropy": password.min_entropy,
+    }
+
+# Pre-generated passwords for the common combinations, refilled in the background
+password_pool = (
+    PasswordPool(create_password, PASSWORD_POOL_OPTIONS, size=PASSWORD_POOL_SIZE)
+    if PASSWORD_POOL_SIZE > 0 else None
+)
+
+async def start_background_services(application) -> None:
+    """Start filling the password pool once the bot's event loop is running."""
+    if password_pool is not None:
+        password_pool.start()
+
+async def stop_background_services(application) -> None:
+    """Stop the password pool, logging its hit rate, and the analysis workers."""
+    if password_pool is not None:
+        await password_pool.stop()
+    shutdown_analysis()
+
 async def generate_password_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Generate a strong random password when the command /generate_password is issued."""
     if not update or not update.message:
@@ -559,84 +1109,63 @@ async def generate_password_cmd(update: Update, context: ContextTypes.DEFAULT_TY
     
     try:
         # Default parameters
-        length = 16
-        use_lowercase = True
-        use_uppercase = True
-        use_digits = True
-        use_special = True
-        avoid_ambiguous = False
-        password_type = "random"  # Options: random, passphrase, pin
+        options = dict(DEFAULT_PASSWORD_OPTIONS)
         
         # Parse command arguments if provided
         if context.args:
             for arg in context.args:
                 if arg.startswith("length="):
                     try:
-                        length = int(arg.split("=")[1])
+                        options["length"] = int(arg.split("=")[1])
                     except (ValueError, IndexError):
                         pass
                 elif arg == "no-lowercase":
-                    use_lowercase = False
+                    options["use_lowercase"] = False
                 elif arg == "no-uppercase":
-                    use_uppercase = False
+                    options["use_uppercase"] = False
                 elif arg == "no-digits":
-                    use_digits = False
+                    options["use_digits"] = False
                 elif arg == "no-special":
-                    use_special = False
+                    options["use_special"] = False
                 elif arg == "avoid-ambiguous":
-                    avoid_ambiguous = True
+                    options["avoid_ambiguous"] = True
+                elif arg == "no-repeat":
+                    options["no_repeat"] = True
                 elif arg == "type=passphrase":
-                    password_type = "passphrase"
+                    options["password_type"] = "passphrase"
                 elif arg == "type=pin":
-                    password_type = "pin"
-        
-        # Generate password based on type
-        password_generator = PasswordGenerator()
-        
-        if password_type == "random":
-            password = password_generator.generate_password(
-                length=length,
-                use_lowercase=use_lowercase,
-                use_uppercase=use_uppercase,
-                use_digits=use_digits,
-                use_special=use_special,
-                avoid_ambiguous=avoid_ambiguous
-            )
-            password_description = "random password"
-            
-        elif password_type == "passphrase":
-            num_words = min(max(length // 4, 3), 8)  # Convert length to reasonable word count
-            password = password_generator.generate_passphrase(
-                num_words=num_words,
-                capitalize=True,
-                append_number=True
-            )
-            password_description = f"passphrase with {num_words} words"
-            
-        elif password_type == "pin":
-            length = min(max(length, 4), 12)  # PIN length between 4 and 12
-            password = password_generator.generate_pin(
-                length=length,
-                avoid_patterns=True
-            )
-            password_description = f"{length}-digit PIN"
+                    options["password_type"] = "pin"
+                elif arg == "type=pronounceable":
+                    options["password_type"] = "pronounceable"
+        
+        # Common combinations are served ready-made from the pool
+        entry = password_pool.pop(options) if password_pool is not None else None
+        pooled = entry is not None
+        if entry is None:
+            entry = create_password(options)
         
-        # Analyze the generated password for strength information
-        analysis = analyze_password(password)
+        password = entry["password"]
+        password_description = entry["description"]
+        analysis = entry["analysis"]
         
         # Prepare the response message
         message = f"🔐 *Generated {password_description}*\n\n"
         message += f"`{password}`\n\n"
         message += f"*Strength*: {get_strength_description(analysis['score'])} ({analysis['score']}/4)\n"
+        message += f"*Entropy*: {entry['entropy']:.1f} bits\n"
         message += f"*Est. Time to Crack*: {analysis['crack_time']}\n\n"
+        if entry["length"] != options["length"]:
+            message += f"_Length {options['length']} is out of range for this type, {entry['length']} was used._\n\n"
         
         # Add usage information
         message += "*Usage Options:*\n"
         message += "`/generate_password` - Generate default strong password\n"
-        message += "`/generate_password length=20` - Set specific length\n"
+        message += f"`/generate_password length=20` - Set specific length (4-{MAX_PASSWORD_LENGTH})\n"
         message += "`/generate_password type=passphrase` - Generate a passphrase\n"
         message += "`/generate_password type=pin` - Generate a secure PIN\n"
+        message += "`/generate_password type=pronounceable` - Generate a pronounceable password\n"
         message += "`/generate_password no-special avoid-ambiguous` - Customize character sets\n"
+        message += "`/generate_password no-repeat` - No character twice in a row\n"
         
         await update.message.reply_text(
             message,
@@ -647,21 +1176,27 @@ async def generate_password_cmd(update: Update, context: ContextTypes.DEFAULT_TY
         try:
             if update and update.effective_user:
                 # Collect options for analytics
-                options = {
-                    "use_lowercase": use_lowercase,
-                    "use_uppercase": use_uppercase,
-                    "use_digits": use_digits,
-                    "use_special": use_special,
-                    "avoid_ambiguous": avoid_ambiguous,
+                analytics_options = {
+                    "use_lowercase": options["use_lowercase"],
+                    "use_uppercase": options["use_uppercase"],
+                    "use_digits": options["use_digits"],
+                    "use_special": options["use_special"],
+                    "avoid_ambiguous": options["avoid_ambiguous"],
+                    "no_repeat": options["no_repeat"],
+                    "pooled": pooled,
+                    "pool_hit_rate": (
+                        round(password_pool.stats()["hit_rate"], 2) if password_pool is not None else None
+                    ),
+                    "entropy": round(entry["entropy"], 1),
                     "strength_score": analysis['score'],
                     "crack_time": analysis['crack_time']
                 }
                 
                 await log_password_generation(
                     user_id=update.effective_user.id,
-                    password_type=password_type,
-                    length=length,
-                    options=options
+                    password_type=options["password_type"],
+                    length=entry["length"],
+                    options=analytics_options
                 )
         except Exception as e:
             logger.error(f"Error logging password generation: {str(e)}")
@@ -23,6 +23,8 @@ from bot.handlers import (
     process_additional_and_generate,
     cancel_generation,
     error_handler,
+    start_background_services,
+    stop_background_services,
     WAITING_FOR_NAME,
     WAITING_FOR_BIRTHDATE,
     WAITING_FOR_PETS,
@@ -40,7 +42,14 @@ logger = logging.getLogger(__name__)
 def main():
     """Start the bot."""
     # Create the Application
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # The password pool and the analysis workers run alongside the bot
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(start_background_services)
+        .post_shutdown(stop_background_services)
+        .build()
+    )
 
     # Register basic command handlers
     application.add_handler(CommandHandler("start", start))
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import contextlib
+from collections import deque
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+class PasswordPool:
+    """
+    Pre-generated, pre-analysed passwords for the most common option combinations.
+
+    A background task keeps a queue per combination filled by running the
+    factory in the default executor, so generation and the strength rating
+    stay off the event loop. pop() takes a ready entry in O(1) and wakes the
+    task when a queue falls to half its size. Every entry is handed out once.
+    While the pool is in use, stats() is logged every stats_interval seconds.
+    """
+
+    def __init__(self, factory, option_sets, size=20, batch_size=5, stats_interval=3600):
+        """
+        Args:
+            factory (callable): Builds one entry from an options dict
+            option_sets (iterable): Options dicts whose entries are kept ready
+            size (int): Entries kept ready per combination
+            batch_size (int): Entries built per executor call
+            stats_interval (float): Seconds between two logs of stats()
+        """
+        if size < 1:
+            raise ValueError("Password pool size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.batch_size = max(1, batch_size)
+        self._options = {self.key(options): dict(options) for options in option_sets}
+        self._entries = {key: deque() for key in self._options}
+        self._wanted = None
+        self._task = None
+        self.stats_interval = stats_interval
+        self._stats_logged = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(options):
+        """
+        Get the key of an options dict.
+
+        Args:
+            options (dict): The options
+
+        Returns:
+            tuple: Hashable key, independent of the order of the options
+        """
+        return tuple(sorted(options.items()))
+
+    def pop(self, options):
+        """
+        Take a ready entry for an options combination.
+
+        Args:
+            options (dict): The options of the request
+
+        Returns:
+            The entry built by the factory, or None if none is ready
+        """
+        entries = self._entries.get(self.key(options))
+        if not entries:
+            self.misses += 1
+            if entries is not None:
+                self._request_refill()
+            return None
+
+        self.hits += 1
+        entry = entries.popleft()
+        if len(entries) <= self.size // 2:
+            self._request_refill()
+        return entry
+
+    def _request_refill(self):
+        if self._wanted is not None:
+            self._wanted.set()
+
+    def _build(self, options, count):
+        """Build entries in an executor thread."""
+        return [self.factory(options) for _ in range(count)]
+
+    async def _refill(self):
+        """Top every queue up to its size whenever an entry is taken."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            for key, entries in self._entries.items():
+                while len(entries) < self.size:
+                    count = min(self.batch_size, self.size - len(entries))
+                    try:
+                        built = await loop.run_in_executor(None, self._build, self._options[key], count)
+                    except Exception as e:
+                        logger.error(f"Error refilling password pool: {str(e)}")
+                        break
+                    entries.extend(built)
+
+            now = loop.time()
+            if now - self._stats_logged >= self.stats_interval:
+                self._stats_logged = now
+                logger.info(f"Password pool: {self.stats()}")
+
+    def start(self):
+        """Start the refill task; must be called from the running event loop."""
+        if self._task is None:
+            self._wanted = asyncio.Event()
+            self._wanted.set()
+            self._stats_logged = asyncio.get_running_loop().time()
+            self._task = asyncio.get_running_loop().create_task(self._refill())
+            logger.info(f"Started password pool for {len(self._entries)} option combinations")
+
+    async def stop(self):
+        """Stop the refill task and drop the ready entries."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            self._wanted = None
+        for entries in self._entries.values():
+            entries.clear()
+        logger.info(f"Stopped password pool: {self.stats()}")
+
+    def stats(self):
+        """
+        Get the hit and miss counts of the pool.
+
+        Returns:
+            dict: hits, misses, hit_rate and the number of ready entries
+        """
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'ready': sum(len(entries) for entries in self._entries.values()),
+        }
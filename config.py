@@ -37,7 +37,58 @@ ANALYTICS_BOT_NAME = os.getenv("ANALYTICS_BOT_NAME", "Pwgen Data Store")
 
 # Wordlist Generator Configuration
 MIN_WORD_LENGTH = 4
-MAX_WORDLIST_SIZE = 100000  # Limit the size of generated wordlists for safety
+MAX_WORDLIST_SIZE = 1000000  # Limit the size of generated wordlists for safety
+# Deduplication of streamed wordlists: "fingerprint" (exact, 64-bit hashes), "bloom" (approximate) or "set"
+WORDLIST_DEDUP_BACKEND = os.getenv("WORDLIST_DEDUP_BACKEND", "fingerprint")
+# False-positive rate of the "bloom" backend
+WORDLIST_DEDUP_ERROR_RATE = float(os.getenv("WORDLIST_DEDUP_ERROR_RATE", "0.001"))
+# Wordlist jobs whose planned candidate count exceeds this are downscaled or rejected
+WORDLIST_MAX_CANDIDATES = int(os.getenv("WORDLIST_MAX_CANDIDATES", "20000000"))
+# Planned candidate count from which WORDLIST_WORKERS processes are used
+WORDLIST_PARALLEL_THRESHOLD = int(os.getenv("WORDLIST_PARALLEL_THRESHOLD", "2000000"))
+# Maximum number of characters replaced in one leetspeak variation
+WORDLIST_LEET_BUDGET = int(os.getenv("WORDLIST_LEET_BUDGET", "2"))
+# Comma-separated hashcat/John .rule files chained in place of the built-in mangling rules
+WORDLIST_RULE_FILES = [path.strip() for path in os.getenv("WORDLIST_RULE_FILES", "").split(",") if path.strip()]
+# Number of common keyboard walks (qwerty, 1qaz2wsx, ...) combined with the personal information
+WORDLIST_KEYBOARD_WALKS = int(os.getenv("WORDLIST_KEYBOARD_WALKS", "5"))
+# Stream candidates straight to the output file instead of building the full list in memory
+WORDLIST_STREAMING = os.getenv("WORDLIST_STREAMING", "false").lower() in ("1", "true", "yes")
+# Number of worker processes for sharded wordlist generation (0 or 1 keeps generation in-process)
+WORDLIST_WORKERS = int(os.getenv("WORDLIST_WORKERS", "0"))
+# Planned candidate count from which the sorted wordlist is built from runs spilled to TEMP_DIR
+WORDLIST_SPILL_THRESHOLD = int(os.getenv("WORDLIST_SPILL_THRESHOLD", "5000000"))
+# Unique candidates held in memory per spilled run
+WORDLIST_SPILL_RUN_SIZE = int(os.getenv("WORDLIST_SPILL_RUN_SIZE", "500000"))
+# Default file format of uploaded wordlists: "txt", "gz" or "zst" (requires the zstandard package)
+WORDLIST_DEFAULT_FORMAT = os.getenv("WORDLIST_DEFAULT_FORMAT", "gz")
+# Largest document a bot can upload to Telegram
+TELEGRAM_MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+# Password Generator Configuration
+# Word file (built with python -m utils.word_file) used for passphrases instead of the built-in list
+PASSPHRASE_WORDLIST = os.getenv("PASSPHRASE_WORDLIST")
+# Markov model file (built with python -m utils.markov) for pronounceable passwords; defaults to data/markov_en.bin
+PRONOUNCEABLE_MODEL = os.getenv("PRONOUNCEABLE_MODEL")
+# Ready-made passwords kept per common /generate_password option combination (0 disables the pool)
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", "20"))
+
+# Password Analysis Configuration
+# Worker processes running zxcvbn for /analyze (0 uses a thread in the bot process)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# Analyses in progress beyond which /analyze asks the user to retry
+ANALYSIS_MAX_PENDING = int(os.getenv("ANALYSIS_MAX_PENDING", "32"))
+# Seconds an analysis may take before /analyze gives up
+ANALYSIS_TIMEOUT = float(os.getenv("ANALYSIS_TIMEOUT", "5"))
+# Longest input zxcvbn analyses; longer inputs get zxcvbn on this prefix plus an O(n) quick scan of the rest (0 = quick scan only)
+ANALYSIS_ZXCVBN_WINDOW = int(os.getenv("ANALYSIS_ZXCVBN_WINDOW", "64"))
+
+# Cache of finished wordlists for repeated profiles (stored encrypted under TEMP_DIR)
+WORDLIST_CACHE_ENABLED = os.getenv("WORDLIST_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Key for the cache; without one a random key is used and entries only live as long as the process
+WORDLIST_CACHE_SECRET = os.getenv("WORDLIST_CACHE_SECRET")
+WORDLIST_CACHE_MAX_BYTES = int(os.getenv("WORDLIST_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+WORDLIST_CACHE_TTL = int(os.getenv("WORDLIST_CACHE_TTL", "3600"))  # Seconds
 
 # Temporary file storage
 TEMP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "temp")
@@ -0,0 +1,273 @@
+import datetime
+import logging
+
+from core.password_gen import LOWERCASE_CHARS, UPPERCASE_CHARS, DIGIT_CHARS, SPECIAL_CHARS
+from utils.compression import open_wordlist_writer, wordlist_filename
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Built-in charsets of hashcat-style masks (?l, ?u, ?d, ?s, ?a)
+MASK_CHARSETS = {
+    'l': LOWERCASE_CHARS,
+    'u': UPPERCASE_CHARS,
+    'd': DIGIT_CHARS,
+    's': SPECIAL_CHARS,
+    'a': LOWERCASE_CHARS + UPPERCASE_CHARS + DIGIT_CHARS + SPECIAL_CHARS,
+}
+
+def parse_mask(mask, tokens=None, custom_charsets=None):
+    """
+    Parse a mask into the alternatives of each position.
+
+    A mask mixes literal characters, charsets (?l ?u ?d ?s ?a, ?1-?4 for
+    custom charsets, ?? for a literal '?') and profile tokens such as {name}
+    that stand for any word of that category. Runs of literal characters are
+    merged into a single position.
+
+    Args:
+        mask (str): The mask, e.g. '?u?l?l?l?d?d' or '{name}?d?d?d?d'
+        tokens (dict, optional): Words of each token name
+        custom_charsets (dict, optional): Characters of the custom charsets '1' to '4'
+
+    Returns:
+        list: A tuple of distinct alternatives (strings) per position
+    """
+    charsets = dict(MASK_CHARSETS)
+    charsets.update(custom_charsets or {})
+    tokens = tokens or {}
+
+    positions = []
+    literal = []
+
+    def add(alternatives):
+        if literal:
+            positions.append((''.join(literal),))
+            literal.clear()
+        # Keep the first occurrence of repeated alternatives so every candidate is unique
+        alternatives = tuple(dict.fromkeys(alternatives))
+        if not alternatives:
+            raise ValueError(f"Mask position {len(positions) + 1} has no candidates")
+        positions.append(alternatives)
+
+    i = 0
+    while i < len(mask):
+        char = mask[i]
+        if char == '?':
+            if i + 1 >= len(mask):
+                raise ValueError("Mask ends with an incomplete '?' placeholder")
+            name = mask[i + 1]
+            if name == '?':
+                literal.append('?')
+            elif name in charsets:
+                add(charsets[name])
+            else:
+                raise ValueError(f"Unknown mask charset '?{name}'")
+            i += 2
+        elif char == '{':
+            end = mask.find('}', i)
+            if end == -1:
+                raise ValueError("Mask has an unclosed '{' token")
+            name = mask[i + 1:end]
+            if name not in tokens:
+                raise ValueError(f"Unknown mask token '{{{name}}}'")
+            add(tokens[name])
+            i = end + 1
+        else:
+            literal.append(char)
+            i += 1
+
+    if literal:
+        positions.append((''.join(literal),))
+    if not positions:
+        raise ValueError("Mask is empty")
+    return positions
+
+class MaskGenerator:
+    """
+    Enumerate the candidates of a mask in a fixed order with O(1) random access.
+
+    The candidates are numbered like a mixed-radix counter whose last position
+    changes fastest, so candidate i is computed directly from i. A range of
+    candidates is therefore fully described by two offsets, which makes
+    chunked, resumable and parallel enumeration possible without shared state.
+    """
+
+    def __init__(self, mask, tokens=None, custom_charsets=None):
+        """
+        Args:
+            mask (str): The mask (see parse_mask)
+            tokens (dict, optional): Words of each {token} name
+            custom_charsets (dict, optional): Characters of the custom charsets '1' to '4'
+        """
+        self.mask = mask
+        self.positions = parse_mask(mask, tokens=tokens, custom_charsets=custom_charsets)
+
+        # Place value of every position
+        self._place_values = []
+        size = 1
+        for alternatives in reversed(self.positions):
+            self._place_values.append(size)
+            size *= len(alternatives)
+        self._place_values.reverse()
+        self.size = size
+
+        logger.info(f"Mask '{mask}' has {size} candidates in {len(self.positions)} positions")
+
+    @classmethod
+    def from_profile(cls, mask, generator, custom_charsets=None):
+        """
+        Create a mask generator whose {category} tokens are the words of a wordlist profile.
+
+        Args:
+            mask (str): The mask, e.g. '{name}?d?d?d?d'
+            generator (WordlistGenerator): The generator holding the personal information
+            custom_charsets (dict, optional): Characters of the custom charsets '1' to '4'
+
+        Returns:
+            MaskGenerator: The generator of the mask
+        """
+        return cls(mask, tokens=generator.personal_info, custom_charsets=custom_charsets)
+
+    def __repr__(self):
+        return f"MaskGenerator({self.mask!r}, size={self.size})"
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        """
+        Compute the candidate at an index.
+
+        Args:
+            index (int): Position of the candidate; negative indexes count from the end
+
+        Returns:
+            str: The candidate
+        """
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("Mask candidate index out of range")
+        return ''.join(
+            alternatives[index // place_value % len(alternatives)]
+            for alternatives, place_value in zip(self.positions, self._place_values)
+        )
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def iter_range(self, start=0, stop=None):
+        """
+        Yield the candidates with indexes in [start, stop).
+
+        Only the first candidate is computed from its index; the following ones
+        advance the counter, and the last position is expanded in bulk.
+
+        Args:
+            start (int): Index of the first candidate
+            stop (int, optional): Index after the last candidate. Defaults to the end.
+
+        Yields:
+            str: The candidates in index order
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        remaining = stop - start
+        if start < 0 or remaining <= 0:
+            return
+
+        *head, last = self.positions
+        digits = [start // place_value % len(alternatives)
+                  for alternatives, place_value in zip(self.positions, self._place_values)]
+        parts = [alternatives[digit] for alternatives, digit in zip(head, digits)]
+        offset = digits[-1]
+
+        while True:
+            prefix = ''.join(parts)
+            block = last[offset:offset + remaining]
+            yield from [prefix + alternative for alternative in block]
+            remaining -= len(block)
+            if remaining <= 0:
+                return
+            offset = 0
+
+            # Carry into the head positions; remaining > 0 guarantees there is one left
+            position = len(head) - 1
+            while True:
+                digits[position] += 1
+                if digits[position] < len(head[position]):
+                    parts[position] = head[position][digits[position]]
+                    break
+                digits[position] = 0
+                parts[position] = head[position][0]
+                position -= 1
+
+    def chunk_ranges(self, chunk_size, start=0, stop=None):
+        """
+        Split a range of candidates into chunks, e.g. to hand them to workers.
+
+        Args:
+            chunk_size (int): Number of candidates per chunk
+            start (int): Index of the first candidate
+            stop (int, optional): Index after the last candidate. Defaults to the end.
+
+        Returns:
+            list: (start, stop) tuples usable with iter_range
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1")
+        stop = self.size if stop is None else min(stop, self.size)
+        return [(offset, min(offset + chunk_size, stop)) for offset in range(start, stop, chunk_size)]
+
+    def write_wordlist(self, sink, max_size=None, start=0):
+        """
+        Stream candidates into a writable text sink, one per line.
+
+        Args:
+            sink: A file-like object opened for writing text
+            max_size (int, optional): Stop after writing this many candidates
+            start (int): Index of the first candidate, e.g. to resume a previous run
+
+        Returns:
+            int: The number of candidates written
+        """
+        stop = None if max_size is None else start + max_size
+        count = 0
+        batch = []
+        for candidate in self.iter_range(start, stop):
+            batch.append(candidate)
+            if len(batch) >= 10000:
+                sink.write('\n'.join(batch) + '\n')
+                count += len(batch)
+                batch = []
+        if batch:
+            sink.write('\n'.join(batch) + '\n')
+            count += len(batch)
+
+        if start + count < self.size:
+            logger.warning(f"Mask output stopped at index {start + count} of {self.size}")
+        logger.info(f"Streamed {count} mask candidates to output")
+        return count
+
+    def save_wordlist_to_file(self, filepath=None, max_size=None, start=0, compression='txt'):
+        """
+        Save candidates of the mask to a file.
+
+        Args:
+            filepath (str, optional): Path to save the file. If None, a default name is used.
+            max_size (int, optional): Maximum number of candidates written
+            start (int): Index of the first candidate
+            compression (str): 'txt', 'gz' or 'zst' (see utils.compression)
+
+        Returns:
+            str: The path to the saved file
+        """
+        if not filepath:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = wordlist_filename(f"mask_wordlist_{timestamp}", compression)
+
+        with open_wordlist_writer(filepath, compression) as f:
+            self.write_wordlist(f, max_size=max_size, start=start)
+
+        logger.info(f"Saved mask candidates to {filepath}")
+        return filepath
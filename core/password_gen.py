@@ -1,10 +1,604 @@
-import random
+import os
+import math
 import string
+import secrets
 import logging
+import itertools
+from bisect import bisect_right
+from functools import lru_cache
+
+from utils.markov import get_markov_model
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Character sets shared by the password and mask generators
+LOWERCASE_CHARS = string.ascii_lowercase
+UPPERCASE_CHARS = string.ascii_uppercase
+DIGIT_CHARS = string.digits
+SPECIAL_CHARS = "!@#$%^&*()-_=+[]{}|;:,.<>?/~"
+AMBIGUOUS_CHARS = "1lI0O"
+
+# Built-in list of common, easy-to-remember passphrase words
+PASSPHRASE_WORDS = (
+    "apple", "banana", "orange", "grape", "melon", "cherry", "peach", "lemon", "lime", "plum",
+    "ocean", "river", "mountain", "forest", "desert", "valley", "cliff", "lake", "island", "beach",
+    "happy", "sunny", "rainy", "cloudy", "windy", "snowy", "foggy", "stormy", "calm", "warm",
+    "dog", "cat", "bird", "fish", "rabbit", "horse", "tiger", "lion", "bear", "wolf",
+    "red", "blue", "green", "yellow", "purple", "black", "white", "pink", "brown",
+    "book", "pen", "chair", "table", "phone", "lamp", "door", "window", "wall", "floor",
+    "run", "jump", "swim", "walk", "dance", "sing", "read", "write", "talk", "listen",
+    "pizza", "pasta", "salad", "soup", "bread", "cheese", "meat", "fruit", "cake", "cookie"
+)
+
+# Cryptographically secure source for the one-off choices
+_random = secrets.SystemRandom()
+
+# Guesses per second of the attacker models used for crack times (as in zxcvbn)
+ATTACKER_MODELS = {
+    'online_throttling_100_per_hour': 100 / 3600,
+    'online_no_throttling_10_per_second': 10,
+    'offline_slow_hashing_1e4_per_second': 1e4,
+    'offline_fast_hashing_1e10_per_second': 1e10,
+}
+
+def display_time(seconds):
+    """
+    Describe a duration the way zxcvbn does, e.g. "3 hours" or "centuries".
+    
+    Args:
+        seconds (float): The duration
+        
+    Returns:
+        str: The description
+    """
+    units = (('second', 1), ('minute', 60), ('hour', 3600), ('day', 86400),
+             ('month', 86400 * 31), ('year', 86400 * 365))
+    if seconds < 1:
+        return "less than a second"
+    if seconds >= 86400 * 365 * 100:
+        return "centuries"
+    for (name, size), (_, next_size) in zip(units, units[1:] + (('century', float('inf')),)):
+        if seconds < next_size:
+            count = round(seconds / size)
+            return f"{count} {name}{'s' if count != 1 else ''}"
+
+def score_from_guesses(log2_guesses):
+    """
+    Score a guess count from 0 to 4 with zxcvbn's thresholds.
+    
+    Args:
+        log2_guesses (float): Base-2 logarithm of the number of guesses
+        
+    Returns:
+        int: The score
+    """
+    for score, threshold in enumerate((1e3, 1e6, 1e8, 1e10)):
+        if log2_guesses < math.log2(threshold + 5):
+            return score
+    return 4
+
+def guess_seconds(log2_guesses, rate):
+    """
+    Get the time an attacker needs for a number of guesses.
+    
+    Args:
+        log2_guesses (float): Base-2 logarithm of the number of guesses
+        rate (float): Guesses per second, e.g. a value of ATTACKER_MODELS
+        
+    Returns:
+        float: Seconds, or inf if too large for a float
+    """
+    exponent = log2_guesses - math.log2(rate)
+    return 2.0 ** exponent if exponent < 1000 else float('inf')
+
+class GeneratedSecret:
+    """
+    A secret produced by PasswordGenerator together with the exact entropy of
+    the process that generated it.
+    
+    The strength of a generated secret follows from the distribution it was
+    drawn from, not from its characters, so the crack times and score are
+    derived from the min-entropy: an attacker needs at least
+    2 ** (min_entropy - 1) guesses for a 50% chance. For uniform processes
+    (random, passphrase, PIN) this equals the Shannon entropy; Markov output
+    is not uniform, and its Shannon entropy would overstate the strength.
+    The score uses zxcvbn's guess thresholds so it reads the same as
+    analyze_password.
+    """
+    
+    def __init__(self, value, kind, entropy, min_entropy=None):
+        """
+        Args:
+            value (str): The secret
+            kind (str): 'random', 'passphrase', 'pin' or 'pronounceable'
+            entropy (float): Shannon entropy of the generation process in bits
+            min_entropy (float, optional): Min-entropy of the generation process
+                in bits. Defaults to entropy, which is exact for uniform processes.
+        """
+        self.value = value
+        self.kind = kind
+        self.entropy = entropy
+        self.min_entropy = entropy if min_entropy is None else min_entropy
+    
+    def __repr__(self):
+        return (f"GeneratedSecret(kind={self.kind!r}, entropy={self.entropy:.1f}, "
+                f"min_entropy={self.min_entropy:.1f})")
+    
+    def __str__(self):
+        return self.value
+    
+    @property
+    def log2_guesses(self):
+        """Base-2 logarithm of the guesses needed for a 50% chance of success."""
+        return max(self.min_entropy - 1, 0.0)
+    
+    @property
+    def score(self):
+        """Score from 0 to 4 using zxcvbn's guess thresholds."""
+        return score_from_guesses(self.log2_guesses)
+    
+    def crack_times(self):
+        """
+        Get the average time to guess the secret under each attacker model.
+        
+        Returns:
+            dict: Seconds per name of ATTACKER_MODELS (inf if too large for a float)
+        """
+        return {model: guess_seconds(self.log2_guesses, rate) for model, rate in ATTACKER_MODELS.items()}
+    
+    def to_analysis(self):
+        """
+        Describe the secret in the format of analyze_password, without running zxcvbn.
+        
+        Returns:
+            dict: score, crack_time, feedback and entropy (the min-entropy)
+        """
+        crack_time = self.crack_times()['offline_slow_hashing_1e4_per_second']
+        return {
+            "score": self.score,
+            "crack_time": display_time(crack_time),
+            "feedback": {"warning": "", "suggestions": []},
+            "entropy": self.min_entropy,
+        }
+
+# Longest password a policy compiles counting tables for
+MAX_PASSWORD_LENGTH = 256
+
+# Most counting table entries (class counts x matcher states x length) a policy
+# may compile; each takes roughly 10 microseconds, so about 2.5s at the limit
+MAX_POLICY_STATES = 250000
+
+# Characters of every class a policy can draw from
+CLASS_CHARS = {
+    'lower': LOWERCASE_CHARS,
+    'upper': UPPERCASE_CHARS,
+    'digit': DIGIT_CHARS,
+    'special': SPECIAL_CHARS,
+}
+
+class PasswordPolicy:
+    """
+    A password policy compiled into counting tables for exact uniform sampling.
+    
+    The valid passwords have the given length, use only the selected classes,
+    contain between the minimum and maximum number of characters of each class,
+    contain none of the forbidden substrings and, with no_repeat, never use the
+    same character twice in a row. The number of valid completions of every
+    state (remaining length, class counts, matcher state) is counted once by
+    dynamic programming; the matcher is an Aho-Corasick automaton over the
+    forbidden substrings. Password i of the valid passwords is then built
+    directly from i, so a sample costs one random number and no rejection.
+    
+    Characters that occur in no forbidden substring are interchangeable within
+    their class, so they share one transition weighted by their number.
+    """
+    
+    def __init__(self, length=16, classes=tuple(CLASS_CHARS), min_counts=None, max_counts=None,
+                 forbidden=(), no_repeat=False, avoid_ambiguous=False):
+        """
+        Args:
+            length (int): Password length
+            classes (iterable): Names of CLASS_CHARS the passwords are drawn from
+            min_counts (dict, optional): Minimum characters of each class; defaults to 1 per class
+            max_counts (dict, optional): Maximum characters of each class; unlimited if missing
+            forbidden (iterable): Substrings no password may contain (case-sensitive)
+            no_repeat (bool): Whether to forbid the same character twice in a row
+            avoid_ambiguous (bool): Whether to avoid ambiguous characters (see AMBIGUOUS_CHARS)
+        """
+        unknown = [name for name in classes if name not in CLASS_CHARS]
+        if unknown:
+            raise ValueError(f"Unknown character class '{unknown[0]}'. Choose from: {', '.join(CLASS_CHARS)}")
+        classes = tuple(name for name in CLASS_CHARS if name in set(classes))
+        if not classes:
+            raise ValueError("A password policy needs at least one character class")
+        if not 1 <= length <= MAX_PASSWORD_LENGTH:
+            raise ValueError(f"Password length must be between 1 and {MAX_PASSWORD_LENGTH} characters")
+        
+        min_counts = {name: 1 for name in classes} if min_counts is None else dict(min_counts)
+        max_counts = dict(max_counts or {})
+        for name in list(min_counts) + list(max_counts):
+            if name not in classes:
+                raise ValueError(f"Count given for character class '{name}', which the policy does not use")
+        
+        self.length = length
+        self.classes = classes
+        self.min_counts = tuple(min_counts.get(name, 0) for name in classes)
+        self.max_counts = tuple(max_counts.get(name) for name in classes)
+        self.no_repeat = no_repeat
+        self.avoid_ambiguous = avoid_ambiguous
+        self.forbidden = tuple(dict.fromkeys(forbidden))
+        
+        if any(low is not None and high is not None and low > high
+               for low, high in zip(self.min_counts, self.max_counts)):
+            raise ValueError("Minimum count of a character class cannot be greater than its maximum")
+        if sum(self.min_counts) > length:
+            raise ValueError(f"Password length ({length}) is too short for the minimum character "
+                             f"requirements ({sum(self.min_counts)})")
+        if any(not pattern for pattern in self.forbidden):
+            raise ValueError("Forbidden substrings cannot be empty")
+        
+        self.char_sets = tuple(
+            ''.join(c for c in CLASS_CHARS[name] if not avoid_ambiguous or c not in AMBIGUOUS_CHARS)
+            for name in classes
+        )
+        self._compile()
+        
+        if not self.size:
+            raise ValueError("No password satisfies the policy")
+        logger.info(f"Compiled password policy with {self.size} passwords ({self.entropy:.1f} bits)")
+    
+    def __repr__(self):
+        return (f"PasswordPolicy(length={self.length!r}, classes={self.classes!r}, "
+                f"min_counts={self.min_counts!r}, max_counts={self.max_counts!r}, "
+                f"forbidden={self.forbidden!r}, no_repeat={self.no_repeat!r}, "
+                f"avoid_ambiguous={self.avoid_ambiguous!r})")
+    
+    def _compile(self):
+        """Build the forbidden-substring automaton and the counting tables."""
+        class_of = {c: k for k, chars in enumerate(self.char_sets) for c in chars}
+        # A substring with a character the policy never draws cannot occur
+        patterns = [pattern for pattern in self.forbidden if all(c in class_of for c in pattern)]
+        significant = [c for c in ''.join(self.char_sets) if any(c in pattern for pattern in patterns)]
+        
+        # Aho-Corasick trie with failure links; node 0 is the root
+        children, fail, terminal = [{}], [0], [False]
+        for pattern in patterns:
+            node = 0
+            for c in pattern:
+                if c not in children[node]:
+                    children.append({})
+                    fail.append(0)
+                    terminal.append(False)
+                    children[node][c] = len(children) - 1
+                node = children[node][c]
+            terminal[node] = True
+        queue = list(children[0].values())
+        for node in queue:
+            for c, child in children[node].items():
+                state = fail[node]
+                while state and c not in children[state]:
+                    state = fail[state]
+                fail[child] = children[state].get(c, 0)
+                terminal[child] = terminal[child] or terminal[fail[child]]
+                queue.append(child)
+        
+        def goto(node, c):
+            while node and c not in children[node]:
+                node = fail[node]
+            return children[node].get(c, 0)
+        
+        generic = tuple(''.join(c for c in chars if c not in significant) for chars in self.char_sets)
+        no_repeat = self.no_repeat
+        
+        # Transitions of each matcher state (node, last), where last is the previous
+        # character if it is significant or the class of a generic one, and only
+        # kept when repeats are forbidden
+        start = (0, None)
+        transitions = {}
+        pending = [start]
+        while pending:
+            node, last = state = pending.pop()
+            if state in transitions:
+                continue
+            moves = []
+            for c in significant:
+                target = goto(node, c)
+                if (no_repeat and last == c) or terminal[target]:
+                    continue
+                moves.append((c, class_of[c], 1, (target, c if no_repeat else None)))
+            for k, chars in enumerate(generic):
+                multiplicity = len(chars) - (1 if no_repeat and last == k else 0)
+                if multiplicity > 0:
+                    moves.append((chars, k, multiplicity, (0, k if no_repeat else None)))
+            transitions[state] = moves
+            pending.extend(target for _, _, _, target in moves)
+        
+        # Counts above the minimum are equivalent unless there is a maximum
+        caps = [low if high is None else high for low, high in zip(self.min_counts, self.max_counts)]
+        
+        # The tables grow with the product of the caps, so check their size before building them
+        states = math.prod(cap + 1 for cap in caps) * len(transitions) * self.length
+        if states > MAX_POLICY_STATES:
+            raise ValueError(f"The policy needs {states:,} counting states, more than the limit of "
+                             f"{MAX_POLICY_STATES:,}; use a shorter length, lower minimum or maximum "
+                             f"counts, or fewer forbidden substrings")
+        count_vectors = list(itertools.product(*(range(cap + 1) for cap in caps)))
+        
+        def advance(counts, k):
+            value = counts[k] + 1
+            if self.max_counts[k] is not None and value > self.max_counts[k]:
+                return None
+            return counts[:k] + (min(value, caps[k]),) + counts[k + 1:]
+        
+        advanced = {(counts, k): advance(counts, k)
+                    for counts in count_vectors for k in range(len(self.char_sets))}
+        
+        # ways[(counts, state)] is the number of valid completions with r characters left
+        ways = {(counts, state): 1
+                for counts in count_vectors if all(c >= low for c, low in zip(counts, self.min_counts))
+                for state in transitions}
+        self._tables = [None]
+        for _ in range(self.length):
+            layer = {}
+            table = {}
+            for counts in count_vectors:
+                for state, moves in transitions.items():
+                    cumulative = []
+                    entries = []
+                    total = 0
+                    for chars, k, multiplicity, target in moves:
+                        next_counts = advanced[counts, k]
+                        if next_counts is None:
+                            continue
+                        completions = ways.get((next_counts, target))
+                        if not completions:
+                            continue
+                        total += multiplicity * completions
+                        cumulative.append(total)
+                        entries.append((chars, next_counts, target, completions))
+                    if total:
+                        layer[counts, state] = total
+                        table[counts, state] = (cumulative, entries)
+            ways = layer
+            self._tables.append(table)
+        
+        self._start = ((0,) * len(self.char_sets), start)
+        self.size = ways.get(self._start, 0)
+    
+    @property
+    def entropy(self):
+        """Exact entropy of a uniformly sampled password, in bits."""
+        return math.log2(self.size)
+    
+    def unrank(self, index):
+        """
+        Build the valid password with a given index.
+        
+        Args:
+            index (int): Index in [0, size)
+            
+        Returns:
+            str: The password; distinct indexes give distinct passwords
+        """
+        if not 0 <= index < self.size:
+            raise IndexError("Password index out of range")
+        
+        key = self._start
+        password = []
+        for remaining in range(self.length, 0, -1):
+            cumulative, entries = self._tables[remaining][key]
+            j = bisect_right(cumulative, index)
+            if j:
+                index -= cumulative[j - 1]
+            chars, counts, state, completions = entries[j]
+            choice, index = divmod(index, completions)
+            # The previous character is not among the choices when repeats are forbidden
+            if self.no_repeat and password and password[-1] in chars and len(chars) > 1:
+                if choice >= chars.index(password[-1]):
+                    choice += 1
+            password.append(chars[choice])
+            key = (counts, state)
+        return ''.join(password)
+    
+    def generate(self):
+        """
+        Generate one password uniformly from the valid passwords.
+        
+        Returns:
+            str: The password
+        """
+        return self.unrank(secrets.randbelow(self.size))
+    
+    def generate_many(self, n):
+        """
+        Generate passwords uniformly from the valid passwords, drawing the
+        random indexes from one os.urandom buffer.
+        
+        Args:
+            n (int): Number of passwords
+            
+        Returns:
+            list: The passwords
+        """
+        if n < 0:
+            raise ValueError("Number of passwords cannot be negative")
+        size = self.size
+        width = (size.bit_length() + 7) // 8 + 1
+        # Values at or above the largest multiple of size are dropped to avoid modulo bias
+        span = 1 << (8 * width)
+        limit = span - span % size
+        
+        passwords = []
+        unrank = self.unrank
+        while len(passwords) < n:
+            data = os.urandom(width * (n - len(passwords)))
+            for offset in range(0, len(data), width):
+                value = int.from_bytes(data[offset:offset + width], 'big')
+                if value < limit:
+                    passwords.append(unrank(value % size))
+        return passwords
+
+@lru_cache(maxsize=64)
+def get_password_policy(length=16, use_lowercase=True, use_uppercase=True, use_digits=True,
+                        use_special=True, avoid_ambiguous=False, min_of_each=1, max_of_each=None,
+                        forbidden=(), no_repeat=False):
+    """
+    Get the compiled policy of a combination of generator options, compiled once per combination.
+    
+    Args:
+        length (int): Password length
+        use_lowercase (bool): Whether to include lowercase letters
+        use_uppercase (bool): Whether to include uppercase letters
+        use_digits (bool): Whether to include digits
+        use_special (bool): Whether to include special characters
+        avoid_ambiguous (bool): Whether to avoid ambiguous characters
+        min_of_each (int): Minimum number of characters from each selected class
+        max_of_each (int, optional): Maximum number of characters from each selected class
+        forbidden (tuple): Substrings no password may contain
+        no_repeat (bool): Whether to forbid the same character twice in a row
+        
+    Returns:
+        PasswordPolicy: The policy; lowercase letters only if no class is selected
+    """
+    used = (use_lowercase, use_uppercase, use_digits, use_special)
+    classes = [name for name, selected in zip(CLASS_CHARS, used) if selected] or ['lower']
+    return PasswordPolicy(
+        length=length,
+        classes=classes,
+        min_counts={name: min_of_each for name in classes},
+        max_counts=None if max_of_each is None else {name: max_of_each for name in classes},
+        forbidden=tuple(forbidden),
+        no_repeat=no_repeat,
+        avoid_ambiguous=avoid_ambiguous
+    )
+
+# Lengths of PINs the generator accepts
+MIN_PIN_LENGTH = 3
+MAX_PIN_LENGTH = 12
+
+# PIN states are the last digit and the step that led to it (-1, +1 or 0 for
+# anything else); a third digit continuing a +1/-1 step makes a sequence
+_PIN_START = 30
+
+def _pin_step(state, digit):
+    """Get the state after a digit, or None if the digit completes a sequence."""
+    if state == _PIN_START:
+        return digit * 3 + 1
+    last, step = divmod(state, 3)
+    step -= 1
+    if step and digit - last == step:
+        return None
+    change = digit - last
+    return digit * 3 + (change + 1 if abs(change) == 1 else 1)
+
+@lru_cache(maxsize=None)
+def _pin_tables():
+    """
+    Count the PIN completions of every state, built once for all lengths.
+    
+    free[r][state] counts the r-digit completions without a sequence;
+    at_least[r][state][d][need] counts those that also contain digit d at
+    least need times (need 0 is free[r][state]).
+    """
+    states = range(_PIN_START + 1)
+    moves = [[(digit, _pin_step(state, digit)) for digit in range(10)
+              if _pin_step(state, digit) is not None] for state in states]
+    
+    free = [[1] * len(states)]
+    at_least = [[[[1] for _ in range(10)] for _ in states]]
+    for r in range(1, MAX_PIN_LENGTH + 1):
+        previous_free = free[-1]
+        previous = at_least[-1]
+        free.append([sum(previous_free[target] for _, target in moves[state]) for state in states])
+        layer = []
+        for state in states:
+            counts = []
+            for d in range(10):
+                row = [free[r][state]]
+                for need in range(1, r + 1):
+                    total = 0
+                    for digit, target in moves[state]:
+                        rest = need - (digit == d)
+                        if rest <= 0:
+                            total += previous_free[target]
+                        elif rest <= r - 1:
+                            total += previous[target][d][rest]
+                    row.append(total)
+                counts.append(row)
+            layer.append(counts)
+        at_least.append(layer)
+    return free, at_least
+
+def _pin_completions(remaining, state, counts, limit):
+    """Count the completions of a PIN prefix that avoid sequences and keep every digit within limit."""
+    free, at_least = _pin_tables()
+    total = free[remaining][state]
+    # Two digits cannot both exceed half the length, so the violations are disjoint
+    for digit, count in enumerate(counts):
+        need = limit + 1 - count
+        if need <= remaining:
+            total -= at_least[remaining][state][digit][need]
+    return total
+
+def _check_pin_length(length):
+    if length < MIN_PIN_LENGTH or length > MAX_PIN_LENGTH:
+        raise ValueError(f"PIN length must be between {MIN_PIN_LENGTH} and {MAX_PIN_LENGTH} digits")
+
+def pin_space_size(length=4, avoid_patterns=True):
+    """
+    Count the PINs generate_pin can return.
+    
+    Args:
+        length (int): Length of the PIN
+        avoid_patterns (bool): Whether sequences of three (123, 987) and digits
+            used more than length // 2 times are excluded
+        
+    Returns:
+        int: The exact number of allowed PINs
+    """
+    _check_pin_length(length)
+    if not avoid_patterns:
+        return 10 ** length
+    return _pin_completions(length, _PIN_START, (0,) * 10, length // 2)
+
+def unrank_pin(index, length=4, avoid_patterns=True):
+    """
+    Build the allowed PIN with a given index, in ascending numeric order.
+    
+    Args:
+        index (int): Index in [0, pin_space_size(length, avoid_patterns))
+        length (int): Length of the PIN
+        avoid_patterns (bool): Whether patterns are excluded (see pin_space_size)
+        
+    Returns:
+        str: The PIN
+    """
+    size = pin_space_size(length, avoid_patterns)
+    if not 0 <= index < size:
+        raise IndexError("PIN index out of range")
+    if not avoid_patterns:
+        return f"{index:0{length}d}"
+    
+    limit = length // 2
+    state = _PIN_START
+    counts = [0] * 10
+    pin = []
+    for remaining in range(length - 1, -1, -1):
+        for digit in range(10):
+            target = _pin_step(state, digit)
+            if target is None or counts[digit] == limit:
+                continue
+            counts[digit] += 1
+            completions = _pin_completions(remaining, target, counts, limit)
+            if index < completions:
+                break
+            counts[digit] -= 1
+            index -= completions
+        pin.append(str(digit))
+        state = target
+    return ''.join(pin)
+
 class PasswordGenerator:
     """Class for generating strong random passwords with customizable parameters."""
     
@@ -15,7 +609,9 @@ class PasswordGenerator:
                          use_digits=True,
                          use_special=True,
                          avoid_ambiguous=False,
-                         min_of_each=1):
+                         min_of_each=1,
+                         no_repeat=False,
+                         detailed=False):
         """
         Generate a strong random password.
         
@@ -27,74 +623,59 @@ class PasswordGenerator:
             use_special (bool): Whether to include special characters
             avoid_ambiguous (bool): Whether to avoid ambiguous characters (like 1/l/I, 0/O, etc.)
             min_of_each (int): Minimum number of characters from each selected character set
+            no_repeat (bool): Whether to forbid the same character twice in a row
+            detailed (bool): Whether to return a GeneratedSecret with the exact entropy
             
         Returns:
-            str: The generated password
+            str: The generated password (a GeneratedSecret if detailed)
         """
         # Validate inputs
         if length < 4:
             raise ValueError("Password length must be at least 4 characters")
         
-        # Character sets
-        lowercase_chars = string.ascii_lowercase
-        uppercase_chars = string.ascii_uppercase
-        digit_chars = string.digits
-        special_chars = "!@#$%^&*()-_=+[]{}|;:,.<>?/~"
-        
-        # Remove ambiguous characters if requested
-        if avoid_ambiguous:
-            ambiguous = "1lI0O"
-            lowercase_chars = ''.join(c for c in lowercase_chars if c not in ambiguous)
-            uppercase_chars = ''.join(c for c in uppercase_chars if c not in ambiguous)
-            digit_chars = ''.join(c for c in digit_chars if c not in ambiguous)
-        
-        # Determine which character sets to use
-        char_sets = []
-        min_chars_needed = 0
-        
-        if use_lowercase:
-            char_sets.append(lowercase_chars)
-            min_chars_needed += min_of_each
-        if use_uppercase:
-            char_sets.append(uppercase_chars)
-            min_chars_needed += min_of_each
-        if use_digits:
-            char_sets.append(digit_chars)
-            min_chars_needed += min_of_each
-        if use_special:
-            char_sets.append(special_chars)
-            min_chars_needed += min_of_each
-        
-        # If no character sets selected, use lowercase as default
-        if not char_sets:
-            char_sets.append(lowercase_chars)
-            min_chars_needed = min_of_each
-        
-        # Check if password length is sufficient for minimum requirements
-        if length < min_chars_needed:
-            raise ValueError(f"Password length ({length}) is too short for the minimum character requirements ({min_chars_needed})")
-        
-        # Start with minimum required characters from each set
-        password = []
-        for char_set in char_sets:
-            password.extend(random.choices(char_set, k=min_of_each))
+        # Sample uniformly from every password that meets the requirements
+        policy = get_password_policy(length, use_lowercase, use_uppercase, use_digits,
+                                     use_special, avoid_ambiguous, min_of_each,
+                                     no_repeat=no_repeat)
+        password_str = policy.generate()
         
-        # Fill the rest of the password with random characters from all sets
-        all_chars = ''.join(char_sets)
-        password.extend(random.choices(all_chars, k=length - len(password)))
+        logger.info(f"Generated password of length {length} with specified parameters")
         
-        # Shuffle the password characters
-        random.shuffle(password)
+        if detailed:
+            return GeneratedSecret(password_str, 'random', policy.entropy)
+        return password_str
+
+    @staticmethod
+    def generate_passwords(n, policy=None):
+        """
+        Generate many strong random passwords at once.
         
-        # Convert list to string
-        password_str = ''.join(password)
+        The random indexes of the whole batch come from one os.urandom buffer
+        and are turned into passwords by the policy (see PasswordPolicy).
         
-        logger.info(f"Generated password of length {length} with specified parameters")
+        Args:
+            n (int): Number of passwords
+            policy (PasswordPolicy or dict, optional): The policy, or keyword options
+                of get_password_policy such as length, use_special and min_of_each
+            
+        Returns:
+            list: The generated passwords
+        """
+        if not isinstance(policy, PasswordPolicy):
+            options = dict(policy or {})
+            if options.get('length', 16) < 4:
+                raise ValueError("Password length must be at least 4 characters")
+            if 'forbidden' in options:
+                options['forbidden'] = tuple(options['forbidden'])
+            policy = get_password_policy(**options)
         
-        return password_str
+        passwords = policy.generate_many(n)
+        logger.info(f"Generated {n} passwords of length {policy.length}")
+        return passwords
 
     @staticmethod
-    def generate_passphrase(num_words=4, separator="-", capitalize=False, append_number=False):
+    def generate_passphrase(num_words=4, separator="-", capitalize=False, append_number=False, wordlist=None,
+                            detailed=False):
         """
         Generate a memorable passphrase using common words.
         
@@ -103,24 +684,17 @@ class PasswordGenerator:
             separator (str): Character to use between words
             capitalize (bool): Whether to capitalize the first letter of each word
             append_number (bool): Whether to append a random number at the end
+            wordlist (sequence, optional): Words to choose from, e.g. a utils.word_file.WordFile
+                with a diceware list. Defaults to PASSPHRASE_WORDS.
+            detailed (bool): Whether to return a GeneratedSecret with the exact entropy
             
         Returns:
-            str: The generated passphrase
-        """
-        # List of common, easy-to-remember words
-        common_words = [
-            "apple", "banana", "orange", "grape", "melon", "cherry", "peach", "lemon", "lime", "plum",
-            "ocean", "river", "mountain", "forest", "desert", "valley", "cliff", "lake", "island", "beach",
-            "happy", "sunny", "rainy", "cloudy", "windy", "snowy", "foggy", "stormy", "calm", "warm",
-            "dog", "cat", "bird", "fish", "rabbit", "horse", "tiger", "lion", "bear", "wolf",
-            "red", "blue", "green", "yellow", "purple", "orange", "black", "white", "pink", "brown",
-            "book", "pen", "chair", "table", "phone", "lamp", "door", "window", "wall", "floor",
-            "run", "jump", "swim", "walk", "dance", "sing", "read", "write", "talk", "listen",
-            "pizza", "pasta", "salad", "soup", "bread", "cheese", "meat", "fruit", "cake", "cookie"
-        ]
-        
-        # Select random words
-        selected_words = random.sample(common_words, num_words)
+            str: The generated passphrase (a GeneratedSecret if detailed)
+        """
+        words = PASSPHRASE_WORDS if wordlist is None else wordlist
+        
+        # Select distinct random words by index, so only the chosen words are read
+        selected_words = [words[index] for index in _random.sample(range(len(words)), num_words)]
         
         # Apply capitalization if requested
         if capitalize:
@@ -131,48 +705,69 @@ class PasswordGenerator:
         
         # Append random number if requested
         if append_number:
-            random_number = random.randint(100, 999)
+            random_number = _random.randint(100, 999)
             passphrase = f"{passphrase}{separator}{random_number}"
         
         logger.info(f"Generated passphrase with {num_words} words")
         
+        if detailed:
+            # Ordered choice of distinct words, plus one of 900 numbers
+            entropy = math.log2(math.perm(len(words), num_words))
+            if append_number:
+                entropy += math.log2(900)
+            return GeneratedSecret(passphrase, 'passphrase', entropy)
         return passphrase
 
     @staticmethod
-    def generate_pin(length=4, avoid_patterns=True):
+    def generate_pronounceable(length=12, capitalize=False, model=None, detailed=False):
+        """
+        Generate a pronounceable password from a character Markov model.
+        
+        Args:
+            length (int): Length of the password
+            capitalize (bool): Whether to capitalize the first letter
+            model (MarkovModel, optional): The model to draw from. Defaults to
+                utils.markov.get_markov_model().
+            detailed (bool): Whether to return a GeneratedSecret with the exact
+                Shannon entropy and min-entropy of the model
+            
+        Returns:
+            str: The generated password (a GeneratedSecret if detailed)
+        """
+        if length < 4 or length > 64:
+            raise ValueError("Pronounceable password length must be between 4 and 64 characters")
+        
+        model = model or get_markov_model()
+        password = model.generate(length)
+        if capitalize:
+            password = password.capitalize()
+        
+        logger.info(f"Generated pronounceable password of length {length}")
+        
+        if detailed:
+            return GeneratedSecret(password, 'pronounceable', model.entropy(length), model.min_entropy(length))
+        return password
+
+    @staticmethod
+    def generate_pin(length=4, avoid_patterns=True, detailed=False):
         """
         Generate a random PIN.
         
         Args:
             length (int): Length of the PIN
             avoid_patterns (bool): Whether to avoid common patterns like 1234, repeated digits, etc.
+            detailed (bool): Whether to return a GeneratedSecret with the exact entropy
             
         Returns:
-            str: The generated PIN
+            str: The generated PIN, uniform over the allowed PINs (see pin_space_size);
+                a GeneratedSecret if detailed
         """
-        if length < 3 or length > 12:
-            raise ValueError("PIN length must be between 3 and 12 digits")
-            
-        while True:
-            # Generate a random PIN
-            pin = ''.join(random.choices(string.digits, k=length))
-            
-            # If we don't need to avoid patterns, return immediately
-            if not avoid_patterns:
-                return pin
-                
-            # Check for sequential digits (like "1234", "9876")
-            sequential = False
-            for i in range(len(pin) - 2):
-                if (int(pin[i+1]) == int(pin[i]) + 1 and int(pin[i+2]) == int(pin[i]) + 2) or \
-                   (int(pin[i+1]) == int(pin[i]) - 1 and int(pin[i+2]) == int(pin[i]) - 2):
-                    sequential = True
-                    break
-                    
-            # Check for repeated digits (like "1111", "2222")
-            repeated = any(pin.count(digit) > length // 2 for digit in set(pin))
-            
-            # If no patterns found, return the PIN
-            if not sequential and not repeated:
-                logger.info(f"Generated PIN of length {length}")
-                return pin 
\ No newline at end of file
+        # Draw the rank of the PIN among the allowed ones, so no PIN is ever rejected
+        size = pin_space_size(length, avoid_patterns)
+        pin = unrank_pin(secrets.randbelow(size), length, avoid_patterns)
+        
+        logger.info(f"Generated PIN of length {length}")
+        
+        if detailed:
+            return GeneratedSecret(pin, 'pin', math.log2(size))
+        return pin
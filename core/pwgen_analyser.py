@@ -1,23 +1,143 @@
 import zxcvbn
+import math
+import asyncio
 import hashlib
 import base64
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.password_gen import ATTACKER_MODELS, display_time, guess_seconds, score_from_guesses
+from utils.markov import get_markov_model
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-def analyze_password(password):
+# Longest input zxcvbn sees by default; the rest is covered by pre_score
+DEFAULT_ZXCVBN_WINDOW = 64
+
+# Number of printable ASCII symbols, the search space of one special character
+_SYMBOL_SPACE = 33
+
+def pre_score(password):
+    """
+    Estimate the strength of a password in one O(n) pass.
+    
+    Every character costs log2 of the size of the character classes used,
+    except characters that repeat the previous one or continue a sequence
+    (abc, 987): a run of those only costs log2 of its length.
+    
+    Args:
+        password (str): The password to score
+        
+    Returns:
+        dict: length, class counts, charset_size, longest_repeat,
+            longest_sequence and entropy (estimated bits)
+    """
+    classes = {"lower": 0, "upper": 0, "digit": 0, "special": 0}
+    for char in password:
+        if char.islower():
+            classes["lower"] += 1
+        elif char.isupper():
+            classes["upper"] += 1
+        elif char.isdigit():
+            classes["digit"] += 1
+        else:
+            classes["special"] += 1
+    charset_size = (26 * bool(classes["lower"]) + 26 * bool(classes["upper"])
+                    + 10 * bool(classes["digit"]) + _SYMBOL_SPACE * bool(classes["special"]))
+    char_bits = math.log2(charset_size) if charset_size > 1 else 1.0
+    
+    bits = 0.0
+    repeat = sequence = longest_repeat = longest_sequence = 0
+    run = 0  # Characters in the current repeat or sequence run after its first one
+    step = None
+    previous = None
+    for char in password:
+        change = ord(char) - ord(previous) if previous is not None else None
+        if change == 0:
+            repeat += 1
+            sequence, step = 1, None
+            run += 1
+        elif change in (1, -1) and step in (None, change):
+            step = change
+            sequence += 1
+            repeat = 1
+            run += 1
+        else:
+            if run:
+                bits += math.log2(run + 1)
+                run = 0
+            repeat = sequence = 1
+            step = None
+            bits += char_bits
+        longest_repeat = max(longest_repeat, repeat)
+        longest_sequence = max(longest_sequence, sequence)
+        previous = char
+    if run:
+        bits += math.log2(run + 1)
+    
+    return {
+        "length": len(password),
+        "classes": classes,
+        "charset_size": charset_size,
+        "longest_repeat": longest_repeat,
+        "longest_sequence": longest_sequence,
+        "entropy": bits,
+    }
+
+def _pre_score_blocks(text, window, seen):
+    """
+    Estimate the bits of a long text block by block.
+    
+    A block equal to an earlier one (e.g. a pasted text repeated many times)
+    only costs the choice among the blocks seen so far, so repeats add almost
+    nothing and are not scanned again.
+    """
+    size = max(window, 64)
+    bits = 0.0
+    for start in range(0, len(text), size):
+        block = text[start:start + size]
+        if block in seen:
+            bits += math.log2(len(seen) + 1)
+        else:
+            seen.add(block)
+            bits += pre_score(block)["entropy"]
+    return bits
+
+def _pre_score_feedback(scores):
+    """Build zxcvbn-style feedback from a pre-score."""
+    warning = ""
+    if scores["longest_repeat"] >= 3:
+        warning = 'Repeats like "aaa" are easy to guess'
+    elif scores["longest_sequence"] >= 3:
+        warning = "Sequences like abc or 6543 are easy to guess"
+    suggestions = []
+    if sum(1 for count in scores["classes"].values() if count) < 3:
+        suggestions.append("Mix lowercase, uppercase, digits and symbols")
+    return {"warning": warning, "suggestions": suggestions}
+
+def analyze_password(password, window=DEFAULT_ZXCVBN_WINDOW):
     """
     Analyze the strength of a password using zxcvbn.
     
+    The analysis is tiered to bound its cost: inputs up to `window`
+    characters are analysed by zxcvbn alone; for longer inputs zxcvbn only
+    sees the first `window` characters and the guesses for the rest come
+    from pre_score, which is O(n). A window of 0 uses pre_score alone.
+    
     Args:
         password (str): The password to analyze
+        window (int): Longest input passed to zxcvbn
         
     Returns:
         dict: A dictionary containing analysis results including:
             - score: Integer from 0 (weak) to 4 (strong)
             - crack_time: Estimated time to crack the password
             - feedback: Dictionary with warnings and suggestions
+            - tier: 'zxcvbn', 'zxcvbn+pre-score' or 'pre-score'
+            - checked_length: Number of characters zxcvbn analysed
     """
     if not password:
         return {
@@ -26,19 +146,198 @@ def analyze_password(password):
             "feedback": {
                 "warning": "Empty password",
                 "suggestions": ["Please enter a password to analyze"]
-            }
+            },
+            "tier": "pre-score",
+            "checked_length": 0
         }
     
-    result = zxcvbn.zxcvbn(password)
+    if len(password) <= window:
+        result = zxcvbn.zxcvbn(password)
+        
+        # Extract relevant information
+        return {
+            "score": result["score"],  # 0-4 (0 = weak, 4 = strong)
+            "crack_time": result["crack_times_display"]["offline_slow_hashing_1e4_per_second"],
+            "feedback": result["feedback"],
+            "tier": "zxcvbn",
+            "checked_length": len(password)
+        }
     
-    # Extract relevant information
-    analysis = {
-        "score": result["score"],  # 0-4 (0 = weak, 4 = strong)
-        "crack_time": result["crack_times_display"]["offline_slow_hashing_1e4_per_second"],
-        "feedback": result["feedback"]
+    # Guesses multiply across the zxcvbn window and the pre-scored remainder
+    window = max(window, 0)
+    rest_bits = _pre_score_blocks(password[window:], window, {password[:window]})
+    if window > 0:
+        result = zxcvbn.zxcvbn(password[:window])
+        log2_guesses = result["guesses_log10"] * math.log2(10) + rest_bits
+        feedback = result["feedback"]
+        tier = "zxcvbn+pre-score"
+    else:
+        log2_guesses = rest_bits
+        feedback = _pre_score_feedback(pre_score(password[:4096]))
+        tier = "pre-score"
+    
+    rate = ATTACKER_MODELS["offline_slow_hashing_1e4_per_second"]
+    logger.info(f"Analyzed {len(password)} characters with tier {tier}")
+    return {
+        "score": score_from_guesses(log2_guesses),
+        "crack_time": display_time(guess_seconds(log2_guesses, rate)),
+        "feedback": feedback,
+        "tier": tier,
+        "checked_length": window
     }
+
+def _init_worker():
+    """Load zxcvbn's dictionaries and the Markov model once per analysis worker, before its first task."""
+    zxcvbn.zxcvbn("warm-up")
+    get_markov_model()
+
+def _worker_context():
+    """
+    Get the start method of the analysis workers.
     
-    return analysis
+    Forking the bot would copy its event loop, threads and locks into the
+    workers, so they start from a clean forkserver process, or are spawned
+    where forkserver is not available.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+class AnalysisBusyError(RuntimeError):
+    """Raised when the analysis service already has its maximum number of passwords in progress."""
+
+class AnalysisService:
+    """
+    Run analyze_password in worker processes so zxcvbn's CPU time never
+    blocks the event loop.
+    
+    At most max_pending analyses are in progress at a time; further requests
+    fail fast with AnalysisBusyError instead of queueing without bound. A call
+    that exceeds its timeout returns control to the caller at once, but still
+    counts as pending until its worker finishes, so the bound reflects the
+    work the pool really has. If a worker dies (e.g. killed for using too
+    much memory), the broken pool is dropped and a new one is started on
+    the next call.
+    """
+    
+    def __init__(self, workers=2, max_pending=32, timeout=5.0, window=DEFAULT_ZXCVBN_WINDOW):
+        """
+        Args:
+            workers (int): Worker processes; 0 runs the analyses in the default thread executor
+            max_pending (int): Maximum analyses in progress, including queued ones
+            timeout (float): Default seconds to wait for one analysis
+            window (int): Longest input passed to zxcvbn (see analyze_password)
+        """
+        if max_pending < 1:
+            raise ValueError("Maximum pending analyses must be at least 1")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.window = window
+        self.pending = 0
+        self._executor = None
+    
+    def _get_executor(self):
+        # Workers are started on first use, not at import
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=_worker_context(),
+                initializer=_init_worker
+            )
+            logger.info(f"Started {self.workers} password analysis workers")
+        return self._executor
+    
+    def _discard_executor(self, executor):
+        """Drop a broken pool so the next call starts a new one."""
+        if executor is not None and self._executor is executor:
+            logger.error("Password analysis workers died; restarting them on the next analysis")
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _finished(self, future, executor=None):
+        self.pending -= 1
+        # Retrieve the outcome of analyses nobody waits for any more, e.g. after a timeout
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard_executor(executor)
+    
+    async def analyze(self, password, timeout=None):
+        """
+        Analyze a password in a worker.
+        
+        Args:
+            password (str): The password to analyze
+            timeout (float, optional): Seconds to wait. Defaults to the service timeout.
+            
+        Returns:
+            dict: The result of analyze_password
+            
+        Raises:
+            AnalysisBusyError: If max_pending analyses are already in progress
+            asyncio.TimeoutError: If the analysis takes longer than the timeout
+        """
+        if self.pending >= self.max_pending:
+            raise AnalysisBusyError("Too many password analyses in progress")
+        
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            future = loop.run_in_executor(executor, analyze_password, password, self.window)
+        except BrokenProcessPool:
+            # The pool broke after its last analysis finished; retry once on a new one
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            future = loop.run_in_executor(executor, analyze_password, password, self.window)
+        self.pending += 1
+        future.add_done_callback(lambda done: self._finished(done, executor))
+        # shield() keeps the timeout from cancelling the future, which releases its slot when done
+        return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+    
+    def shutdown(self):
+        """Stop the workers; analyses still in progress are abandoned."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Service used by analyze_async, replaced by configure_analysis
+_analysis_service = None
+
+def configure_analysis(workers=2, max_pending=32, timeout=5.0, window=DEFAULT_ZXCVBN_WINDOW):
+    """
+    Set up the service used by analyze_async, replacing any previous one.
+    
+    Args:
+        workers (int): Worker processes; 0 uses the default thread executor
+        max_pending (int): Maximum analyses in progress
+        timeout (float): Default seconds to wait for one analysis
+        window (int): Longest input passed to zxcvbn (see analyze_password)
+        
+    Returns:
+        AnalysisService: The new service
+    """
+    global _analysis_service
+    if _analysis_service is not None:
+        _analysis_service.shutdown()
+    _analysis_service = AnalysisService(workers=workers, max_pending=max_pending, timeout=timeout, window=window)
+    return _analysis_service
+
+async def analyze_async(password, timeout=None):
+    """
+    Analyze a password without blocking the event loop (see AnalysisService.analyze).
+    
+    Args:
+        password (str): The password to analyze
+        timeout (float, optional): Seconds to wait; defaults to the configured timeout
+        
+    Returns:
+        dict: The result of analyze_password
+    """
+    service = _analysis_service or configure_analysis()
+    return await service.analyze(password, timeout=timeout)
+
+def shutdown_analysis():
+    """Stop the workers of the service used by analyze_async."""
+    if _analysis_service is not None:
+        _analysis_service.shutdown()
 
 def generate_password_hashes(password):
     """
@@ -121,7 +420,16 @@ def format_analysis_for_telegram(analysis, include_hashes=True, password=None):
     # Build the response message
     message = f"📊 *Password Strength Analysis*\n\n"
     message += f"*Strength*: {strength_desc} ({score}/4)\n"
-    message += f"*Est. Time to Crack*: {crack_time}\n\n"
+    message += f"*Est. Time to Crack*: {crack_time}\n"
+    
+    # Say how much of a long input the pattern checks covered
+    tier = analysis.get("tier", "zxcvbn")
+    if tier == "zxcvbn+pre-score":
+        message += (f"_Patterns were checked in the first {analysis['checked_length']} characters; "
+                    f"the rest was estimated by a quick scan._\n")
+    elif tier == "pre-score":
+        message += "_Estimated by a quick scan without dictionary checks._\n"
+    message += "\n"
     
     # Add warnings if present
     if feedback["warning"]:
@@ -1,17 +1,86 @@
-import itertools
 import os
+import sys
+import heapq
+import threading
 import datetime
 import logging
-from utils.common import apply_leetspeak, append_years, create_case_variations, append_special_chars
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.common import write_suffix_product
+from utils.dedup import create_deduplicator
+from utils.rules import default_ruleset
+from utils.ranking import TopK, select_top_k, select_top_k_ordered
+from utils.compression import open_wordlist_writer, wordlist_filename
+from utils.external_sort import ExternalSorter, RankedRunSpiller
+from utils.tokens import expand_date
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Words used when the supplied information yields nothing usable
+FALLBACK_WORDS = ["password", "admin", "123456", "qwerty", "welcome"]
+
+# Candidates one process handles per second in each generation mode, used for
+# time estimates. Measured on a 4M-candidate profile: streaming only writes the
+# candidates, ranking also scores them and keeps the best, and sorting also
+# spills the ranked runs to disk and merges them.
+CANDIDATES_PER_SECOND = {
+    'streaming': 400000,
+    'ranked': 135000,
+    'parallel': 135000,
+    'sorted': 130000,
+}
+
+# Ranking cost of each kind of stem; single tokens are the most likely base
+STEM_WEIGHTS = {
+    'single': 0.0,
+    'concatenated': 1.0,
+    'separated': 1.5,
+}
+
+# Categories whose answers are also expanded into common date layouts
+DATE_CATEGORIES = ('birthdate',)
+
+# Position of the self-pair of a repeated word, after every other second word
+_SELF_PAIR = sys.maxsize
+
+# Positions of the affix words appended to a word, after its self-pair
+_AFFIX_PAIR = _SELF_PAIR + 1
+
+# Precompute key of the first affix shard, after every word shard
+_AFFIX_SHARD = sys.maxsize
+
+# Order keys of ranked candidates are shard * _SHARD_STRIDE + position in the shard
+_SHARD_STRIDE = 1 << 40
+
 class WordlistGenerator:
-    def __init__(self):
+    def __init__(self, dedup_backend=None, dedup_capacity=None, dedup_error_rate=0.001, rules=None,
+                 candidate_filter=None):
+        """
+        Args:
+            dedup_backend (str, optional): Deduplicate the streamed wordlist across
+                stems with 'set', 'fingerprint' or 'bloom' (see utils.dedup).
+                If None, streamed candidates are only deduplicated per stem.
+            dedup_capacity (int, optional): Expected number of unique candidates
+            dedup_error_rate (float): False-positive rate of the 'bloom' backend
+            rules (RuleSet, optional): Mangling rules applied to every stem when
+                streaming. Defaults to the built-in ruleset (see utils.rules).
+            candidate_filter (WordlistFilter, optional): Length and character class
+                constraints, applied as early in the pipeline as possible (see utils.filters)
+        """
         self.personal_info = {}
+        # Words that do not come from the user, e.g. keyboard walks (see add_token_source)
+        self.token_sources = {}
         self.wordlist = set()
         self.min_length = 3  # Reduced minimum length to ensure we get some results
+        self.dedup_backend = dedup_backend
+        self.dedup_capacity = dedup_capacity
+        self.dedup_error_rate = dedup_error_rate
+        self.rules = rules or default_ruleset()
+        self.candidate_filter = candidate_filter
+        
+        # Ranking of the information seen so far, kept up to date by precompute
+        self._precomputed = None
+        self._precompute_lock = threading.Lock()
         
     def add_personal_info(self, category, value):
         """
@@ -31,7 +100,7 @@ class WordlistGenerator:
             # Add the original full string
             if value.strip():
                 values.append(value.strip())
-                
+            
             # Store all values for this category
             self.personal_info[category] = values
         elif isinstance(value, list):
@@ -39,125 +108,770 @@ class WordlistGenerator:
         
         logger.info(f"Added {len(values) if isinstance(value, str) and value.strip() else 0} items to category '{category}'")
     
-    def generate_base_combinations(self):
+    def add_token_source(self, name, tokens):
+        """
+        Add words from a source other than the user, such as keyboard walks.
+        
+        Token source words are affixes (see _affix_groups): they are used on
+        their own and appended to the personal information, but never
+        combined with each other.
+        
+        Args:
+            name (str): Name of the source
+            tokens (iterable): The words of the source
         """
-        Generate base combinations from personal information.
+        self.token_sources[name] = [token for token in tokens if token]
+        logger.info(f"Added {len(self.token_sources[name])} tokens from source '{name}'")
+    
+    def _word_groups(self, personal_info=None):
         """
-        # Flatten all personal info into a single list
-        all_words = []
-        for category, values in self.personal_info.items():
-            all_words.extend(values)
+        Get the word lists of the personal information.
         
-        logger.info(f"Generating combinations from {len(all_words)} words")
+        Args:
+            personal_info (dict, optional): A snapshot to use instead of self.personal_info
+            
+        Returns:
+            list: Lists of words, in the order words are numbered
+        """
+        personal_info = self.personal_info if personal_info is None else personal_info
+        return list(personal_info.values())
+    
+    def _affix_groups(self, personal_info=None):
+        """
+        Get the word lists of the affixes: the layouts of the dates in the
+        personal information, followed by the token sources.
         
-        # If we don't have enough words, add some common patterns
-        if len(all_words) < 2:
-            all_words.extend(['password', 'admin', '123456'])
-            logger.info("Added some common words due to insufficient input")
+        Affixes are numbered after the personal information. Each one is a
+        stem on its own and is appended to every personal word, but affixes are
+        not paired with each other or used with separators, which would
+        multiply the stems by the number of date layouts and walks.
         
-        # Generate combinations of 1 and 2 words
-        for r in range(1, 3):
-            for combo in itertools.permutations(all_words, r):
-                word = ''.join(combo)
-                if len(word) >= self.min_length:
-                    self.wordlist.add(word)
+        Args:
+            personal_info (dict, optional): A snapshot to use instead of self.personal_info
+            
+        Returns:
+            list: Lists of words, in the order words are numbered
+        """
+        personal_info = self.personal_info if personal_info is None else personal_info
+        groups = []
+        for category in DATE_CATEGORIES:
+            values = personal_info.get(category)
+            if values:
+                # Dates are also written in the layouts people use in passwords
+                groups.append([form for value in values for form in expand_date(value)])
+        return groups + list(self.token_sources.values())
+    
+    def _collect_words(self, personal_info=None):
+        """
+        Flatten the personal information and the affixes into a list of unique words.
+        
+        Args:
+            personal_info (dict, optional): A snapshot to use instead of self.personal_info
+        
+        Returns:
+            tuple: (unique words in insertion order, set of words that occurred
+                more than once, index of the first affix in the list)
+        """
+        all_words = {}
+        for values in self._word_groups(personal_info):
+            for word in values:
+                all_words[word] = all_words.get(word, 0) + 1
         
-        # Add combinations with underscore and dot separators for 2-word combinations
-        for combo in itertools.permutations(all_words, 2):
-            self.wordlist.add(f"{combo[0]}_{combo[1]}")
-            self.wordlist.add(f"{combo[0]}.{combo[1]}")
+        affixes = dict.fromkeys(word for values in self._affix_groups(personal_info)
+                                for word in values if word not in all_words)
+        if len(all_words) + len(affixes) < 2:
+            for word in ['password', 'admin', '123456']:
+                all_words[word] = all_words.get(word, 0) + 1
+                affixes.pop(word, None)
         
-        logger.info(f"Generated {len(self.wordlist)} base combinations")
+        # A single-word value is stored both split and in full, so repeated words
+        # are kept as a flag instead of duplicating every stem they take part in
+        repeated = {word for word, count in all_words.items() if count > 1}
+        return list(all_words) + list(affixes), repeated, len(all_words)
+    
+    def _iter_shard_stems(self, all_words, repeated, affix_start, index):
+        """
+        Yield the stems whose first word is all_words[index].
+        
+        Args:
+            all_words (list): Unique words from _collect_words
+            repeated (set): Words that occurred more than once
+            affix_start (int): Index of the first affix in all_words
+            index (int): Index of the first word of every stem in the shard
             
-    def apply_transformations(self):
+        Yields:
+            tuple: (base combination, ranking cost)
         """
-        Apply various transformations to the base words.
+        for stem, cost, _ in self._iter_keyed_shard_stems(all_words, repeated, affix_start, index):
+            yield stem, cost
+    
+    def _iter_keyed_shard_stems(self, all_words, repeated, affix_start, index):
         """
-        initial_count = len(self.wordlist)
-        base_words = list(self.wordlist)
+        Yield the stems of a shard together with their position in the shard.
+        
+        The position is (second word index, separator kind), with -1 for the
+        single word, _SELF_PAIR for the pair of a repeated word with itself and
+        _AFFIX_PAIR plus the affix number for an appended affix. Positions stay
+        valid when words are appended, so they order the stems of a growing
+        profile exactly as a full run would.
         
-        logger.info(f"Applying transformations to {len(base_words)} base words")
+        The shard of an affix only holds the affix itself.
+        
+        Yields:
+            tuple: (base combination, ranking cost, (second word index, kind))
+        """
+        first = all_words[index]
+        if len(first) >= self.min_length:
+            yield first, STEM_WEIGHTS['single'], (-1, 0)
+        if index >= affix_start:
+            return
         
-        # Apply leetspeak transformations
-        leet_count = 0
-        for word in base_words:
-            leet_variations = apply_leetspeak(word)
-            self.wordlist.update(leet_variations)
-            leet_count += len(leet_variations)
+        # Permutations of the original list pair a repeated word with itself
+        seconds = [(position, all_words[position]) for position in range(affix_start) if position != index]
+        if first in repeated:
+            seconds.append((_SELF_PAIR, first))
+        
+        for position, second in seconds:
+            joined = f"{first}{second}"
+            if len(joined) >= self.min_length:
+                yield joined, STEM_WEIGHTS['concatenated'], (position, 0)
+            yield f"{first}_{second}", STEM_WEIGHTS['separated'], (position, 1)
+            yield f"{first}.{second}", STEM_WEIGHTS['separated'], (position, 2)
+        
+        for position in range(affix_start, len(all_words)):
+            joined = f"{first}{all_words[position]}"
+            if len(joined) >= self.min_length:
+                yield joined, STEM_WEIGHTS['concatenated'], (_AFFIX_PAIR + position - affix_start, 0)
+    
+    def iter_scored_base_combinations(self, shard=None):
+        """
+        Lazily yield the base combinations (stems) built from personal information,
+        together with their ranking cost.
+        
+        The stems are partitioned by their first word so that a shard can be
+        expanded independently of the others.
+        
+        Args:
+            shard (int, optional): Only yield stems starting with the word at this index
             
-        # Apply case variations
-        base_words = list(self.wordlist)  # Update base words with new additions
-        case_count = 0
-        for word in base_words:
-            case_variations = create_case_variations(word)
-            self.wordlist.update(case_variations)
-            case_count += len(case_variations)
+        Yields:
+            tuple: (base combination, ranking cost)
+        """
+        all_words, repeated, affix_start = self._collect_words()
+        shards = range(len(all_words)) if shard is None else [shard]
+        produced = False
+        
+        for index in shards:
+            for stem, cost in self._iter_shard_stems(all_words, repeated, affix_start, index):
+                produced = True
+                yield stem, cost
+        
+        if not produced and shard is None:
+            logger.warning("No base combinations generated. Using fallback words.")
+            for word in FALLBACK_WORDS:
+                yield word, STEM_WEIGHTS['single']
+    
+    def iter_base_combinations(self, shard=None):
+        """
+        Lazily yield the base combinations (stems) built from personal information.
+        
+        Args:
+            shard (int, optional): Only yield stems starting with the word at this index
             
-        # Append years and special characters
-        base_words = list(self.wordlist)  # Update base words with new additions
-        year_variations = []
-        special_char_variations = []
+        Yields:
+            str: A base combination
+        """
+        for stem, _ in self.iter_scored_base_combinations(shard=shard):
+            yield stem
+    
+    def count_shards(self):
+        """
+        Get the number of shards the stem space is partitioned into.
         
-        # Limit to reasonable number of base words for transformations
-        base_words_for_transforms = base_words[:1000]  # Prevent excessive memory usage
+        Returns:
+            int: One shard per unique word and affix
+        """
+        return len(self._collect_words()[0])
+    
+    def expand_word(self, word):
+        """
+        Apply the mangling rules (by default the leetspeak, case and suffix
+        stages) to a single stem in one pass.
         
-        for word in base_words_for_transforms:
-            year_variations.extend(append_years(word))
-            special_char_variations.extend(append_special_chars(word))
+        Duplicates are removed within the stem only, so memory is bounded by
+        the number of variations of one word rather than the whole wordlist.
         
-        self.wordlist.update(year_variations)
-        self.wordlist.update(special_char_variations)
+        Args:
+            word (str): The stem to expand
+            
+        Returns:
+            list: Unique candidates derived from the stem
+        """
+        return self.rules.expand(word)
+    
+    def _stem_allowed(self, stem):
+        """
+        Check whether any candidate of a stem can pass the filter, without expanding it.
         
-        total_added = len(self.wordlist) - initial_count
-        logger.info(f"Added {total_added} variations (leetspeak: {leet_count}, case: {case_count}, "
-                   f"years: {len(year_variations)}, special chars: {len(special_char_variations)})")
+        Args:
+            stem (str): The stem
+            
+        Returns:
+            bool: False if the stem can be skipped
+        """
+        if self.candidate_filter is None:
+            return True
+        return self.candidate_filter.allows_lengths(self.rules.candidate_lengths(stem))
     
-    def generate_wordlist(self):
+    def _product_blocks(self, stem):
         """
-        Generate the complete wordlist based on personal information.
+        Expand a stem into (prefix, suffixes) blocks whose products are exactly
+        its candidates that pass the minimum length and the filter.
         
+        The filter is decided per suffix before any candidate is built; prefixes
+        missing the same character classes share one list of matching suffixes.
+        
+        Args:
+            stem (str): The stem
+            
         Returns:
-            list: The generated wordlist
+            list: (prefix, suffixes) tuples in candidate order, or None if the
+                expansion of the stem is not a prefix x suffix product
         """
-        # Clear previous wordlist if any
-        self.wordlist = set()
+        product = self.rules.expand_product(stem)
+        if product is None or not product[0]:
+            return None
         
-        # Generate base combinations
-        self.generate_base_combinations()
+        prefixes, suffixes = product
+        # Every prefix has the same length, so the length filter only depends on the suffix
+        shortest = self.min_length - len(prefixes[0])
+        if shortest > 0:
+            suffixes = [suffix for suffix in suffixes if len(suffix) >= shortest]
         
-        # Check if we have any base combinations
-        if not self.wordlist:
-            logger.warning("No base combinations generated. Adding fallback words.")
-            # Add some fallback words if no combinations were generated
-            self.wordlist.update(["password", "admin", "123456", "qwerty", "welcome"])
-        
-        # Apply transformations
-        self.apply_transformations()
-        
-        # Limit wordlist size to prevent memory issues
-        max_size = 50000
-        wordlist = list(self.wordlist)
-        if len(wordlist) > max_size:
-            logger.warning(f"Wordlist too large ({len(wordlist)} words), trimming to {max_size}")
-            wordlist = wordlist[:max_size]
-        
-        # Convert to sorted list and filter by minimum length
-        final_list = sorted([word for word in wordlist if len(word) >= self.min_length])
+        candidate_filter = self.candidate_filter
+        if candidate_filter is None:
+            return [(prefix, suffixes) for prefix in prefixes] if suffixes else []
+        
+        blocks = []
+        matching_by_missing = {}
+        for prefix in prefixes:
+            missing = candidate_filter.missing_classes(prefix)
+            matching = matching_by_missing.get(missing)
+            if matching is None:
+                matching = matching_by_missing[missing] = candidate_filter.matching_suffixes(prefix, suffixes)
+            if matching:
+                blocks.append((prefix, matching))
+        return blocks
+    
+    def _expand_filtered(self, stem):
+        """
+        Expand a stem into its candidates that pass the minimum length and the filter.
+        
+        Args:
+            stem (str): The stem
+            
+        Returns:
+            list: The candidates, in expansion order
+        """
+        candidate_filter = self.candidate_filter
+        if candidate_filter is None:
+            return [candidate for candidate in self.expand_word(stem) if len(candidate) >= self.min_length]
+        if not self._stem_allowed(stem):
+            return []
+        
+        blocks = self._product_blocks(stem)
+        if blocks is None:
+            return [candidate for candidate in self.expand_word(stem)
+                    if len(candidate) >= self.min_length and candidate_filter.accepts(candidate)]
+        return [prefix + suffix for prefix, suffixes in blocks for suffix in suffixes]
+    
+    def iter_wordlist(self, shard=None, deduplicate=True):
+        """
+        Stream wordlist candidates through the combination, leetspeak, case and
+        suffix stages without building the full wordlist in memory.
+        
+        Unlike generate_wordlist, candidates are not sorted. They are only
+        deduplicated across stems if a dedup_backend was configured; otherwise
+        the same candidate may be produced by different stems.
+        
+        Args:
+            shard (int, optional): Only expand the stems of this shard
+            deduplicate (bool): Use the configured dedup_backend; callers that
+                deduplicate the output themselves can skip it
+            
+        Yields:
+            str: Candidates that satisfy the minimum length and the filter
+        """
+        deduplicator = None
+        if self.dedup_backend and deduplicate:
+            deduplicator = create_deduplicator(
+                self.dedup_backend,
+                capacity=self.dedup_capacity,
+                error_rate=self.dedup_error_rate
+            )
+        
+        for stem in self.iter_base_combinations(shard=shard):
+            for candidate in self._expand_filtered(stem):
+                if deduplicator is None or deduplicator.add(candidate):
+                    yield candidate
+    
+    def iter_scored_wordlist(self, shard=None):
+        """
+        Stream wordlist candidates with a ranking cost (lower is more likely).
+        
+        The cost is the stem's weight plus the weights of the leetspeak, case
+        and suffix rules that produced the candidate. Candidates are only
+        deduplicated per stem.
+        
+        Args:
+            shard (int, optional): Only expand the stems of this shard
+        
+        Yields:
+            tuple: (candidate, cost) for candidates that satisfy the minimum length and the filter
+        """
+        accepts = self.candidate_filter.accepts if self.candidate_filter else None
+        for stem, stem_cost in self.iter_scored_base_combinations(shard=shard):
+            if not self._stem_allowed(stem):
+                continue
+            for candidate, cost in self.rules.expand_scored(stem, stem_cost):
+                if len(candidate) >= self.min_length and (accepts is None or accepts(candidate)):
+                    yield candidate, cost
+    
+    def cache_profile(self, **settings):
+        """
+        Describe everything that determines the generated wordlist, for use as a cache key.
+        
+        Args:
+            **settings: Output settings of the caller (e.g. mode and size limit)
+            
+        Returns:
+            dict: JSON-serialisable profile
+        """
+        return {
+            'personal_info': self.personal_info,
+            'token_sources': self.token_sources,
+            'min_length': self.min_length,
+            'rules': repr(self.rules),
+            'dedup_backend': self.dedup_backend,
+            'filter': repr(self.candidate_filter),
+            'settings': settings,
+        }
+    
+    def estimate(self):
+        """
+        Count what each stage of the pipeline will produce, without generating candidates.
+        
+        Only the stems are built; the number of words each mangling stage makes
+        of a stem is computed from the stem itself (see RuleSet.estimate_stages).
+        The candidate count is exact unless variations collide, in which case it
+        is an upper bound. Stems the filter rules out entirely are not counted,
+        but candidates are otherwise counted before the length and class checks.
+        
+        Returns:
+            dict: 'words' (unique input words), 'stems', 'stages' (cumulative
+                candidates after each mangling stage) and 'candidates'
+        """
+        all_words, _, _ = self._collect_words()
+        stems = 0
+        stages = [0] * len(self.rules.stages)
+        
+        for stem, _ in self.iter_scored_base_combinations():
+            stems += 1
+            if not self._stem_allowed(stem):
+                continue
+            for position, total in enumerate(self.rules.estimate_stages(stem)):
+                stages[position] += total
+        
+        return {
+            'words': len(all_words),
+            'stems': stems,
+            'stages': stages,
+            'candidates': stages[-1] if stages else stems,
+        }
+    
+    def plan(self, max_candidates=None, workers=1, parallel_threshold=None, streaming=False,
+             spill_threshold=None, candidates_per_second=None):
+        """
+        Decide how a generation request should run before spending CPU on it.
+        
+        The mode is 'streaming' if requested, 'sorted' from spill_threshold
+        candidates on, 'parallel' from parallel_threshold candidates on with
+        more than one worker, and 'ranked' otherwise.
+        
+        Args:
+            max_candidates (int, optional): Candidate count above which the request is rejected
+            workers (int): Number of worker processes available
+            parallel_threshold (int, optional): Candidate count from which the
+                sharded parallel engine is worth its process start-up cost
+            streaming (bool): Whether candidates are written unranked (write_wordlist)
+            spill_threshold (int, optional): Candidate count from which ranked
+                candidates are sorted through runs on disk (write_sorted_wordlist)
+            candidates_per_second (dict, optional): Throughput of one process per
+                mode. Defaults to CANDIDATES_PER_SECOND.
+            
+        Returns:
+            dict: The estimate, plus 'accepted', 'parallel', 'mode' and 'estimated_seconds'
+        """
+        rates = candidates_per_second or CANDIDATES_PER_SECOND
+        plan = self.estimate()
+        candidates = plan['candidates']
+        
+        plan['accepted'] = max_candidates is None or candidates <= max_candidates
+        plan['parallel'] = (
+            workers > 1 and parallel_threshold is not None and candidates >= parallel_threshold
+        )
+        if streaming:
+            plan['mode'] = 'streaming'
+        elif spill_threshold is not None and candidates >= spill_threshold:
+            plan['mode'] = 'sorted'
+        elif plan['parallel']:
+            plan['mode'] = 'parallel'
+        else:
+            plan['mode'] = 'ranked'
+        
+        # Streaming runs in one process; the ranking modes split the shards over the workers
+        speed = rates[plan['mode']]
+        if plan['parallel'] and not streaming:
+            speed *= min(workers, plan['words'])
+        plan['estimated_seconds'] = candidates / speed
+        
+        logger.info(f"Planned {candidates} candidates from {plan['stems']} stems "
+                    f"(accepted: {plan['accepted']}, mode: {plan['mode']}, "
+                    f"~{plan['estimated_seconds']:.1f}s)")
+        return plan
+    
+    def write_wordlist(self, sink, max_size=None):
+        """
+        Stream the wordlist straight into a writable text sink, one word per line.
+        
+        Stems whose expansion is a "variations x suffixes" product (see
+        RuleSet.expand_product) are written in bulk, one block per variation,
+        instead of one string per candidate; the filter then only selects
+        which suffixes each variation gets. With a dedup_backend, the suffixes
+        of a block are also dropped if the candidate was already written, so
+        the output is the same as iter_wordlist.
+        
+        Args:
+            sink: A file-like object opened for writing text
+            max_size (int, optional): Stop after writing this many candidates
+            
+        Returns:
+            int: The number of candidates written
+        """
+        deduplicator = None
+        if self.dedup_backend:
+            deduplicator = create_deduplicator(
+                self.dedup_backend,
+                capacity=self.dedup_capacity,
+                error_rate=self.dedup_error_rate
+            )
+        
+        count = 0
+        for stem in self.iter_base_combinations():
+            if max_size is not None and count >= max_size:
+                logger.warning(f"Wordlist reached the limit of {max_size} words, stopping")
+                break
+            remaining = None if max_size is None else max_size - count
+            if not self._stem_allowed(stem):
+                continue
+            
+            blocks = self._product_blocks(stem)
+            if blocks is None:
+                candidates = self._expand_filtered(stem)
+                if deduplicator is not None:
+                    candidates = [candidate for candidate in candidates if deduplicator.add(candidate)]
+                candidates = candidates[:remaining]
+                sink.write(''.join(f"{candidate}\n" for candidate in candidates))
+                count += len(candidates)
+                continue
+            
+            for prefix, suffixes in blocks:
+                if deduplicator is not None:
+                    suffixes = [suffix for suffix in suffixes if deduplicator.add(prefix + suffix)]
+                if remaining is not None and len(suffixes) >= remaining:
+                    count += write_suffix_product(sink, [prefix], suffixes[:remaining])
+                    break
+                count += write_suffix_product(sink, [prefix], suffixes)
+                if remaining is not None:
+                    remaining -= len(suffixes)
+        
+        logger.info(f"Streamed {count} words to output")
+        return count
+    
+    def rank_shards(self, shards, max_size):
+        """
+        Select the most likely candidates of some shards.
+        
+        Args:
+            shards (iterable): Indexes of the shards to expand
+            max_size (int): Number of candidates to keep
+            
+        Returns:
+            list: (order, candidate, cost) tuples, most likely first, where
+                order is the position of the candidate in the full stream
+        """
+        top = TopK(max_size)
+        for shard in shards:
+            top.update(self._iter_ordered_shard(shard))
+        return top.result()
+    
+    def _iter_ordered_shard(self, shard):
+        """Yield the (order, candidate, cost) entries of a shard, in stream order."""
+        base = shard * _SHARD_STRIDE
+        for position, (candidate, cost) in enumerate(self.iter_scored_wordlist(shard=shard)):
+            yield base + position, candidate, cost
+    
+    def rank_parallel(self, workers=None, max_size=None):
+        """
+        Select the most likely candidates on several processes, one shard of stems per task.
+        
+        Every worker ranks every workers-th shard and keeps the top max_size of
+        them. The kept entries of a worker are folded into one global TopK as
+        soon as it finishes and are then dropped, so the parent holds about
+        2 * max_size entries at most. Ties are broken on stream order, which gives
+        the same ranking as select_top_k over iter_scored_wordlist,
+        independent of the number of workers and of the order shards finish in.
+        
+        Args:
+            workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            max_size (int, optional): Number of candidates to keep. If None, all are kept.
+            
+        Returns:
+            list: (candidate, cost) tuples, most likely first
+        """
+        max_size = sys.maxsize if max_size is None else max_size
+        shard_count = self.count_shards()
+        workers = min(workers or os.cpu_count() or 1, shard_count)
+        logger.info(f"Ranking {shard_count} shards on {workers} worker processes")
+        
+        if workers <= 1:
+            ranked = self.rank_shards(range(shard_count), max_size)
+        else:
+            top = TopK(max_size)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_rank_shards, self.personal_info, self.token_sources, self.min_length,
+                                    self.rules, self.candidate_filter, range(worker, shard_count, workers), max_size)
+                    for worker in range(workers)
+                ]
+                for future in as_completed(futures):
+                    top.update(future.result())
+                    # Release the worker's entries as soon as they are folded in
+                    futures.remove(future)
+            ranked = top.result()
+        if not ranked:
+            logger.warning("No candidates generated in parallel. Using fallback words.")
+            return select_top_k(self.iter_scored_wordlist(), max_size)
+        return [(candidate, cost) for _, candidate, cost in ranked]
+    
+    def generate_wordlist_parallel(self, workers=None, max_size=None):
+        """
+        Generate the wordlist on several processes, keeping the most likely candidates.
+        
+        The result is identical to generate_wordlist with the same max_size,
+        independent of the number of workers (see rank_parallel).
+        
+        Args:
+            workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            max_size (int, optional): Maximum number of words to keep
+            
+        Returns:
+            list: The generated wordlist, most likely candidates first
+        """
+        final_list = [word for word, _ in self.rank_parallel(workers=workers, max_size=max_size)]
+        logger.info(f"Final wordlist contains {len(final_list)} words")
+        return final_list
+    
+    def write_sorted_wordlist(self, sink, max_size=None, workers=None, spill_dir=None,
+                              run_size=500000, use_mmap=False):
+        """
+        Write the sorted, deduplicated wordlist without holding all candidates in memory.
+        
+        With a max_size, the list is truncated by rank rather than
+        alphabetically: the scored candidates are streamed into ranked runs on
+        disk, each holding the top max_size of run_size candidates, and the
+        runs are merged until max_size distinct words are found (see
+        utils.external_sort.RankedRunSpiller). The result is the same set of
+        words as generate_wordlist. Without a max_size, every candidate is
+        kept. The kept words are then sorted through sorted runs, so memory is
+        bounded by run_size throughout, in the parent and in every worker.
+        
+        Args:
+            sink: A file-like object opened for writing text
+            max_size (int, optional): Number of most likely words to write
+            workers (int, optional): Number of worker processes; 0 or 1 expands the shards in-process
+            spill_dir (str, optional): Directory for the run files
+            run_size (int): Number of candidates per run
+            use_mmap (bool): Memory-map the runs while merging
+            
+        Returns:
+            int: The number of words written
+        """
+        shard_count = self.count_shards()
+        workers = min(workers or 1, shard_count)
+        
+        with ExternalSorter(spill_dir, run_size=run_size, use_mmap=use_mmap) as sorter:
+            if max_size is not None:
+                with RankedRunSpiller(max_size, spill_dir, run_size=run_size, use_mmap=use_mmap) as ranked:
+                    if workers <= 1:
+                        for shard in range(shard_count):
+                            ranked.extend(self._iter_ordered_shard(shard))
+                    else:
+                        logger.info(f"Ranking {shard_count} shards on {workers} worker processes")
+                        with ProcessPoolExecutor(max_workers=workers) as executor:
+                            futures = [
+                                executor.submit(_spill_shards, self.personal_info, self.token_sources,
+                                                self.min_length, self.rules, self.candidate_filter,
+                                                range(worker, shard_count, workers), max_size,
+                                                ranked.directory, run_size)
+                                for worker in range(workers)
+                            ]
+                            for future in as_completed(futures):
+                                ranked.adopt(future.result())
+                    sorter.extend(word for word, _ in ranked)
+            elif workers <= 1:
+                for shard in range(shard_count):
+                    sorter.extend(self.iter_wordlist(shard=shard, deduplicate=False))
+            else:
+                logger.info(f"Generating {shard_count} shards on {workers} worker processes")
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(_generate_shard, self.personal_info, self.token_sources,
+                                        self.min_length, self.rules, self.candidate_filter, shard)
+                        for shard in range(shard_count)
+                    ]
+                    for future in as_completed(futures):
+                        sorter.extend(future.result())
+            
+            if not sorter.added:
+                logger.warning("No candidates generated. Using fallback words.")
+                sorter.extend(self.iter_wordlist(deduplicate=False))
+            
+            logger.info(f"Sorting {sorter.added} candidates in {len(sorter.runs) or 1} runs")
+            count = sorter.write_sorted(sink)
+        
+        logger.info(f"Wrote {count} sorted words to output")
+        return count
+    
+    def precompute(self, max_size=50000):
+        """
+        Rank the candidates of the information added so far, reusing the
+        ranking of earlier calls.
+        
+        Only the stems that did not exist at the previous call are expanded:
+        the stems of new words and their pairs with the words seen before.
+        Their candidates are merged, in stream order, with the kept top
+        candidates of the earlier calls, which gives exactly the ranking a
+        full run over all the information would. Calling this after each
+        piece of information leaves generate_wordlist with only the last delta.
+        
+        The ranking is started over if a category is replaced, an affix is
+        inserted before existing ones or removed, or the rules, minimum length,
+        filter, token sources or max_size change. Safe to call from a worker
+        thread while information is being added.
+        
+        Args:
+            max_size (int): Number of candidates to keep
+            
+        Returns:
+            list: (candidate, cost) tuples, most likely first, or None if there
+                is not enough information yet (fallback words would be used)
+        """
+        with self._precompute_lock:
+            # Snapshot, so information added meanwhile is picked up by the next call
+            personal_info = {category: tuple(values) for category, values in dict(self.personal_info).items()}
+            groups = self._word_groups(personal_info) + self._affix_groups(personal_info)
+            if len({word for values in groups for word in values}) < 2:
+                return None
+            
+            all_words, repeated, affix_start = self._collect_words(personal_info)
+            affixes = tuple(all_words[affix_start:])
+            
+            settings = (repr(self.rules), self.min_length, repr(self.candidate_filter),
+                        repr(self.token_sources), max_size)
+            state = self._precomputed
+            if state is None or state['settings'] != settings or any(
+                    state['personal_info'].get(category, values) != values
+                    for category, values in personal_info.items()
+            ) or affixes[:len(state['affixes'])] != state['affixes']:
+                state = {'settings': settings, 'personal_info': {}, 'affixes': (), 'stems': set(), 'ranked': []}
+            
+            new_stems = []
+            for index in range(len(all_words)):
+                # Affix shards come after every word shard, however many words are added
+                key = index if index < affix_start else _AFFIX_SHARD + index - affix_start
+                for stem, cost, position in self._iter_keyed_shard_stems(all_words, repeated, affix_start, index):
+                    if (key, position) not in state['stems']:
+                        new_stems.append((key, position, stem, cost))
+            
+            accepts = self.candidate_filter.accepts if self.candidate_filter else None
+            
+            def iter_new_entries():
+                for index, position, stem, stem_cost in new_stems:
+                    if not self._stem_allowed(stem):
+                        continue
+                    for rank, (candidate, cost) in enumerate(self.rules.expand_scored(stem, stem_cost)):
+                        if len(candidate) >= self.min_length and (accepts is None or accepts(candidate)):
+                            yield (index, position, rank), candidate, cost
+            
+            kept = sorted(state['ranked'], key=lambda entry: entry[0])
+            ranked = select_top_k_ordered(
+                heapq.merge(kept, iter_new_entries(), key=lambda entry: entry[0]),
+                max_size
+            )
+            
+            state['personal_info'] = personal_info
+            state['affixes'] = affixes
+            state['stems'].update((index, position) for index, position, _, _ in new_stems)
+            state['ranked'] = ranked
+            self._precomputed = state
+        
+        logger.info(f"Precomputed {len(new_stems)} new stems, {len(ranked)} candidates ranked")
+        return [(candidate, cost) for _, candidate, cost in ranked]
+    
+    def generate_wordlist(self, max_size=50000):
+        """
+        Generate the wordlist based on personal information, keeping the most
+        likely candidates.
+        
+        Candidates are streamed into a bounded top-k selector, so the full set
+        of candidates is never held in memory. Work already done by precompute
+        is reused.
+        
+        Args:
+            max_size (int): Maximum number of words to keep
+        
+        Returns:
+            list: The generated wordlist, most likely candidates first
+        """
+        ranked = self.precompute(max_size)
+        if ranked is None:
+            ranked = select_top_k(self.iter_scored_wordlist(), max_size)
+        final_list = [word for word, _ in ranked]
         logger.info(f"Final wordlist contains {len(final_list)} words")
         
         # Ensure we have at least something in the wordlist
         if not final_list:
             logger.warning("Empty wordlist after filtering. Adding fallback words.")
-            final_list = ["password", "admin", "123456", "qwerty", "welcome"]
+            final_list = list(FALLBACK_WORDS)
         
+        self.wordlist = set(final_list)
         return final_list
     
-    def save_wordlist_to_file(self, filepath=None):
+    def save_wordlist_to_file(self, filepath=None, streaming=False, max_size=None, compression='txt',
+                              spill=False, spill_dir=None):
         """
         Save the generated wordlist to a file.
         
         Args:
             filepath (str, optional): Path to save the file. If None, generates a default path.
+            streaming (bool): Write candidates as they are generated instead of
+                building, sorting and deduplicating the full wordlist in memory
+            max_size (int, optional): Maximum number of words written in streaming or spill mode
+            compression (str): 'txt', 'gz' or 'zst' (see utils.compression)
+            spill (bool): Write the full sorted, deduplicated wordlist through
+                on-disk runs instead of sorting it in memory
+            spill_dir (str, optional): Directory for the run files in spill mode
             
         Returns:
             str: The path to the saved file
@@ -165,15 +879,159 @@ class WordlistGenerator:
         if not filepath:
             # Generate a filename based on timestamp
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filepath = f"custom_wordlist_{timestamp}.txt"
+            filepath = wordlist_filename(f"custom_wordlist_{timestamp}", compression)
+        
+        if streaming:
+            with open_wordlist_writer(filepath, compression) as f:
+                self.write_wordlist(f, max_size=max_size)
+            return filepath
+        
+        if spill:
+            with open_wordlist_writer(filepath, compression) as f:
+                self.write_sorted_wordlist(f, max_size=max_size, spill_dir=spill_dir)
+            return filepath
         
         # Generate wordlist if not already generated
         if not self.wordlist:
             self.generate_wordlist()
         
         # Write to file
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with open_wordlist_writer(filepath, compression) as f:
             for word in sorted(self.wordlist):
                 f.write(f"{word}\n")
                 
         return filepath
+
+    def export_rule_bundle(self, basename=None, directory=None, compression='txt'):
+        """
+        Save the stems and the mangling rules as a base-word list plus one
+        hashcat .rule file per stage of the ruleset, instead of the expanded
+        wordlist.
+        
+        Stacking the rule files over the word list (hashcat -r 1.rule -r 2.rule
+        ...) applies every combination of one rule per file on the cracking
+        machine, so the bundle only holds the sum of the stage sizes rather
+        than their product. Leetspeak is approximated with substitution rules
+        (see LeetEnumerator.to_rules), and only the length part of the filter
+        is applied, to the stems. Stages that leave words unchanged get no file.
+        
+        The rule files are always written uncompressed, since hashcat -r
+        cannot read compressed rule files.
+        
+        Args:
+            basename (str, optional): File name prefix. If None, a timestamped name is used.
+            directory (str, optional): Directory of the files. Defaults to the current directory.
+            compression (str): 'txt', 'gz' or 'zst' for the base-word list (see utils.compression)
+            
+        Returns:
+            dict: 'words' (the word list path), 'rules' (the rule file paths in
+            stacking order), 'word_count', 'rule_counts' (per rule file) and
+            'candidates_per_word' (the product of the rule counts)
+        """
+        if not basename:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            basename = f"custom_bundle_{timestamp}"
+        directory = directory or '.'
+        
+        words_path = os.path.join(directory, wordlist_filename(f"{basename}_words", compression))
+        stems = dict.fromkeys(stem for stem in self.iter_base_combinations() if self._stem_allowed(stem))
+        stage_rules = [rules for rules in self.rules.to_stage_rules() if rules != [(':', 0.0)]]
+        
+        with open_wordlist_writer(words_path, compression) as f:
+            f.write(''.join(f"{stem}\n" for stem in stems))
+        
+        rules_paths = []
+        for number, rules in enumerate(stage_rules, start=1):
+            rules_path = os.path.join(directory, f"{basename}_{number}.rule")
+            with open_wordlist_writer(rules_path, 'txt') as f:
+                f.write(''.join(f"{text}\n" for text, _ in rules))
+            rules_paths.append(rules_path)
+        
+        rule_counts = [len(rules) for rules in stage_rules]
+        candidates_per_word = 1
+        for count in rule_counts:
+            candidates_per_word *= count
+        
+        logger.info(f"Exported {len(stems)} base words to {words_path} and "
+                    f"{'+'.join(map(str, rule_counts))} rules to {len(rules_paths)} rule files")
+        return {
+            'words': words_path,
+            'rules': rules_paths,
+            'word_count': len(stems),
+            'rule_counts': rule_counts,
+            'candidates_per_word': candidates_per_word,
+        }
+
+def _rank_shards(personal_info, token_sources, min_length, rules, candidate_filter, shards, max_size):
+    """
+    Rank some shards of stems in a worker process (see WordlistGenerator.rank_shards).
+    
+    Args:
+        personal_info (dict): The personal information of the parent generator
+        token_sources (dict): The token sources of the parent generator
+        min_length (int): Minimum candidate length
+        rules (RuleSet): The mangling rules of the parent generator
+        candidate_filter (WordlistFilter): The filter of the parent generator, or None
+        shards (range): Indexes of the shards to expand
+        max_size (int): Number of candidates to keep
+        
+    Returns:
+        list: (order, candidate, cost) tuples, most likely first
+    """
+    generator = WordlistGenerator(rules=rules, candidate_filter=candidate_filter)
+    generator.personal_info = personal_info
+    generator.token_sources = token_sources
+    generator.min_length = min_length
+    return generator.rank_shards(shards, max_size)
+
+def _spill_shards(personal_info, token_sources, min_length, rules, candidate_filter, shards, max_size,
+                  directory, run_size):
+    """
+    Stream some shards of stems into ranked runs in a worker process.
+    
+    Args:
+        personal_info (dict): The personal information of the parent generator
+        token_sources (dict): The token sources of the parent generator
+        min_length (int): Minimum candidate length
+        rules (RuleSet): The mangling rules of the parent generator
+        candidate_filter (WordlistFilter): The filter of the parent generator, or None
+        shards (range): Indexes of the shards to expand
+        max_size (int): Number of candidates to keep per run
+        directory (str): Directory of the parent's RankedRunSpiller
+        run_size (int): Number of candidates per run
+        
+    Returns:
+        list: Paths of the run files, owned by the parent from now on
+    """
+    generator = WordlistGenerator(rules=rules, candidate_filter=candidate_filter)
+    generator.personal_info = personal_info
+    generator.token_sources = token_sources
+    generator.min_length = min_length
+    
+    # The runs are deleted by the parent's spiller, which owns the directory
+    spiller = RankedRunSpiller(max_size, directory, run_size=run_size)
+    for shard in shards:
+        spiller.extend(generator._iter_ordered_shard(shard))
+    return spiller.flush()
+
+def _generate_shard(personal_info, token_sources, min_length, rules, candidate_filter, shard):
+    """
+    Expand one shard of stems in a worker process.
+    
+    Args:
+        personal_info (dict): The personal information of the parent generator
+        token_sources (dict): The token sources of the parent generator
+        min_length (int): Minimum candidate length
+        rules (RuleSet): The mangling rules of the parent generator
+        candidate_filter (WordlistFilter): The filter of the parent generator, or None
+        shard (int): Index of the shard to expand
+        
+    Returns:
+        set: The unique candidates of the shard
+    """
+    # Shards are merged into a set by the parent, so per-stem deduplication is enough here
+    generator = WordlistGenerator(rules=rules, candidate_filter=candidate_filter)
+    generator.personal_info = personal_info
+    generator.token_sources = token_sources
+    generator.min_length = min_length
+    return set(generator.iter_wordlist(shard=shard))
@@ -0,0 +1,74 @@
+import pytest
+
+from utils import dedup
+from utils.dedup import BloomDeduplicator, FingerprintDeduplicator, create_deduplicator
+
+
+def words(count, prefix='word'):
+    return [f"{prefix}{index}" for index in range(count)]
+
+
+@pytest.mark.parametrize("backend", ['set', 'fingerprint', 'bloom'])
+def test_added_items_are_always_seen_again(backend):
+    deduplicator = create_deduplicator(backend, capacity=5000)
+    items = words(5000)
+
+    assert all(deduplicator.add(item) for item in items[::2])
+    # Items added earlier are never reported as new, whatever was added since
+    assert not any(deduplicator.add(item) for item in items[::2])
+    assert len(deduplicator) == 2500
+
+
+def test_fingerprint_table_keeps_every_item_while_growing():
+    deduplicator = FingerprintDeduplicator()
+    items = words(20000)
+    sizes = set()
+
+    for count, item in enumerate(items, start=1):
+        assert deduplicator.add(item)
+        sizes.add(len(deduplicator._table))
+        # The table is rehashed before it passes its maximum load
+        assert count <= FingerprintDeduplicator._MAX_LOAD * len(deduplicator._table)
+
+    assert len(sizes) > 1
+    assert len(deduplicator) == sum(1 for slot in deduplicator._table if slot) == len(items)
+    assert not any(deduplicator.add(item) for item in items)
+
+
+def test_fingerprint_table_probes_past_colliding_slots(monkeypatch):
+    # Every fingerprint lands in the same slot, so each lookup walks (and wraps
+    # around) the probe sequence, before and after the table grows
+    fingerprints = {item: (index + 1) << 20 for index, item in enumerate(words(1500))}
+    monkeypatch.setattr(dedup, '_fingerprint', fingerprints.__getitem__)
+    deduplicator = FingerprintDeduplicator()
+
+    assert all(deduplicator.add(item) for item in fingerprints)
+    assert len(deduplicator._table) > 1024
+    assert not any(deduplicator.add(item) for item in fingerprints)
+    assert len(deduplicator) == len(fingerprints)
+
+
+@pytest.mark.parametrize("error_rate", [0.01, 0.05])
+def test_bloom_false_positive_rate_at_capacity(error_rate):
+    capacity = 20000
+    deduplicator = BloomDeduplicator(capacity, error_rate=error_rate)
+    for item in words(capacity):
+        deduplicator.add(item)
+
+    # Each probe is undone so the filter stays at capacity, not above it
+    snapshot = bytes(deduplicator._filter)
+    probes = words(50000, prefix='probe')
+    false_positives = 0
+    for item in probes:
+        if deduplicator.add(item):
+            deduplicator._filter[:] = snapshot
+        else:
+            false_positives += 1
+
+    # Allow for sampling noise (several standard deviations) above the configured rate
+    assert false_positives / len(probes) <= error_rate * 1.3
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown deduplication backend"):
+        create_deduplicator('trie')
@@ -0,0 +1,96 @@
+import io
+import random
+
+import pytest
+
+from core.wordlist_gen import WordlistGenerator
+from utils.external_sort import ExternalSorter, RankedRunSpiller
+from utils.ranking import select_top_k
+from utils.rules import default_ruleset
+
+
+def make_words(count=3000, seed=5):
+    """Random words with duplicates, spaces and characters outside ASCII, including the empty word."""
+    rng = random.Random(seed)
+    alphabet = "ab Z9!éßжλ中€\U0001F600"
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randrange(6))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("run_size", [1, 7, 100, 10000])
+def test_external_sort_matches_sorted(tmp_path, run_size, use_mmap):
+    words = make_words()
+
+    with ExternalSorter(tmp_path, run_size=run_size, use_mmap=use_mmap) as sorter:
+        for word in words[:100]:
+            sorter.add(word)
+        sorter.extend(words[100:])
+        runs = len(sorter.runs)
+        result = list(sorter)
+        # The runs stay on disk, so the result can be read again
+        again = list(sorter)
+
+    assert result == again == sorted(set(words))
+    if run_size <= 100:
+        assert runs > 10
+
+
+def test_external_sort_writes_lines(tmp_path):
+    words = ['b c', 'ä', 'a', 'b c', 'a b', '日本']
+
+    with ExternalSorter(tmp_path, run_size=2) as sorter:
+        sorter.extend(words)
+        sink = io.StringIO()
+        count = sorter.write_sorted(sink)
+        limited = io.StringIO()
+        sorter.write_sorted(limited, max_size=2)
+
+    assert sink.getvalue().split('\n')[:-1] == sorted(set(words))
+    assert count == 5
+    assert limited.getvalue() == 'a\na b\n'
+
+
+def make_stream(count=5000, seed=3):
+    rng = random.Random(seed)
+    return [(f"w{rng.randrange(1500)}", rng.randrange(30) / 4) for _ in range(count)]
+
+
+def test_ranked_runs_match_ranking_in_memory_with_bounded_buffer(tmp_path):
+    stream = make_stream()
+
+    with RankedRunSpiller(200, tmp_path, run_size=300) as spiller:
+        spiller.extend((order, item, cost) for order, (item, cost) in enumerate(stream))
+        ranked = list(spiller)
+        runs = len(spiller.runs)
+
+    assert ranked == select_top_k(stream, 200)
+    assert runs > 10
+    assert spiller.peak <= 300
+
+
+def test_ranked_runs_adopted_from_other_spillers(tmp_path):
+    stream = make_stream()
+    entries = [(order, item, cost) for order, (item, cost) in enumerate(stream)]
+
+    with RankedRunSpiller(100, tmp_path, run_size=500) as spiller:
+        # Entries reach the runs out of order, as they do from worker processes
+        for part in (entries[2500:], entries[:2500]):
+            worker = RankedRunSpiller(100, spiller.directory, run_size=400)
+            worker.extend(part)
+            spiller.adopt(worker.flush())
+        ranked = list(spiller)
+
+    assert ranked == select_top_k(stream, 100)
+
+
+def test_sorted_wordlist_keeps_the_most_likely_words(tmp_path):
+    generator = WordlistGenerator(rules=default_ruleset(leet_budget=0))
+    for category, value in [('name', 'John Smith'), ('birthdate', '15/03/1990'), ('pets', 'Rex')]:
+        generator.add_personal_info(category, value)
+    expected = sorted(generator.generate_wordlist(3000))
+
+    sink = io.StringIO()
+    count = generator.write_sorted_wordlist(sink, max_size=3000, spill_dir=tmp_path, run_size=2000)
+
+    assert count == 3000
+    assert sink.getvalue().split('\n')[:-1] == expected
@@ -0,0 +1,63 @@
+import io
+import itertools
+
+import pytest
+
+from core.mask_gen import MaskGenerator
+
+TOKENS = {'name': ['jo', 'ann', 'jo']}
+CUSTOM_CHARSETS = {'1': 'ab'}
+
+
+def brute_force(positions):
+    """Enumerate a mask by taking every combination of its positions, first position slowest."""
+    return [''.join(parts) for parts in itertools.product(*positions)]
+
+
+@pytest.mark.parametrize("mask, positions", [
+    ('?d', ['0123456789']),
+    ('?1?d', ['ab', '0123456789']),
+    ('x?1-?1', ['x', 'ab', '-', 'ab']),
+    ('{name}?1??', [['jo', 'ann'], 'ab', '?']),
+])
+def test_indexing_matches_brute_force(mask, positions):
+    generator = MaskGenerator(mask, tokens=TOKENS, custom_charsets=CUSTOM_CHARSETS)
+    expected = brute_force(positions)
+
+    assert len(generator) == generator.size == len(expected)
+    assert [generator[index] for index in range(generator.size)] == expected
+    assert generator[-1] == expected[-1]
+    assert list(generator) == expected
+
+
+def test_ranges_and_resumed_writes_match_indexing():
+    generator = MaskGenerator('{name}?1?d', tokens=TOKENS, custom_charsets=CUSTOM_CHARSETS)
+    expected = [generator[index] for index in range(generator.size)]
+
+    # Every slice, including ones crossing a carry into the earlier positions
+    for start in range(generator.size + 1):
+        for stop in range(start, generator.size + 2):
+            assert list(generator.iter_range(start, stop)) == expected[start:stop]
+
+    for start in range(0, generator.size, 7):
+        for max_size in (None, 1, 13):
+            sink = io.StringIO()
+            count = generator.write_wordlist(sink, max_size=max_size, start=start)
+            stop = generator.size if max_size is None else start + max_size
+            assert sink.getvalue().splitlines() == expected[start:stop]
+            assert count == len(expected[start:stop])
+
+
+def test_chunk_ranges_cover_the_mask_once():
+    generator = MaskGenerator('?1?d?1', custom_charsets=CUSTOM_CHARSETS)
+
+    chunks = generator.chunk_ranges(7)
+
+    assert [word for start, stop in chunks for word in generator.iter_range(start, stop)] == list(generator)
+
+
+def test_out_of_range_index_is_rejected():
+    generator = MaskGenerator('?d?d')
+
+    with pytest.raises(IndexError):
+        generator[generator.size]
@@ -0,0 +1,66 @@
+import itertools
+
+import pytest
+
+from core.password_gen import CLASS_CHARS, PasswordPolicy
+
+
+def brute_force(policy):
+    """Enumerate the passwords of a policy by checking every string of its characters."""
+    alphabet = ''.join(policy.char_sets)
+    valid = []
+    for chars in itertools.product(alphabet, repeat=policy.length):
+        password = ''.join(chars)
+        counts = [sum(c in char_set for c in password) for char_set in policy.char_sets]
+        if any(count < low for count, low in zip(counts, policy.min_counts)):
+            continue
+        if any(high is not None and count > high for count, high in zip(counts, policy.max_counts)):
+            continue
+        if any(pattern in password for pattern in policy.forbidden):
+            continue
+        if policy.no_repeat and any(a == b for a, b in zip(password, password[1:])):
+            continue
+        valid.append(password)
+    return valid
+
+
+@pytest.mark.parametrize("options", [
+    dict(length=3, classes=['digit']),
+    dict(length=4, classes=['digit'], forbidden=['12', '000'], no_repeat=True),
+    dict(length=3, classes=['digit', 'special'], min_counts={'digit': 1, 'special': 1}),
+    dict(length=3, classes=['digit', 'special'], max_counts={'special': 1}, forbidden=['9!'],
+         avoid_ambiguous=True),
+    dict(length=4, classes=['digit'], min_counts={'digit': 0}, forbidden=['11', '121'], no_repeat=True),
+])
+def test_unrank_matches_brute_force(options):
+    policy = PasswordPolicy(**options)
+    expected = brute_force(policy)
+
+    unranked = [policy.unrank(index) for index in range(policy.size)]
+
+    assert policy.size == len(expected)
+    assert sorted(unranked) == sorted(expected)
+
+
+def test_unrank_rejects_out_of_range_index():
+    policy = PasswordPolicy(length=3, classes=['digit'])
+
+    with pytest.raises(IndexError):
+        policy.unrank(policy.size)
+
+
+def test_generate_uses_selected_classes():
+    policy = PasswordPolicy(length=12, classes=['lower', 'digit'])
+
+    for password in policy.generate_many(20):
+        assert len(password) == 12
+        assert set(password) <= set(CLASS_CHARS['lower'] + CLASS_CHARS['digit'])
+        assert any(c in CLASS_CHARS['digit'] for c in password)
+
+
+@pytest.mark.parametrize("length, minimum", [(64, 8), (128, 20)])
+def test_policies_over_the_state_budget_are_rejected_quickly(length, minimum):
+    classes = ['lower', 'upper', 'digit', 'special']
+
+    with pytest.raises(ValueError, match="counting states"):
+        PasswordPolicy(length=length, classes=classes, min_counts={name: minimum for name in classes})
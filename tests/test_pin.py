@@ -0,0 +1,47 @@
+import itertools
+
+import pytest
+
+from core.password_gen import PasswordGenerator, pin_space_size, unrank_pin
+
+
+def allowed(pin):
+    """Check a PIN the slow way: no run of three consecutive digits, no digit used too often."""
+    digits = [int(c) for c in pin]
+    for a, b, c in zip(digits, digits[1:], digits[2:]):
+        if b - a == c - b and abs(b - a) == 1:
+            return False
+    return max(pin.count(d) for d in set(pin)) <= len(pin) // 2
+
+
+def brute_force(length):
+    return [''.join(digits) for digits in itertools.product('0123456789', repeat=length)
+            if allowed(''.join(digits))]
+
+
+@pytest.mark.parametrize("length", [3, 4, 5])
+def test_space_size_matches_brute_force(length):
+    assert pin_space_size(length) == len(brute_force(length))
+
+
+@pytest.mark.parametrize("length", [3, 4])
+def test_unrank_lists_allowed_pins_in_order(length):
+    expected = brute_force(length)
+
+    assert [unrank_pin(index, length) for index in range(len(expected))] == expected
+
+
+def test_unrank_without_patterns_is_the_number():
+    assert pin_space_size(4, avoid_patterns=False) == 10000
+    assert unrank_pin(42, 4, avoid_patterns=False) == "0042"
+
+
+def test_unrank_rejects_out_of_range_index():
+    with pytest.raises(IndexError):
+        unrank_pin(pin_space_size(4), 4)
+
+
+def test_generated_pins_are_allowed():
+    for _ in range(50):
+        pin = PasswordGenerator.generate_pin(6)
+        assert len(pin) == 6 and allowed(pin)
@@ -0,0 +1,70 @@
+from core.wordlist_gen import WordlistGenerator
+from utils.ranking import select_top_k
+from utils.rules import default_ruleset
+from utils.tokens import keyboard_walks
+
+ANSWERS = [
+    ('name', 'John Smith'),
+    ('birthdate', '15/03/1990'),
+    ('pets', 'Rex'),
+    ('additional', 'qwerty 1990'),
+]
+
+MAX_SIZE = 2000
+
+
+def make_generator():
+    generator = WordlistGenerator(rules=default_ruleset(leet_budget=0))
+    generator.add_token_source('keyboard', keyboard_walks(3))
+    return generator
+
+
+def full_ranking(answers):
+    generator = make_generator()
+    for category, value in answers:
+        generator.add_personal_info(category, value)
+    return select_top_k(generator.iter_scored_wordlist(), MAX_SIZE)
+
+
+def test_precompute_after_each_answer_equals_a_full_run():
+    generator = make_generator()
+    for category, value in ANSWERS:
+        generator.add_personal_info(category, value)
+        generator.precompute(MAX_SIZE)
+
+    assert generator.precompute(MAX_SIZE) == full_ranking(ANSWERS)
+
+
+def test_precompute_starts_over_when_a_category_is_replaced():
+    generator = make_generator()
+    for category, value in ANSWERS[:3]:
+        generator.add_personal_info(category, value)
+        generator.precompute(MAX_SIZE)
+    generator.add_personal_info('pets', 'Max')
+
+    answers = ANSWERS[:2] + [('pets', 'Max')]
+    assert generator.precompute(MAX_SIZE) == full_ranking(answers)
+
+
+def test_generate_wordlist_uses_the_precomputed_ranking():
+    generator = make_generator()
+    for category, value in ANSWERS:
+        generator.add_personal_info(category, value)
+        generator.precompute(MAX_SIZE)
+
+    assert generator.generate_wordlist(MAX_SIZE) == [word for word, _ in full_ranking(ANSWERS)]
+
+
+def test_precomputed_wordlist_equals_a_fresh_ranked_wordlist():
+    # The ranked mode of the bot: precompute after each answer, then
+    # generate_wordlist at the same size as the precomputation
+    generator = make_generator()
+    for category, value in ANSWERS:
+        generator.add_personal_info(category, value)
+        generator.precompute(MAX_SIZE)
+
+    fresh = make_generator()
+    for category, value in ANSWERS:
+        fresh.add_personal_info(category, value)
+
+    assert generator.generate_wordlist(MAX_SIZE) == fresh.generate_wordlist(MAX_SIZE)
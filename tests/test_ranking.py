@@ -0,0 +1,31 @@
+import random
+
+from utils.ranking import TopK, select_top_k, select_top_k_ordered
+
+
+def make_stream(count=2000, seed=7):
+    rng = random.Random(seed)
+    # Few distinct items and costs, so repeats and ties are common
+    return [(f"word{rng.randrange(300)}", rng.randrange(20) / 2) for _ in range(count)]
+
+
+def test_folding_shards_in_any_order_matches_the_serial_ranking():
+    stream = make_stream()
+    expected = select_top_k(stream, 50)
+
+    shards = [list(enumerate(stream))[start:start + 250] for start in range(0, len(stream), 250)]
+    kept = [select_top_k_ordered(((order, item, cost) for order, (item, cost) in shard), 50)
+            for shard in shards]
+    top = TopK(50)
+    for entries in reversed(kept):
+        top.update(entries)
+
+    assert [(item, cost) for _, item, cost in top.result()] == expected
+
+
+def test_top_k_keeps_the_lowest_cost_of_a_repeated_item():
+    top = TopK(2)
+    top.update([(0, 'a', 3.0), (1, 'b', 2.0), (2, 'a', 1.0), (3, 'c', 2.0)])
+
+    assert top.result() == [(2, 'a', 1.0), (1, 'b', 2.0)]
+    assert len(top) == 2
@@ -0,0 +1,95 @@
+import itertools
+
+import pytest
+
+from utils.rules import Rule, RuleSet, parse_rule
+
+# Expected outputs as given by hashcat for the same rule and word
+HASHCAT_CASES = [
+    (':', 'p@ssW0rd', 'p@ssW0rd'),
+    ('l', 'p@ssW0rd', 'p@ssw0rd'),
+    ('u', 'p@ssW0rd', 'P@SSW0RD'),
+    ('c', 'p@ssW0rd', 'P@ssw0rd'),
+    ('C', 'p@ssW0rd', 'p@SSW0RD'),
+    ('t', 'p@ssW0rd', 'P@SSw0RD'),
+    ('r', 'p@ssW0rd', 'dr0Wss@p'),
+    ('d', 'p@ssW0rd', 'p@ssW0rdp@ssW0rd'),
+    ('f', 'p@ssW0rd', 'p@ssW0rddr0Wss@p'),
+    ('{', 'p@ssW0rd', '@ssW0rdp'),
+    ('}', 'p@ssW0rd', 'dp@ssW0r'),
+    ('[', 'p@ssW0rd', '@ssW0rd'),
+    (']', 'p@ssW0rd', 'p@ssW0r'),
+    ('E', 'p@ssW0rd w0rld', 'P@ssw0rd W0rld'),
+    ('$1', 'p@ssW0rd', 'p@ssW0rd1'),
+    ('^1', 'p@ssW0rd', '1p@ssW0rd'),
+    ('@s', 'p@ssW0rd', 'p@W0rd'),
+    ('ss$', 'p@ssW0rd', 'p@$$W0rd'),
+    ('T3', 'p@ssW0rd', 'p@sSW0rd'),
+    ('TA', 'p@ssW0rd', 'p@ssW0rd'),
+    ('D3', 'p@ssW0rd', 'p@sW0rd'),
+    ('D9', 'p@ssW0rd', 'p@ssW0rd'),
+    ("'6", 'p@ssW0rd', 'p@ssW0'),
+    ("'9", 'p@ssW0rd', 'p@ssW0rd'),
+    # Runs of appends, prepends and substitutions are fused but keep their order
+    ('$1$2$3', 'p@ssW0rd', 'p@ssW0rd123'),
+    ('^3^2^1', 'p@ssW0rd', '123p@ssW0rd'),
+    ('sa4 s4A', 'a4', 'AA'),
+    ('c $!', 'password', 'Password!'),
+    ('u r ]', 'abc', 'CB'),
+    ('', 'abc', 'abc'),
+]
+
+
+@pytest.mark.parametrize("text, word, expected", HASHCAT_CASES)
+def test_apply_matches_hashcat(text, word, expected):
+    assert Rule(text).apply(word) == expected
+
+
+@pytest.mark.parametrize("text, message", [
+    ('$', "needs a character"),
+    ('c^', "needs a character"),
+    ('T', "needs a position"),
+    ("'", "needs a position"),
+    ('T!', "Invalid position"),
+    ('Dz', "Invalid position"),
+    ('sa', "needs two characters"),
+    ('Q', "Unsupported function"),
+    ('c x', "Unsupported function"),
+])
+def test_invalid_rules_are_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_rule(text)
+
+
+def test_parse_rule_decodes_arguments():
+    assert parse_rule("c $1 sa@ TB") == [('c', None), ('$', '1'), ('s', ('a', '@')), ('T', 11)]
+
+
+@pytest.mark.parametrize("text, suffix, preserves_length", [
+    ('$1$2', '12', False),
+    (':', '', True),
+    ('c', None, True),
+    ('sa@ T0', None, True),
+    ('D0', None, False),
+])
+def test_rule_properties(text, suffix, preserves_length):
+    rule = Rule(text)
+
+    assert rule.suffix == suffix
+    assert rule.preserves_length == preserves_length
+
+
+def test_stacked_stage_rules_equal_the_flattened_rules():
+    ruleset = RuleSet([[Rule(':'), Rule('c'), Rule('u')], [Rule(':'), Rule('$1'), Rule('$!')]])
+    words = ['pass', 'Word']
+
+    # hashcat -r 1.rule -r 2.rule applies one rule of each file in turn
+    stacked = {
+        Rule(second).apply(Rule(first).apply(word))
+        for word in words
+        for (first, _), (second, _) in itertools.product(*ruleset.to_stage_rules())
+    }
+    flattened = {Rule(text).apply(word) for word in words for text, _ in ruleset.to_rules()}
+
+    assert [len(rules) for rules in ruleset.to_stage_rules()] == [3, 3]
+    assert stacked == flattened
@@ -0,0 +1,188 @@
+import os
+import hmac
+import json
+import time
+import zlib
+import struct
+import hashlib
+import logging
+import itertools
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+_NONCE_SIZE = 16
+_TAG_SIZE = 32
+_BLOCK_SIZE = 64
+# Authenticated plaintext header: creation time as a big-endian double
+_HEADER = struct.Struct('>d')
+
+class WordlistCache:
+    """
+    On-disk cache of finished wordlists, keyed by a canonical hash of the profile.
+
+    File names are HMAC-SHA256 digests of the profile, so they reveal nothing
+    about the personal information. Contents are compressed and then encrypted
+    with a BLAKE2b keystream in counter mode and authenticated with
+    HMAC-SHA256 (encrypt-then-MAC). Entries expire after ttl seconds, and the
+    least recently used entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, directory, secret=None, max_bytes=100 * 1024 * 1024, ttl=3600):
+        """
+        Args:
+            directory (str): Directory holding the cache entries
+            secret (bytes or str, optional): Key material. Without it a random key is
+                used, so entries are only readable by the current process.
+            max_bytes (int): Size budget of the cache
+            ttl (float): Lifetime of an entry in seconds
+        """
+        if not secret:
+            secret = os.urandom(32)
+        elif isinstance(secret, str):
+            secret = secret.encode('utf-8')
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # Separate keys for naming, encryption and authentication
+        self._key_name = hmac.new(secret, b'wordlist-cache:name', hashlib.sha256).digest()
+        self._key_encrypt = hmac.new(secret, b'wordlist-cache:encrypt', hashlib.sha256).digest()
+        self._key_mac = hmac.new(secret, b'wordlist-cache:mac', hashlib.sha256).digest()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def make_key(self, profile):
+        """
+        Derive the cache key of a profile.
+
+        Args:
+            profile (dict): JSON-serialisable description of the personal
+                information and generator settings
+
+        Returns:
+            str: Hex digest used as the entry name
+        """
+        canonical = json.dumps(profile, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hmac.new(self._key_name, canonical.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _keystream_xor(self, nonce, data):
+        """Encrypt or decrypt data with the BLAKE2b counter-mode keystream."""
+        blocks = (len(data) + _BLOCK_SIZE - 1) // _BLOCK_SIZE
+        keystream = b''.join(
+            hashlib.blake2b(nonce + counter.to_bytes(8, 'big'), key=self._key_encrypt).digest()
+            for counter in range(blocks)
+        )[:len(data)]
+        mixed = int.from_bytes(data, 'big') ^ int.from_bytes(keystream, 'big')
+        return mixed.to_bytes(len(data), 'big')
+
+    def get(self, key):
+        """
+        Read a wordlist from the cache.
+
+        Args:
+            key (str): Key from make_key
+
+        Returns:
+            list: The cached words, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+
+        nonce, ciphertext, tag = blob[:_NONCE_SIZE], blob[_NONCE_SIZE:-_TAG_SIZE], blob[-_TAG_SIZE:]
+        expected = hmac.new(self._key_mac, nonce + ciphertext, hashlib.sha256).digest()
+        if len(ciphertext) < _HEADER.size or not hmac.compare_digest(tag, expected):
+            # Written with another key or corrupted
+            logger.warning(f"Discarding unreadable cache entry {key[:12]}")
+            self._remove(path)
+            return None
+
+        plaintext = self._keystream_xor(nonce, ciphertext)
+        (created,) = _HEADER.unpack_from(plaintext)
+        if time.time() - created > self.ttl:
+            logger.info(f"Cache entry {key[:12]} expired")
+            self._remove(path)
+            return None
+
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+        words = zlib.decompress(plaintext[_HEADER.size:]).decode('utf-8').splitlines()
+        logger.info(f"Cache hit for {key[:12]} ({len(words)} words)")
+        return words
+
+    def put(self, key, words):
+        """
+        Store a wordlist in the cache and evict entries over the size budget.
+
+        Args:
+            key (str): Key from make_key
+            words (iterable): The words to store
+        """
+        # Compress in batches so only the compressed form is held in memory
+        compressor = zlib.compressobj(6)
+        chunks = [_HEADER.pack(time.time())]
+        words = iter(words)
+        while True:
+            batch = list(itertools.islice(words, 10000))
+            if not batch:
+                break
+            chunks.append(compressor.compress(''.join(f"{word}\n" for word in batch).encode('utf-8')))
+        chunks.append(compressor.flush())
+        plaintext = b''.join(chunks)
+
+        nonce = os.urandom(_NONCE_SIZE)
+        ciphertext = self._keystream_xor(nonce, plaintext)
+        tag = hmac.new(self._key_mac, nonce + ciphertext, hashlib.sha256).digest()
+
+        # Write to a temporary name first so readers never see a partial entry
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(nonce + ciphertext + tag)
+        os.replace(temp_path, path)
+
+        logger.info(f"Cached wordlist {key[:12]} ({len(ciphertext)} bytes)")
+        self.evict()
+
+    def evict(self):
+        """
+        Remove expired entries, then the least recently used ones until the
+        cache fits in max_bytes.
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # Entries untouched for longer than the TTL are necessarily expired
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove cache entry {path}: {str(e)}")
@@ -1,43 +1,251 @@
 import datetime
+import itertools
+from functools import lru_cache
 
-def apply_leetspeak(word):
+# Leetspeak replacements for each lowercase character
+LEETSPEAK_MAP = {
+    'a': ['4', '@'],
+    'b': ['8'],
+    'e': ['3'],
+    'g': ['6', '9'],
+    'i': ['1', '!'],
+    'l': ['1'],
+    'o': ['0'],
+    's': ['5', '$'],
+    't': ['7', '+'],
+    'z': ['2']
+}
+
+# Number patterns appended together with years
+YEAR_PATTERNS = ["123", "1234", "12345", "123456"]
+
+# Special characters and combinations appended to words
+SPECIAL_CHARS = ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')', '-', '_', '+', '=', '.', ',', '?']
+SPECIAL_CHAR_COMBINATIONS = ['!@', '!@#', '123', '123!', '!123', '!!!', '###']
+
+# Suffix tuples of the append functions, built once
+_YEAR_PATTERN_SUFFIXES = tuple(YEAR_PATTERNS)
+_SPECIAL_SUFFIXES = tuple(SPECIAL_CHARS + SPECIAL_CHAR_COMBINATIONS)
+
+@lru_cache(maxsize=4)
+def _year_suffixes(current_year):
+    years = [str(year) for year in range(current_year - 30, current_year + 6)]
+    return tuple(years + [year[-2:] for year in years])
+
+def get_common_years():
+    """
+    Get the common years appended to words: the last 30 years and the next 5 years.
+    
+    Returns:
+        list: Four-digit years as strings, followed by their two-digit forms
+    """
+    return list(_year_suffixes(datetime.datetime.now().year))
+
+def write_suffix_product(sink, stems, suffixes):
+    """
+    Write every stem followed by every suffix, one candidate per line.
+    
+    Each stem is written as a single "stem+suffix" block joined in C, so no
+    Python object is created per candidate.
+    
+    Args:
+        sink: A file-like object opened for writing text
+        stems (iterable): The stems, written in order
+        suffixes (sequence): The suffixes appended to every stem
+        
+    Returns:
+        int: The number of candidates written
+    """
+    if not suffixes:
+        return 0
+    
+    count = 0
+    for stem in stems:
+        sink.write(stem + ('\n' + stem).join(suffixes) + '\n')
+        count += len(suffixes)
+    return count
+
+class LeetEnumerator:
+    """
+    Enumerate leetspeak variations of a word by substituting individual positions.
+    
+    Up to max_substitutions leetable positions are replaced, each with every
+    replacement in LEETSPEAK_MAP; the case of untouched characters is kept.
+    Words with more leetable positions than the budget also get the "full"
+    variations that replace every position at once, computed with str.maketrans
+    tables built in advance. Each variation is generated exactly once, so the
+    cost per word is bounded by sum(C(n, k) * choices^k) for k <= budget.
+    """
+    
+    # Every replacement is a single character
+    preserves_length = True
+    
+    def __init__(self, max_substitutions=2, weight=1.5):
+        """
+        Args:
+            max_substitutions (int, optional): Maximum number of positions replaced
+                in one variation, or None to enumerate every combination
+            weight (float): Ranking cost of each replaced character
+        """
+        self.max_substitutions = max_substitutions
+        self.weight = weight
+        
+        # Replacements for both cases of every leetable character
+        self.options = {}
+        for char, replacements in LEETSPEAK_MAP.items():
+            self.options[char] = tuple(replacements)
+            self.options[char.upper()] = tuple(replacements)
+        
+        # Table i replaces every leetable character with its i-th replacement (or its last one)
+        widest = max(len(replacements) for replacements in LEETSPEAK_MAP.values())
+        self.full_tables = [
+            str.maketrans({char: replacements[min(i, len(replacements) - 1)]
+                           for char, replacements in self.options.items()})
+            for i in range(widest)
+        ]
+    
+    def __repr__(self):
+        return f"LeetEnumerator({self.max_substitutions!r}, weight={self.weight!r})"
+    
+    def leetable_positions(self, word):
+        """
+        Get the positions of a word that have leetspeak replacements.
+        
+        Args:
+            word (str): The word to inspect
+            
+        Returns:
+            list: Indexes of leetable characters
+        """
+        options = self.options
+        return [i for i, char in enumerate(word) if char in options]
+    
+    def expand(self, word):
+        """
+        Enumerate the leetspeak variations of a word.
+        
+        Args:
+            word (str): The word to transform
+            
+        Returns:
+            list: The word followed by its distinct leetspeak variations
+        """
+        return [variation for variation, _ in self._enumerate(word)]
+    
+    def expand_scored(self, word):
+        """
+        Enumerate the leetspeak variations of a word with their ranking cost.
+        
+        Args:
+            word (str): The word to transform
+            
+        Returns:
+            list: (variation, cost) tuples; the cost grows with the number of replacements
+        """
+        return [(variation, count * self.weight) for variation, count in self._enumerate(word)]
+    
+    def estimate(self, word):
+        """
+        Count the variations expand would return, without generating them.
+        
+        Args:
+            word (str): The word to transform
+            
+        Returns:
+            int: The exact number of variations, including the word itself
+        """
+        positions = self.leetable_positions(word)
+        budget = len(positions) if self.max_substitutions is None else min(self.max_substitutions, len(positions))
+        
+        # Elementary symmetric sums of the replacement counts: sums[k] is the
+        # number of variations replacing exactly k positions
+        sums = [1] + [0] * budget
+        for i in positions:
+            choices = len(self.options[word[i]])
+            for k in range(budget, 0, -1):
+                sums[k] += sums[k - 1] * choices
+        
+        total = sum(sums)
+        if budget < len(positions):
+            total += len({word.translate(table) for table in self.full_tables})
+        return total
+    
+    def to_rules(self):
+        """
+        Approximate the enumerator with hashcat substitution rules, for rule-file export.
+        
+        Rules work on characters rather than positions, so each rule replaces
+        every occurrence of up to max_substitutions distinct letters (in both
+        cases); the rules replacing every letter at once are added as well.
+        
+        Returns:
+            list: (rule text, weight) tuples, starting with the identity rule ':'
+        """
+        substitutions = [
+            (char, replacement)
+            for char, replacements in LEETSPEAK_MAP.items()
+            for replacement in replacements
+        ]
+        budget = len(LEETSPEAK_MAP) if self.max_substitutions is None else self.max_substitutions
+        
+        rules = {':': 0.0}
+        for count in range(1, budget + 1):
+            for chosen in itertools.combinations(substitutions, count):
+                # One replacement per letter
+                if len({char for char, _ in chosen}) < count:
+                    continue
+                text = ''.join(f"s{char}{replacement}s{char.upper()}{replacement}" for char, replacement in chosen)
+                rules.setdefault(text, count * self.weight)
+        
+        widest = max(len(replacements) for replacements in LEETSPEAK_MAP.values())
+        for i in range(widest):
+            text = ''.join(
+                f"s{char}{replacements[min(i, len(replacements) - 1)]}s{char.upper()}{replacements[min(i, len(replacements) - 1)]}"
+                for char, replacements in LEETSPEAK_MAP.items()
+            )
+            rules.setdefault(text, len(LEETSPEAK_MAP) * self.weight)
+        return list(rules.items())
+    
+    def _enumerate(self, word):
+        """
+        Yield every variation together with the number of replaced characters.
+        """
+        positions = self.leetable_positions(word)
+        budget = len(positions) if self.max_substitutions is None else min(self.max_substitutions, len(positions))
+        yield word, 0
+        
+        for count in range(1, budget + 1):
+            for chosen in itertools.combinations(positions, count):
+                choices = [self.options[word[i]] for i in chosen]
+                for replacement in itertools.product(*choices):
+                    chars = list(word)
+                    for i, char in zip(chosen, replacement):
+                        chars[i] = char
+                    yield ''.join(chars), count
+        
+        # Beyond the budget, only add the variations that replace everything
+        if budget < len(positions):
+            for variation in dict.fromkeys(word.translate(table) for table in self.full_tables):
+                yield variation, len(positions)
+
+# Shared enumerator used by apply_leetspeak
+_default_leet_enumerator = LeetEnumerator()
+
+def apply_leetspeak(word, max_substitutions=2):
     """
     Apply leetspeak transformations to a word.
     
     Args:
         word (str): The word to transform
+        max_substitutions (int, optional): Maximum number of characters replaced
+            in one variation, or None for every combination
         
     Returns:
-        list: List of leetspeak variations
+        list: The word and its distinct leetspeak variations
     """
-    leetspeak_map = {
-        'a': ['4', '@'],
-        'b': ['8'],
-        'e': ['3'],
-        'g': ['6', '9'],
-        'i': ['1', '!'],
-        'l': ['1'],
-        'o': ['0'],
-        's': ['5', '$'],
-        't': ['7', '+'],
-        'z': ['2']
-    }
-    
-    variations = [word]
-    
-    # Apply leetspeak transformations one character at a time
-    for char, replacements in leetspeak_map.items():
-        current_variations = list(variations)  # Make a copy
-        
-        for variation in current_variations:
-            if char in variation.lower():
-                for replacement in replacements:
-                    # Replace the character with its leetspeak equivalent
-                    new_variation = variation.lower().replace(char, replacement)
-                    variations.append(new_variation)
-    
-    # Remove duplicates and the original word
-    return list(set(variations))
+    if max_substitutions == _default_leet_enumerator.max_substitutions:
+        return _default_leet_enumerator.expand(word)
+    return LeetEnumerator(max_substitutions).expand(word)
 
 def append_years(word):
     """
@@ -49,28 +257,9 @@ def append_years(word):
     Returns:
         list: List of variations with years appended
     """
-    variations = []
-    current_year = datetime.datetime.now().year
-    
-    # Common years: last 30 years and next 5 years
-    years = list(range(current_year - 30, current_year + 6))
-    
-    # Also add common two-digit year formats
-    two_digit_years = [str(year)[-2:] for year in years]
-    
-    # Generate variations with full years
-    for year in years:
-        variations.append(f"{word}{year}")
-    
-    # Generate variations with two-digit years
-    for year in two_digit_years:
-        variations.append(f"{word}{year}")
-    
-    # Also include common year patterns
-    for pattern in ["123", "1234", "12345", "123456"]:
-        variations.append(f"{word}{pattern}")
-    
-    return variations
+    # Common years in four- and two-digit formats, then common year patterns
+    years = _year_suffixes(datetime.datetime.now().year)
+    return [f"{word}{suffix}" for suffix in years + _YEAR_PATTERN_SUFFIXES]
 
 def create_case_variations(word):
     """
@@ -117,16 +306,5 @@ def append_special_chars(word):
     Returns:
         list: List of variations with special characters appended
     """
-    variations = []
-    special_chars = ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')', '-', '_', '+', '=', '.', ',', '?']
-    
-    # Append single special characters
-    for char in special_chars:
-        variations.append(f"{word}{char}")
-    
-    # Append common combinations of special characters
-    common_combinations = ['!@', '!@#', '123', '123!', '!123', '!!!', '###']
-    for combo in common_combinations:
-        variations.append(f"{word}{combo}")
-    
-    return variations
+    # Single special characters, then common combinations
+    return [f"{word}{suffix}" for suffix in _SPECIAL_SUFFIXES]
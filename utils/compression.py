@@ -0,0 +1,90 @@
+import io
+import gzip
+import logging
+
+# zstd support is optional
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# File extension of every wordlist format
+WORDLIST_FORMATS = {
+    'txt': '.txt',
+    'gz': '.txt.gz',
+    'zst': '.txt.zst',
+}
+
+def available_formats():
+    """
+    Get the wordlist formats supported by the installed libraries.
+
+    Returns:
+        list: Format names usable with open_wordlist_writer
+    """
+    return [fmt for fmt in WORDLIST_FORMATS if fmt != 'zst' or zstandard is not None]
+
+def wordlist_filename(basename, fmt='txt'):
+    """
+    Add the extension of a format to a file name.
+
+    Args:
+        basename (str): File name without extension
+        fmt (str): One of WORDLIST_FORMATS
+
+    Returns:
+        str: The file name with its extension
+    """
+    return f"{basename}{WORDLIST_FORMATS[fmt]}"
+
+def _check_format(fmt):
+    if fmt not in WORDLIST_FORMATS:
+        raise ValueError(f"Unknown wordlist format '{fmt}'. Choose one of: {', '.join(WORDLIST_FORMATS)}")
+    if fmt == 'zst' and zstandard is None:
+        raise ValueError("zstd compression requires the 'zstandard' package")
+
+def open_wordlist_writer(filepath, fmt='txt', level=None):
+    """
+    Open a text stream that compresses wordlist lines as they are written.
+
+    Args:
+        filepath (str): Path of the output file
+        fmt (str): 'txt', 'gz' or 'zst'
+        level (int, optional): Compression level; defaults to 6 for gzip and 10 for zstd
+
+    Returns:
+        A writable text file object; close it (or use it as a context manager)
+        to flush the compressed stream
+    """
+    _check_format(fmt)
+
+    if fmt == 'gz':
+        return gzip.open(filepath, 'wt', encoding='utf-8', compresslevel=level or 6)
+    if fmt == 'zst':
+        compressor = zstandard.ZstdCompressor(level=level or 10)
+        raw = open(filepath, 'wb')
+        return io.TextIOWrapper(compressor.stream_writer(raw, closefd=True), encoding='utf-8')
+    return open(filepath, 'w', encoding='utf-8')
+
+def open_wordlist_reader(filepath, fmt='txt'):
+    """
+    Open a wordlist written by open_wordlist_writer for reading.
+
+    Args:
+        filepath (str): Path of the file
+        fmt (str): 'txt', 'gz' or 'zst'
+
+    Returns:
+        A readable text file object
+    """
+    _check_format(fmt)
+
+    if fmt == 'gz':
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    if fmt == 'zst':
+        raw = open(filepath, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding='utf-8')
+    return open(filepath, 'r', encoding='utf-8')
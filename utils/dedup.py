@@ -0,0 +1,190 @@
+import math
+import logging
+from array import array
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Python's string hash is a 64-bit SipHash on 64-bit builds, randomized per process,
+# which is all a deduplicator that lives for a single run needs
+_MASK64 = (1 << 64) - 1
+
+def _fingerprint(item):
+    """
+    Get a non-zero 64-bit fingerprint of an item.
+
+    Args:
+        item (str): The item to fingerprint
+
+    Returns:
+        int: The fingerprint, never 0 (0 marks an empty slot)
+    """
+    return (hash(item) & _MASK64) or 1
+
+class SetDeduplicator:
+    """Exact deduplication that keeps every item in a Python set."""
+
+    def __init__(self, capacity=None):
+        self._seen = set()
+
+    def add(self, item):
+        """
+        Record an item.
+
+        Args:
+            item (str): The item to record
+
+        Returns:
+            bool: True if the item had not been seen before
+        """
+        if item in self._seen:
+            return False
+        self._seen.add(item)
+        return True
+
+    def __len__(self):
+        return len(self._seen)
+
+class FingerprintDeduplicator:
+    """
+    Deduplication through an open-addressing hash table of 64-bit fingerprints.
+
+    Each slot is 8 bytes in a compact array, so memory is about 11-21 bytes per
+    item depending on the load. Two different items only collide if their
+    fingerprints are equal, which is negligible at wordlist sizes.
+    """
+
+    _MAX_LOAD = 0.75
+
+    def __init__(self, capacity=None):
+        size = 1024
+        target = int((capacity or 0) / self._MAX_LOAD) + 1
+        while size < target:
+            size *= 2
+
+        self._table = array('Q', [0]) * size
+        self._mask = size - 1
+        self._count = 0
+
+    def _insert(self, fingerprint):
+        table = self._table
+        mask = self._mask
+        slot = fingerprint & mask
+        while True:
+            current = table[slot]
+            if current == 0:
+                table[slot] = fingerprint
+                return True
+            if current == fingerprint:
+                return False
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        old_table = self._table
+        self._table = array('Q', [0]) * (2 * len(old_table))
+        self._mask = len(self._table) - 1
+        for fingerprint in old_table:
+            if fingerprint:
+                self._insert(fingerprint)
+        logger.debug(f"Grew fingerprint table to {len(self._table)} slots")
+
+    def add(self, item):
+        """
+        Record an item.
+
+        Args:
+            item (str): The item to record
+
+        Returns:
+            bool: True if the item had not been seen before
+        """
+        if self._insert(_fingerprint(item)):
+            self._count += 1
+            if self._count > self._MAX_LOAD * len(self._table):
+                self._grow()
+            return True
+        return False
+
+    def __len__(self):
+        return self._count
+
+class BloomDeduplicator:
+    """
+    Approximate deduplication through a Bloom filter.
+
+    A new item is wrongly reported as seen with probability error_rate once
+    capacity items have been added, so a few unique candidates are dropped in
+    exchange for roughly 1.2 bytes per item at a 1% error rate.
+    """
+
+    def __init__(self, capacity=None, error_rate=0.001):
+        if not 0 < error_rate < 1:
+            raise ValueError("Bloom filter error rate must be between 0 and 1")
+
+        capacity = max(capacity or 100000, 1)
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+
+        self._bits = bits
+        self._hash_count = max(1, round(bits / capacity * math.log(2)))
+        self._filter = bytearray((bits + 7) // 8)
+        self._count = 0
+
+    def add(self, item):
+        """
+        Record an item.
+
+        Args:
+            item (str): The item to record
+
+        Returns:
+            bool: True if the item had (probably) not been seen before
+        """
+        fingerprint = _fingerprint(item)
+        # Kirsch-Mitzenmacher double hashing from the two halves of the fingerprint
+        position = fingerprint & 0xFFFFFFFF
+        step = (fingerprint >> 32) | 1
+
+        new = False
+        bits = self._bits
+        bit_filter = self._filter
+        for _ in range(self._hash_count):
+            bit = position % bits
+            mask = 1 << (bit & 7)
+            byte = bit >> 3
+            if not bit_filter[byte] & mask:
+                bit_filter[byte] |= mask
+                new = True
+            position += step
+
+        if new:
+            self._count += 1
+        return new
+
+    def __len__(self):
+        return self._count
+
+DEDUP_BACKENDS = {
+    'set': SetDeduplicator,
+    'fingerprint': FingerprintDeduplicator,
+    'bloom': BloomDeduplicator,
+}
+
+def create_deduplicator(backend, capacity=None, error_rate=0.001):
+    """
+    Create a deduplicator by backend name.
+
+    Args:
+        backend (str): One of 'set', 'fingerprint' or 'bloom'
+        capacity (int, optional): Expected number of unique items
+        error_rate (float): False-positive rate of the 'bloom' backend
+
+    Returns:
+        An object with add(item) -> bool and len()
+    """
+    if backend not in DEDUP_BACKENDS:
+        raise ValueError(f"Unknown deduplication backend '{backend}'. "
+                         f"Choose one of: {', '.join(DEDUP_BACKENDS)}")
+
+    if backend == 'bloom':
+        return BloomDeduplicator(capacity, error_rate=error_rate)
+    return DEDUP_BACKENDS[backend](capacity)
@@ -0,0 +1,381 @@
+import os
+import mmap
+import heapq
+import shutil
+import struct
+import logging
+import tempfile
+
+from utils.dedup import FingerprintDeduplicator
+from utils.ranking import TopK
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Every record of a run is its UTF-8 length followed by the encoded string
+_LENGTH = struct.Struct('>I')
+_READ_SIZE = 1 << 20
+
+# Records of a ranked run are prefixed with the cost and order key of the string
+_SCORED = struct.Struct('>dqI')
+
+def write_run(path, items):
+    """
+    Write strings to a run file in the length-prefixed binary format.
+
+    Args:
+        path (str): Path of the run file
+        items (iterable): The strings to write, in the order they should be read back
+
+    Returns:
+        int: The number of records written
+    """
+    count = 0
+    pack = _LENGTH.pack
+    with open(path, 'wb', buffering=_READ_SIZE) as f:
+        for item in items:
+            data = item.encode('utf-8')
+            f.write(pack(len(data)))
+            f.write(data)
+            count += 1
+    return count
+
+def iter_run(path, use_mmap=False):
+    """
+    Read the strings of a run file back in order.
+
+    Args:
+        path (str): Path of the run file
+        use_mmap (bool): Memory-map the file instead of reading it in blocks,
+            which lets the OS share and drop pages of runs that are re-read
+
+    Yields:
+        str: The records of the run
+    """
+    for _, item in _iter_records(path, _LENGTH, use_mmap):
+        yield item
+
+def write_scored_run(path, entries):
+    """
+    Write scored strings to a ranked run file.
+
+    Args:
+        path (str): Path of the run file
+        entries (iterable): (order, item, cost) tuples, in the order they should be read back
+
+    Returns:
+        int: The number of records written
+    """
+    count = 0
+    pack = _SCORED.pack
+    with open(path, 'wb', buffering=_READ_SIZE) as f:
+        for order, item, cost in entries:
+            data = item.encode('utf-8')
+            f.write(pack(cost, order, len(data)))
+            f.write(data)
+            count += 1
+    return count
+
+def iter_scored_run(path, use_mmap=False):
+    """
+    Read the entries of a ranked run file back in order.
+
+    Args:
+        path (str): Path of the run file
+        use_mmap (bool): Memory-map the file (see iter_run)
+
+    Yields:
+        tuple: (cost, order, item), so that runs merge on (cost, order)
+    """
+    for (cost, order), item in _iter_records(path, _SCORED, use_mmap):
+        yield cost, order, item
+
+def _iter_records(path, record, use_mmap):
+    """
+    Read the records of a run file whose header struct ends with the UTF-8 length.
+
+    Yields:
+        tuple: (header fields before the length, decoded string)
+    """
+    unpack_from = record.unpack_from
+    header = record.size
+
+    if use_mmap:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                position = 0
+                end = len(data)
+                while position < end:
+                    *fields, length = unpack_from(data, position)
+                    position += header
+                    yield fields, data[position:position + length].decode('utf-8')
+                    position += length
+        return
+
+    with open(path, 'rb') as f:
+        buffer = b''
+        position = 0
+        while True:
+            block = f.read(_READ_SIZE)
+            if not block:
+                break
+            buffer = buffer[position:] + block
+            position = 0
+            end = len(buffer)
+            while position + header <= end:
+                *fields, length = unpack_from(buffer, position)
+                if position + header + length > end:
+                    break
+                start = position + header
+                yield fields, buffer[start:start + length].decode('utf-8')
+                position = start + length
+        if position != len(buffer):
+            raise ValueError(f"Run file {path} ends with a truncated record")
+
+class ExternalSorter:
+    """
+    Sort and deduplicate more strings than fit in memory.
+
+    Items are buffered until run_size of them have been added; the buffer is
+    then deduplicated, sorted and spilled to a run file. Reading the result
+    k-way merges the runs with heapq.merge and drops duplicates across runs,
+    so memory is bounded by one run plus one record per run.
+    """
+
+    def __init__(self, directory=None, run_size=500000, use_mmap=False):
+        """
+        Args:
+            directory (str, optional): Parent directory of the run files.
+                Defaults to the system temporary directory.
+            run_size (int): Number of buffered items that triggers a spill
+            use_mmap (bool): Memory-map the runs when merging (see iter_run)
+        """
+        if run_size < 1:
+            raise ValueError("Run size must be at least 1")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.run_size = run_size
+        self.use_mmap = use_mmap
+        self.directory = tempfile.mkdtemp(prefix="wordlist_runs_", dir=directory)
+        self.runs = []
+        self.added = 0
+        self._buffer = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def add(self, item):
+        """
+        Add a string to the sorter.
+
+        Args:
+            item (str): The string to add
+        """
+        self.added += 1
+        self._buffer.add(item)
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def extend(self, items):
+        """
+        Add several strings to the sorter.
+
+        Args:
+            items (iterable): The strings to add
+        """
+        buffer = self._buffer
+        run_size = self.run_size
+        added = 0
+        for item in items:
+            added += 1
+            buffer.add(item)
+            if len(buffer) >= run_size:
+                self._spill()
+                buffer = self._buffer
+        self.added += added
+
+    def _spill(self):
+        """Write the buffered items to a new sorted run."""
+        path = os.path.join(self.directory, f"run_{len(self.runs):05d}.bin")
+        count = write_run(path, sorted(self._buffer))
+        self.runs.append(path)
+        self._buffer = set()
+        logger.debug(f"Spilled run {len(self.runs)} with {count} items")
+
+    def __iter__(self):
+        """
+        Yield the unique strings in sorted order.
+
+        The runs stay on disk until close(), so the result can be read again.
+
+        Yields:
+            str: The unique strings in ascending order
+        """
+        if not self.runs:
+            yield from sorted(self._buffer)
+            return
+
+        # Spill the remainder so every source is a run and the buffer is freed
+        if self._buffer:
+            self._spill()
+        logger.info(f"Merging {len(self.runs)} sorted runs")
+
+        previous = None
+        for item in heapq.merge(*(iter_run(path, use_mmap=self.use_mmap) for path in self.runs)):
+            if item != previous:
+                yield item
+                previous = item
+
+    def write_sorted(self, sink, max_size=None):
+        """
+        Write the unique strings in sorted order to a text sink, one per line.
+
+        Args:
+            sink: A file-like object opened for writing text
+            max_size (int, optional): Stop after writing this many strings
+
+        Returns:
+            int: The number of strings written
+        """
+        count = 0
+        for item in self:
+            if max_size is not None and count >= max_size:
+                logger.warning(f"Sorted output reached the limit of {max_size} words, stopping")
+                break
+            sink.write(f"{item}\n")
+            count += 1
+        return count
+
+    def close(self):
+        """Delete the run files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.runs = []
+        self._buffer = set()
+
+class RankedRunSpiller:
+    """
+    Select the k most likely of more scored strings than fit in memory.
+
+    Entries are buffered until run_size of them have been added; the top k
+    of the buffer (see utils.ranking.TopK) is then spilled to a run ordered
+    by (cost, order). Reading the result k-way merges the runs on
+    (cost, order), so the first entry of a string is its best one, and stops
+    after k distinct strings. A string outside the top k of its run cannot
+    be in the overall top k, so the result is the same as ranking every
+    entry at once, while memory is bounded by one run plus a fingerprint
+    table of the k strings returned.
+
+    Runs can be written by other processes into the same directory (see
+    flush and adopt), e.g. one spiller per worker.
+    """
+
+    def __init__(self, k, directory=None, run_size=500000, use_mmap=False):
+        """
+        Args:
+            k (int): Number of strings to keep
+            directory (str, optional): Parent directory of the run files.
+                Defaults to the system temporary directory.
+            run_size (int): Number of buffered entries that triggers a spill
+            use_mmap (bool): Memory-map the runs when merging (see iter_run)
+        """
+        if run_size < 1:
+            raise ValueError("Run size must be at least 1")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.k = k
+        self.run_size = run_size
+        self.use_mmap = use_mmap
+        self.directory = tempfile.mkdtemp(prefix="ranked_runs_", dir=directory)
+        self.runs = []
+        self.added = 0
+        # Largest number of entries buffered at once
+        self.peak = 0
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def extend(self, entries):
+        """
+        Add scored strings.
+
+        Args:
+            entries (iterable): (order, item, cost) tuples; order keys must be unique integers
+        """
+        buffer = self._buffer
+        run_size = self.run_size
+        added = 0
+        for entry in entries:
+            added += 1
+            buffer.append(entry)
+            if len(buffer) >= run_size:
+                self._spill()
+                buffer = self._buffer
+        self.added += added
+
+    def _spill(self):
+        """Write the top k of the buffered entries to a new ranked run."""
+        self.peak = max(self.peak, len(self._buffer))
+        top = TopK(self.k)
+        top.update(self._buffer)
+        self._buffer = []
+        path = os.path.join(self.directory, f"run_{len(self.runs):05d}.bin")
+        count = write_scored_run(path, top.result())
+        self.runs.append(path)
+        logger.debug(f"Spilled ranked run {len(self.runs)} with {count} entries")
+
+    def flush(self):
+        """
+        Spill the buffered entries, e.g. before handing the runs to another spiller.
+
+        Returns:
+            list: Paths of the run files
+        """
+        if self._buffer:
+            self._spill()
+        return list(self.runs)
+
+    def adopt(self, runs):
+        """
+        Merge run files written by other spillers into this one's result.
+
+        Args:
+            runs (iterable): Paths returned by flush
+        """
+        self.runs.extend(runs)
+
+    def __iter__(self):
+        """
+        Yield the k most likely distinct strings.
+
+        Yields:
+            tuple: (item, cost), most likely first
+        """
+        self.flush()
+        logger.info(f"Merging {len(self.runs)} ranked runs")
+        seen = FingerprintDeduplicator(capacity=self.k)
+        count = 0
+        for cost, _, item in heapq.merge(*(iter_scored_run(path, use_mmap=self.use_mmap) for path in self.runs)):
+            if count >= self.k:
+                break
+            if seen.add(item):
+                yield item, cost
+                count += 1
+
+    def close(self):
+        """Delete the run files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.runs = []
+        self._buffer = []
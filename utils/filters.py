@@ -0,0 +1,189 @@
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Character classes a policy can require, as bits of a class mask
+CHARACTER_CLASSES = {
+    'lower': 1,
+    'upper': 2,
+    'digit': 4,
+    'special': 8,
+}
+
+def _char_class(char):
+    if char.islower():
+        return 1
+    if char.isupper():
+        return 2
+    if char.isdigit():
+        return 4
+    if not char.isalpha():
+        return 8
+    return 0
+
+# Class mask of every ASCII character, as a translation table to one-character codes
+_ASCII_CLASSES = str.maketrans({chr(code): chr(_char_class(chr(code))) for code in range(128)})
+
+def class_mask(text):
+    """
+    Get the character classes used by a string.
+
+    Args:
+        text (str): The string to inspect
+
+    Returns:
+        int: Bitwise OR of the CHARACTER_CLASSES values present in the string
+    """
+    mask = 0
+    if text.isascii():
+        # Translate in C, then combine the handful of distinct codes
+        for code in set(text.translate(_ASCII_CLASSES)):
+            mask |= ord(code)
+        return mask
+    for char in set(text):
+        mask |= _char_class(char)
+    return mask
+
+class WordlistFilter:
+    """
+    Declarative constraints on wordlist candidates, e.g. a target password
+    policy such as "8-16 characters with at least one digit".
+
+    The generator pushes each constraint into the earliest stage that can
+    decide it: stems whose candidates all have the wrong length are skipped
+    before any mangling, and suffixes are matched against the length and the
+    character classes still missing from a prefix before candidates are built.
+    accepts() is the final check for everything else.
+    """
+
+    def __init__(self, min_length=None, max_length=None, require=()):
+        """
+        Args:
+            min_length (int, optional): Minimum candidate length
+            max_length (int, optional): Maximum candidate length
+            require (iterable): Names of CHARACTER_CLASSES every candidate must contain
+        """
+        unknown = [name for name in require if name not in CHARACTER_CLASSES]
+        if unknown:
+            raise ValueError(f"Unknown character class '{unknown[0]}'. "
+                             f"Choose from: {', '.join(CHARACTER_CLASSES)}")
+        if min_length is not None and max_length is not None and min_length > max_length:
+            raise ValueError("Minimum length cannot be greater than maximum length")
+
+        self.min_length = min_length
+        self.max_length = max_length
+        self.require = tuple(name for name in CHARACTER_CLASSES if name in set(require))
+        self.required_mask = 0
+        for name in self.require:
+            self.required_mask |= CHARACTER_CLASSES[name]
+        self._suffix_masks = {}
+
+    def __repr__(self):
+        return (f"WordlistFilter(min_length={self.min_length!r}, max_length={self.max_length!r}, "
+                f"require={self.require!r})")
+
+    def allows_length(self, length):
+        """
+        Check a candidate length against the length limits.
+
+        Args:
+            length (int): The length
+
+        Returns:
+            bool: True if the length is within the limits
+        """
+        if self.min_length is not None and length < self.min_length:
+            return False
+        return self.max_length is None or length <= self.max_length
+
+    def accepts(self, candidate):
+        """
+        Check a candidate against every constraint.
+
+        Args:
+            candidate (str): The candidate
+
+        Returns:
+            bool: True if the candidate satisfies the filter
+        """
+        if not self.allows_length(len(candidate)):
+            return False
+        required = self.required_mask
+        return not required or class_mask(candidate) & required == required
+
+    def allows_lengths(self, lengths):
+        """
+        Check whether any of the possible lengths of a stem's candidates is allowed.
+
+        Args:
+            lengths (iterable): Candidate lengths, or None if they are unknown
+
+        Returns:
+            bool: False only if no candidate of the stem can pass
+        """
+        if lengths is None:
+            return True
+        return any(self.allows_length(length) for length in lengths)
+
+    def missing_classes(self, prefix):
+        """
+        Get the required character classes a prefix does not contain yet.
+
+        Args:
+            prefix (str): The prefix
+
+        Returns:
+            int: Class mask that a suffix of the prefix must cover
+        """
+        return self.required_mask & ~class_mask(prefix) if self.required_mask else 0
+
+    def matching_suffixes(self, prefix, suffixes):
+        """
+        Select the suffixes that complete a prefix into an accepted candidate.
+
+        Args:
+            prefix (str): The prefix
+            suffixes (sequence): Candidate suffixes
+
+        Returns:
+            list: The suffixes s for which accepts(prefix + s) holds, in order
+        """
+        masks = self._suffix_masks
+        missing = self.missing_classes(prefix)
+        length = len(prefix)
+        matching = []
+        for suffix in suffixes:
+            if not self.allows_length(length + len(suffix)):
+                continue
+            if missing:
+                mask = masks.get(suffix)
+                if mask is None:
+                    mask = masks[suffix] = class_mask(suffix)
+                if mask & missing != missing:
+                    continue
+            matching.append(suffix)
+        return matching
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Build a filter from command options such as min=8, max=16, require=digit,upper.
+
+        Args:
+            args (iterable): Command arguments; other arguments are ignored
+
+        Returns:
+            WordlistFilter: The filter, or None if no option was given
+        """
+        options = {}
+        for arg in args:
+            name, _, value = arg.partition('=')
+            if name in ('min', 'max'):
+                try:
+                    options[f"{name}_length"] = int(value)
+                except ValueError:
+                    raise ValueError(f"Option {name} needs a number, got '{value}'")
+            elif name == 'require':
+                options['require'] = [item.strip() for item in value.split(',') if item.strip()]
+        return cls(**options) if options else None
@@ -0,0 +1,340 @@
+import os
+import sys
+import math
+import struct
+import secrets
+import logging
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Model built by "python -m utils.markov" and loaded by default
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "data", "markov_en.bin")
+
+# A model file is a header, the alphabet, and for every context one row of
+# cumulative transition counts (uint32, little-endian)
+_MAGIC = b'PWMK'
+_HEADER = struct.Struct('<4sBBH')  # magic, version, order, alphabet size
+_VERSION = 1
+
+class MarkovModel:
+    """
+    Character n-gram model for pronounceable passwords.
+
+    The next character is drawn from the counts observed after the previous
+    `order` characters of the training words; the start of a word is padded
+    with a marker. Contexts never seen in training fall back to the
+    single-character counts, so every context can be continued.
+    """
+
+    def __init__(self, alphabet, order, cumulative):
+        """
+        Args:
+            alphabet (str): The characters of the model
+            order (int): Number of previous characters a transition depends on
+            cumulative (array): Cumulative counts, one row of len(alphabet) per context
+        """
+        size = len(alphabet)
+        if len(cumulative) != (size + 1) ** order * size:
+            raise ValueError("Markov table does not match the alphabet and order")
+        self.alphabet = alphabet
+        self.order = order
+        self.cumulative = cumulative
+        self._index = {c: i for i, c in enumerate(alphabet)}
+        self._entropy = {}
+        self._min_entropy = {}
+
+    def __repr__(self):
+        return f"MarkovModel(order={self.order}, alphabet={self.alphabet!r})"
+
+    @classmethod
+    def train(cls, words, order=2, alphabet="abcdefghijklmnopqrstuvwxyz"):
+        """
+        Count the transitions of a list of words.
+
+        Args:
+            words (iterable): Training words; characters outside the alphabet split a word
+            order (int): Number of previous characters a transition depends on
+            alphabet (str): The characters of the model
+
+        Returns:
+            MarkovModel: The trained model
+        """
+        if order < 1:
+            raise ValueError("Markov order must be at least 1")
+        size = len(alphabet)
+        index = {c: i for i, c in enumerate(alphabet)}
+        start = size
+        counts = [0] * ((size + 1) ** order * size)
+        unigrams = [0] * size
+
+        trained = 0
+        for word in words:
+            context = (start,) * order
+            for char in word.lower():
+                position = index.get(char)
+                if position is None:
+                    context = (start,) * order
+                    continue
+                row = 0
+                for part in context:
+                    row = row * (size + 1) + part
+                counts[row * size + position] += 1
+                unigrams[position] += 1
+                context = context[1:] + (position,)
+            trained += 1
+        if not any(unigrams):
+            raise ValueError("No training word uses the alphabet")
+
+        cumulative = array('I')
+        for row in range(len(counts) // size):
+            weights = counts[row * size:(row + 1) * size]
+            if not any(weights):
+                weights = unigrams
+            total = 0
+            for weight in weights:
+                total += weight
+                cumulative.append(total)
+
+        logger.info(f"Trained order-{order} Markov model on {trained} words")
+        return cls(alphabet, order, cumulative)
+
+    def save(self, path):
+        """
+        Write the model to a file that load() reads back.
+
+        Args:
+            path (str): Path of the model file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        table = array('I', self.cumulative)
+        if sys.byteorder != 'little':
+            table.byteswap()
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.order, len(self.alphabet)))
+            f.write(self.alphabet.encode('ascii'))
+            f.write(table.tobytes())
+        logger.info(f"Saved Markov model to {path}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a model written by save().
+
+        Args:
+            path (str): Path of the model file
+
+        Returns:
+            MarkovModel: The model
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path} is not a Markov model file")
+        magic, version, order, size = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a Markov model file")
+        alphabet = data[_HEADER.size:_HEADER.size + size].decode('ascii')
+        table = array('I')
+        table.frombytes(data[_HEADER.size + size:])
+        if sys.byteorder != 'little':
+            table.byteswap()
+        return cls(alphabet, order, table)
+
+    def generate(self, length):
+        """
+        Draw a string from the model.
+
+        Args:
+            length (int): Number of characters
+
+        Returns:
+            str: The string
+        """
+        size = len(self.alphabet)
+        cumulative = self.cumulative
+        alphabet = self.alphabet
+        stride = (size + 1) ** (self.order - 1)
+        row = sum(size * (size + 1) ** i for i in range(self.order))  # all start markers
+
+        chars = []
+        for _ in range(length):
+            low = row * size
+            value = secrets.randbelow(cumulative[low + size - 1])
+            position = bisect_right(cumulative, value, low, low + size) - low
+            chars.append(alphabet[position])
+            # Drop the oldest character of the context and append the new one
+            row = row % stride * (size + 1) + position
+        return ''.join(chars)
+
+    def entropy(self, length):
+        """
+        Compute the exact Shannon entropy of generate(length), in bits.
+
+        The distribution over contexts is propagated through the chain and the
+        entropy of the next character is added at every position.
+
+        Args:
+            length (int): Number of characters
+
+        Returns:
+            float: The entropy in bits
+        """
+        if length in self._entropy:
+            return self._entropy[length]
+
+        size = len(self.alphabet)
+        cumulative = self.cumulative
+        rows = len(cumulative) // size
+        stride = (size + 1) ** (self.order - 1)
+
+        # Transition probabilities and entropy of every context, computed once
+        transitions = []
+        row_entropy = []
+        for row in range(rows):
+            low = row * size
+            total = cumulative[low + size - 1]
+            previous = 0
+            probabilities = []
+            for position in range(size):
+                weight = cumulative[low + position] - previous
+                previous = cumulative[low + position]
+                if weight:
+                    probabilities.append((position, weight / total))
+            transitions.append(probabilities)
+            row_entropy.append(-sum(p * math.log2(p) for _, p in probabilities))
+
+        start = sum(size * (size + 1) ** i for i in range(self.order))
+        distribution = {start: 1.0}
+        bits = 0.0
+        for _ in range(length):
+            following = {}
+            for row, weight in distribution.items():
+                bits += weight * row_entropy[row]
+                shifted = row % stride * (size + 1)
+                for position, p in transitions[row]:
+                    target = shifted + position
+                    following[target] = following.get(target, 0.0) + weight * p
+            distribution = following
+
+        self._entropy[length] = bits
+        return bits
+
+    def min_entropy(self, length):
+        """
+        Compute the min-entropy of generate(length), in bits.
+        
+        This is -log2 of the probability of the most likely string, found by
+        keeping the most likely path into every context at each position.
+        Unlike the Shannon entropy, it bounds an attacker who guesses the most
+        likely strings first: no guessing order reaches a 50% success rate in
+        fewer than 2 ** (min_entropy - 1) guesses.
+        
+        Args:
+            length (int): Number of characters
+            
+        Returns:
+            float: The min-entropy in bits
+        """
+        if length in self._min_entropy:
+            return self._min_entropy[length]
+        
+        size = len(self.alphabet)
+        cumulative = self.cumulative
+        stride = (size + 1) ** (self.order - 1)
+        
+        # Bits of the most likely path into each context reached so far
+        start = sum(size * (size + 1) ** i for i in range(self.order))
+        best = {start: 0.0}
+        for _ in range(length):
+            following = {}
+            for row, bits in best.items():
+                low = row * size
+                total = cumulative[low + size - 1]
+                shifted = row % stride * (size + 1)
+                previous = 0
+                for position in range(size):
+                    weight = cumulative[low + position] - previous
+                    previous = cumulative[low + position]
+                    if weight:
+                        target = shifted + position
+                        cost = bits - math.log2(weight / total)
+                        if cost < following.get(target, math.inf):
+                            following[target] = cost
+            best = following
+        
+        bits = min(best.values())
+        self._min_entropy[length] = bits
+        return bits
+
+def training_words():
+    """
+    Get the default training words: the English word frequency list that ships with zxcvbn.
+
+    Returns:
+        list: The words
+    """
+    from zxcvbn.frequency_lists import FREQUENCY_LISTS
+    return FREQUENCY_LISTS['english_wikipedia']
+
+@lru_cache(maxsize=None)
+def get_markov_model(path=None, cache_dir=None):
+    """
+    Load a Markov model once per path.
+    
+    The default model ships in data/. If the file does not exist, the model
+    is trained on training_words(); with a cache_dir it is saved there and
+    loaded from there next time, so the source tree is never written to.
+    
+    Args:
+        path (str, optional): Path of the model file. Defaults to DEFAULT_MODEL_PATH.
+        cache_dir (str, optional): Writable directory for a model trained because path is missing
+        
+    Returns:
+        MarkovModel: The model
+    """
+    path = path or DEFAULT_MODEL_PATH
+    if os.path.exists(path):
+        return MarkovModel.load(path)
+    
+    cached_path = os.path.join(cache_dir, os.path.basename(path)) if cache_dir else None
+    if cached_path and os.path.exists(cached_path):
+        return MarkovModel.load(cached_path)
+    
+    logger.warning(f"Markov model {path} not found; training it now "
+                   f"(build it ahead of time with python -m utils.markov)")
+    model = MarkovModel.train(training_words())
+    if cached_path:
+        try:
+            model.save(cached_path)
+        except OSError as e:
+            logger.error(f"Error saving Markov model: {str(e)}")
+    return model
+
+def main(argv=None):
+    """Build a model file: python -m utils.markov [output] [wordlist.txt] [order]"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) > 3:
+        print("Usage: python -m utils.markov [output] [wordlist.txt] [order]", file=sys.stderr)
+        return 2
+    output = argv[0] if argv else DEFAULT_MODEL_PATH
+    if len(argv) > 1:
+        with open(argv[1], 'r', encoding='utf-8') as f:
+            words = [line.split()[-1] for line in f if line.strip()]
+    else:
+        words = training_words()
+    order = int(argv[2]) if len(argv) > 2 else 2
+
+    model = MarkovModel.train(words, order=order)
+    model.save(output)
+    print(f"Wrote order-{order} model ({os.path.getsize(output)} bytes) to {output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import heapq
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+def select_top_k(scored_items, k):
+    """
+    Select the k items with the lowest cost from a stream, keeping at most
+    k entries in memory (plus superseded entries of repeated items).
+
+    Items may repeat; the lowest cost seen for an item is used. Ties are broken
+    in favour of the item that was seen first, so the result is deterministic
+    for a deterministic stream.
+
+    Args:
+        scored_items (iterable): (item, cost) tuples, lower cost meaning more likely
+        k (int): Number of items to keep
+
+    Returns:
+        list: (item, cost) tuples ordered from most to least likely
+    """
+    ordered = ((None, item, cost) for item, cost in scored_items)
+    return [(item, cost) for _, item, cost in select_top_k_ordered(ordered, k)]
+
+def select_top_k_ordered(entries, k):
+    """
+    Select the k lowest-cost items like select_top_k, keeping the position
+    of the entry each item was selected with.
+
+    Top-k results are mergeable: selecting again from the merge (in order) of
+    the kept entries of earlier streams and the entries of a new stream gives
+    the same result as selecting from all streams at once.
+
+    Args:
+        entries (iterable): (order, item, cost) tuples in ascending order
+        k (int): Number of items to keep
+
+    Returns:
+        list: (order, item, cost) tuples ordered from most to least likely
+    """
+    if k <= 0:
+        return []
+
+    # Max-heap on (cost, arrival) through negation, so the root is the worst kept item
+    heap = []
+    best = {}
+    arrival = 0
+
+    for order, item, cost in entries:
+        arrival += 1
+        previous = best.get(item)
+        if previous is not None:
+            if cost >= previous:
+                continue
+        elif len(best) >= k:
+            if cost >= -heap[0][0]:
+                continue
+
+        best[item] = cost
+        heapq.heappush(heap, (-cost, -arrival, item, order))
+
+        # Evict the worst live entries; superseded entries of repeated items are dropped on the way
+        while len(best) > k or best.get(heap[0][2]) != -heap[0][0]:
+            negative_cost, _, evicted, _ = heapq.heappop(heap)
+            if best.get(evicted) == -negative_cost:
+                del best[evicted]
+
+    ranked = sorted((-entry[0], -entry[1], entry[2], entry[3]) for entry in heap if best.get(entry[2]) == -entry[0])
+    return [(order, item, cost) for cost, _, item, order in ranked]
+
+class TopK:
+    """
+    Keep the k lowest-cost items of entries that arrive in any order.
+
+    Ties are broken on the order key of the entries instead of their arrival,
+    so folding the kept entries of several streams in any order (e.g. as
+    worker processes finish) gives the same result as select_top_k_ordered
+    over all entries in order. Memory is bounded by k live entries plus
+    superseded entries of repeated items.
+    """
+
+    def __init__(self, k):
+        """
+        Args:
+            k (int): Number of items to keep
+        """
+        self.k = k
+        # Max-heap on (cost, order) through negation, so the root is the worst kept item
+        self._heap = []
+        self._best = {}
+
+    def __len__(self):
+        return len(self._best)
+
+    def add(self, order, item, cost):
+        """
+        Offer one entry.
+
+        Args:
+            order (int): Position of the entry in the full stream
+            item (str): The item
+            cost (float): Its cost, lower meaning more likely
+        """
+        if self.k <= 0:
+            return
+        best = self._best
+        heap = self._heap
+        key = (cost, order)
+        previous = best.get(item)
+        if previous is not None:
+            if key >= previous:
+                return
+        elif len(best) >= self.k and key >= (-heap[0][0], -heap[0][1]):
+            return
+
+        best[item] = key
+        heapq.heappush(heap, (-cost, -order, item))
+
+        # Evict the worst live entries; superseded entries of repeated items are dropped on the way
+        while len(best) > self.k or best.get(heap[0][2]) != (-heap[0][0], -heap[0][1]):
+            negative_cost, negative_order, evicted = heapq.heappop(heap)
+            if best.get(evicted) == (-negative_cost, -negative_order):
+                del best[evicted]
+
+    def update(self, entries):
+        """
+        Offer several entries.
+
+        Args:
+            entries (iterable): (order, item, cost) tuples, in any order
+        """
+        add = self.add
+        heap = self._heap
+        best = self._best
+        k = self.k
+        for order, item, cost in entries:
+            # Once full, entries worse than the root cannot be kept, not even as
+            # a better cost of a kept item (its kept entry is at most the root)
+            if len(best) >= k and heap:
+                worst_cost = -heap[0][0]
+                if cost > worst_cost or (cost == worst_cost and order >= -heap[0][1]):
+                    continue
+            add(order, item, cost)
+
+    def result(self):
+        """
+        Get the kept entries.
+
+        Returns:
+            list: (order, item, cost) tuples ordered from most to least likely
+        """
+        ranked = sorted((cost, order, item) for item, (cost, order) in self._best.items())
+        return [(order, item, cost) for cost, order, item in ranked]
@@ -0,0 +1,610 @@
+import datetime
+import logging
+from functools import lru_cache
+
+from utils.common import (
+    LeetEnumerator,
+    YEAR_PATTERNS,
+    SPECIAL_CHARS,
+    SPECIAL_CHAR_COMBINATIONS,
+    get_common_years,
+)
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Hashcat encodes positions as 0-9 followed by A-Z
+_POSITIONS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Functions without arguments, mapped to their implementation
+_SIMPLE_FUNCTIONS = {
+    ':': None,
+    'l': str.lower,
+    'u': str.upper,
+    'c': str.capitalize,
+    'C': lambda word: word[:1].lower() + word[1:].upper(),
+    't': str.swapcase,
+    'r': lambda word: word[::-1],
+    'd': lambda word: word + word,
+    'f': lambda word: word + word[::-1],
+    '{': lambda word: word[1:] + word[:1],
+    '}': lambda word: word[-1:] + word[:-1],
+    '[': lambda word: word[1:],
+    ']': lambda word: word[:-1],
+    'E': lambda word: ' '.join(part.capitalize() for part in word.lower().split(' ')),
+}
+
+# Functions taking one character or one position argument
+_CHAR_FUNCTIONS = {'$', '^', '@'}
+_POSITION_FUNCTIONS = {'T', 'D', "'"}
+
+# Functions that keep the length of ASCII words
+_LENGTH_PRESERVING = {':', 'l', 'u', 'c', 'C', 't', 'r', '{', '}', 'E', 's', 'T'}
+
+def _position(rule, char):
+    """
+    Decode a hashcat position character.
+
+    Args:
+        rule (str): The rule being parsed, for error messages
+        char (str): The position character
+
+    Returns:
+        int: The decoded position
+    """
+    index = _POSITIONS.find(char)
+    if index < 0:
+        raise ValueError(f"Invalid position '{char}' in rule '{rule}'")
+    return index
+
+def parse_rule(rule):
+    """
+    Parse a rule written in the hashcat/John rule syntax.
+
+    Supported functions: : l u c C t r d f { } [ ] E, $X ^X @X sXY, TN DN 'N.
+    Spaces between functions are ignored.
+
+    Args:
+        rule (str): The rule text
+
+    Returns:
+        list: (function, argument) tuples in application order
+    """
+    operations = []
+    i = 0
+    while i < len(rule):
+        function = rule[i]
+        if function == ' ':
+            i += 1
+        elif function in _SIMPLE_FUNCTIONS:
+            operations.append((function, None))
+            i += 1
+        elif function in _CHAR_FUNCTIONS:
+            if i + 1 >= len(rule):
+                raise ValueError(f"Function '{function}' needs a character in rule '{rule}'")
+            operations.append((function, rule[i + 1]))
+            i += 2
+        elif function in _POSITION_FUNCTIONS:
+            if i + 1 >= len(rule):
+                raise ValueError(f"Function '{function}' needs a position in rule '{rule}'")
+            operations.append((function, _position(rule, rule[i + 1])))
+            i += 2
+        elif function == 's':
+            if i + 2 >= len(rule):
+                raise ValueError(f"Function 's' needs two characters in rule '{rule}'")
+            operations.append((function, (rule[i + 1], rule[i + 2])))
+            i += 3
+        else:
+            raise ValueError(f"Unsupported function '{function}' in rule '{rule}'")
+    return operations
+
+def _compile_operations(operations):
+    """
+    Fuse parsed operations into a list of string transforms.
+
+    Runs of appends and prepends become a single concatenation and runs of
+    substitutions become a single str.translate table.
+
+    Args:
+        operations (list): Output of parse_rule
+
+    Returns:
+        list: Callables taking and returning a string
+    """
+    transforms = []
+    i = 0
+    while i < len(operations):
+        function, argument = operations[i]
+
+        if function == '$' or function == '^':
+            # Collect the run: $a$b appends "ab", ^a^b prepends "ba"
+            affix = ''
+            while i < len(operations) and operations[i][0] == function:
+                char = operations[i][1]
+                affix = affix + char if function == '$' else char + affix
+                i += 1
+            if function == '$':
+                transforms.append(lambda word, affix=affix: word + affix)
+            else:
+                transforms.append(lambda word, affix=affix: affix + word)
+            continue
+
+        if function == 's':
+            # Compose consecutive substitutions into one mapping
+            mapping = {}
+            while i < len(operations) and operations[i][0] == 's':
+                source, target = operations[i][1]
+                for key, value in mapping.items():
+                    if value == source:
+                        mapping[key] = target
+                mapping.setdefault(source, target)
+                i += 1
+            transforms.append(lambda word, table=str.maketrans(mapping): word.translate(table))
+            continue
+
+        if function == '@':
+            transforms.append(lambda word, char=argument: word.replace(char, ''))
+        elif function == 'T':
+            transforms.append(lambda word, n=argument: word[:n] + word[n:n + 1].swapcase() + word[n + 1:])
+        elif function == 'D':
+            transforms.append(lambda word, n=argument: word[:n] + word[n + 1:])
+        elif function == "'":
+            transforms.append(lambda word, n=argument: word[:n])
+        elif _SIMPLE_FUNCTIONS[function] is not None:
+            transforms.append(_SIMPLE_FUNCTIONS[function])
+        i += 1
+
+    return transforms
+
+def _chain(transforms):
+    """
+    Combine compiled transforms into one callable.
+
+    Args:
+        transforms (list): Output of _compile_operations
+
+    Returns:
+        callable: A single string transform, or None for the identity
+    """
+    if not transforms:
+        return None
+    if len(transforms) == 1:
+        return transforms[0]
+
+    def apply_all(word):
+        for transform in transforms:
+            word = transform(word)
+        return word
+    return apply_all
+
+class Rule:
+    """A single mangling rule compiled into one fused string transform."""
+
+    def __init__(self, text, weight=0.0):
+        """
+        Args:
+            text (str): The rule in hashcat/John syntax
+            weight (float): Cost added to candidates produced by the rule when
+                ranking; higher means less likely
+        """
+        self.text = text if text.strip() else ':'
+        self.weight = weight
+        self.operations = parse_rule(self.text)
+        self.function = _chain(_compile_operations(self.operations))
+
+    @property
+    def suffix(self):
+        """The appended string if the rule only appends characters, otherwise None."""
+        if all(function in (':', '$') for function, _ in self.operations):
+            return ''.join(argument for function, argument in self.operations if function == '$')
+        return None
+
+    @property
+    def preserves_length(self):
+        """True if the rule never changes the length of an ASCII word."""
+        return all(function in _LENGTH_PRESERVING for function, _ in self.operations)
+
+    def apply(self, word):
+        """
+        Apply the rule to a word.
+
+        Args:
+            word (str): The word to transform
+
+        Returns:
+            str: The transformed word
+        """
+        return self.function(word) if self.function else word
+
+    def expand(self, word):
+        """Return the single result of the rule, so rules and rulesets are interchangeable."""
+        return [self.apply(word)]
+
+    def expand_scored(self, word):
+        """Return the single result of the rule with the rule's weight."""
+        return [(self.apply(word), self.weight)]
+
+    def estimate(self, word):
+        """A rule always produces exactly one word."""
+        return 1
+
+    def __reduce__(self):
+        # Compiled transforms are closures; rebuild them from the text when unpickling
+        return (Rule, (self.text, self.weight))
+
+    def __repr__(self):
+        if self.weight:
+            return f"Rule({self.text!r}, {self.weight!r})"
+        return f"Rule({self.text!r})"
+
+def _compile_stage(alternatives):
+    """
+    Compile the alternatives of a stage into an execution plan.
+
+    A stage made only of appends becomes a single suffix table applied as a
+    "variations x suffixes" product; other stages keep one callable per rule.
+
+    Args:
+        alternatives (list): Rules and nested rulesets
+
+    Returns:
+        tuple: ('suffixes', {suffix: weight}) or ('alternatives', [(callable, expands)])
+    """
+    if all(isinstance(alternative, Rule) for alternative in alternatives):
+        if all(alternative.suffix is not None for alternative in alternatives):
+            suffixes = {}
+            for alternative in alternatives:
+                weight = suffixes.get(alternative.suffix)
+                if weight is None or alternative.weight < weight:
+                    suffixes[alternative.suffix] = alternative.weight
+            return ('suffixes', suffixes)
+
+    plan = []
+    for alternative in alternatives:
+        if isinstance(alternative, Rule):
+            plan.append((alternative.function, False))
+        else:
+            plan.append((alternative.expand, True))
+    return ('alternatives', plan)
+
+class RuleSet:
+    """
+    A mangling plan made of stages that are applied in sequence.
+
+    Every stage is a list of alternatives (rules, nested rulesets or any object
+    with expand(word), expand_scored(word) and estimate(word) methods), and each
+    word produced by one stage is fed to every alternative of the next stage,
+    like chaining several rule files with hashcat's -r option. The whole plan is
+    applied to one base word at a time, with duplicates removed per word.
+    """
+
+    def __init__(self, stages):
+        self.stages = []
+        for stage in stages:
+            alternatives = [Rule(item) if isinstance(item, str) else item for item in stage]
+            if not alternatives:
+                raise ValueError("A rule stage needs at least one rule")
+            self.stages.append(alternatives)
+        self._plan = [_compile_stage(stage) for stage in self.stages]
+
+        # Lengths added by the final suffix table, if every earlier stage keeps the length
+        self._suffix_lengths = None
+        if self._plan and self._plan[-1][0] == 'suffixes' and all(
+                getattr(alternative, 'preserves_length', False)
+                for stage in self.stages[:-1] for alternative in stage):
+            self._suffix_lengths = sorted({len(suffix) for suffix in self._plan[-1][1]})
+
+    def __reduce__(self):
+        return (RuleSet, (self.stages,))
+
+    def __repr__(self):
+        return f"RuleSet({self.stages!r})"
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        Build a single-stage ruleset from rule lines, skipping blanks and # comments.
+
+        Args:
+            lines (iterable): Rule lines
+
+        Returns:
+            RuleSet: The compiled ruleset
+        """
+        rules = []
+        seen = set()
+        for line in lines:
+            # Only strip the line ending: "$ " appends a space
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            rule = Rule(line)
+            # Identical rules after normalisation would only produce duplicates
+            key = tuple(rule.operations)
+            if key not in seen:
+                seen.add(key)
+                rules.append(rule)
+        return cls([rules])
+
+    @classmethod
+    def from_file(cls, filepath):
+        """
+        Load a single-stage ruleset from a hashcat/John style .rule file.
+
+        Args:
+            filepath (str): Path to the rule file
+
+        Returns:
+            RuleSet: The compiled ruleset
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            ruleset = cls.from_lines(f)
+        logger.info(f"Loaded {len(ruleset.stages[0])} rules from {filepath}")
+        return ruleset
+
+    def expand(self, word):
+        """
+        Apply every stage to a word.
+
+        Args:
+            word (str): The base word
+
+        Returns:
+            list: The unique results, in generation order
+        """
+        return self._run_stages([word], self._plan)
+
+    def candidate_lengths(self, word):
+        """
+        Get the possible lengths of the results of a word without expanding it.
+
+        Args:
+            word (str): The base word
+
+        Returns:
+            list: The possible lengths, or None if they cannot be known in advance
+        """
+        if self._suffix_lengths is None or not word.isascii():
+            return None
+        return [len(word) + length for length in self._suffix_lengths]
+
+    def expand_product(self, word):
+        """
+        Split the expansion of a word into prefixes and the suffixes of the
+        final stage, when every prefix followed by every suffix gives exactly
+        the results of expand (in the same order).
+
+        That holds when the last stage is a suffix table and all prefixes have
+        the same length, as with the built-in rules, whose leetspeak and case
+        stages keep the length of ASCII words. The product can then be written
+        in bulk without creating a string per candidate.
+
+        Args:
+            word (str): The base word
+
+        Returns:
+            tuple: (prefixes, suffixes) lists, or None if the expansion is not such a product
+        """
+        if not self._plan or self._plan[-1][0] != 'suffixes':
+            return None
+        prefixes = self._run_stages([word], self._plan[:-1])
+        # Prefixes of different lengths could produce the same candidate with different suffixes
+        if len({len(prefix) for prefix in prefixes}) > 1:
+            return None
+        return prefixes, list(self._plan[-1][1])
+
+    @staticmethod
+    def _run_stages(variations, plan):
+        """Apply compiled stages to a list of words, keeping the unique results in order."""
+        for kind, stage_plan in plan:
+            results = {}
+            if kind == 'suffixes':
+                for variation in variations:
+                    for suffix in stage_plan:
+                        results[variation + suffix] = None
+            else:
+                for variation in variations:
+                    for function, expands in stage_plan:
+                        if expands:
+                            for result in function(variation):
+                                results[result] = None
+                        elif function is None:
+                            results[variation] = None
+                        else:
+                            results[function(variation)] = None
+            variations = list(results)
+        return variations
+
+    def to_stage_rules(self):
+        """
+        Export each stage as its own list of rules for hashcat/John, e.g. one
+        rule file per stage.
+
+        Stacking the files (hashcat -r a.rule -r b.rule ...) applies every
+        combination of one rule per file, which is the plan of the ruleset,
+        without writing the product out. Alternatives that are not rules
+        must provide their own to_rules() (LeetEnumerator approximates itself
+        with substitution rules).
+
+        Returns:
+            list: One list of (rule text, weight) tuples per stage, most likely first
+        """
+        stage_rules = []
+        for stage in self.stages:
+            options = {}
+            for alternative in stage:
+                if isinstance(alternative, Rule):
+                    pairs = [(alternative.text, alternative.weight)]
+                elif hasattr(alternative, 'to_rules'):
+                    pairs = alternative.to_rules()
+                else:
+                    raise ValueError(f"{alternative!r} cannot be exported as rules")
+                for text, weight in pairs:
+                    # Stacked rule files need an explicit ':' for "no change"
+                    text = ':' if text.strip() in ('', ':') else text
+                    if text not in options or weight < options[text]:
+                        options[text] = weight
+            stage_rules.append(sorted(options.items(), key=lambda item: item[1]))
+        return stage_rules
+
+    def to_rules(self):
+        """
+        Flatten the stages into single rules for hashcat/John, e.g. for a rule-file export.
+
+        Every combination of one alternative per stage becomes one rule, the
+        concatenation of their functions, so the list is the product of the
+        stage sizes; to_stage_rules keeps the stages apart instead.
+
+        Returns:
+            list: (rule text, weight) tuples, most likely first
+        """
+        combined = {'': 0.0}
+        for options in self.to_stage_rules():
+            results = {}
+            for prefix, prefix_weight in combined.items():
+                for text, weight in options:
+                    # ':' does nothing, so it is only kept when a rule would be empty
+                    text = prefix + ('' if text == ':' else text)
+                    previous = results.get(text)
+                    if previous is None or prefix_weight + weight < previous:
+                        results[text] = prefix_weight + weight
+            combined = results
+
+        ranked = sorted(combined.items(), key=lambda item: item[1])
+        return [(text or ':', weight) for text, weight in ranked]
+
+    def estimate_stages(self, word):
+        """
+        Estimate how many words each stage produces for a base word, without
+        running the plan.
+        
+        Stages made only of rules are evaluated on the base word itself to count
+        their distinct results, expanders are asked for their own estimate and
+        suffix tables count one word per suffix. The estimate is exact when the
+        results of one stage do not collide after the next, and otherwise an
+        upper bound.
+
+        Args:
+            word (str): The base word
+
+        Returns:
+            list: Cumulative number of words after each stage
+        """
+        totals = []
+        multiplier = 1
+        for stage, (kind, plan) in zip(self.stages, self._plan):
+            if kind == 'suffixes':
+                count = len(plan)
+            elif all(isinstance(alternative, Rule) for alternative in stage):
+                count = len({alternative.apply(word) for alternative in stage})
+            else:
+                count = sum(alternative.estimate(word) for alternative in stage)
+            multiplier *= count
+            totals.append(multiplier)
+        return totals
+
+    def estimate(self, word):
+        """
+        Estimate the number of words expand would return for a base word.
+
+        Args:
+            word (str): The base word
+
+        Returns:
+            int: The estimated number of words
+        """
+        totals = self.estimate_stages(word)
+        return totals[-1] if totals else 1
+
+    def expand_scored(self, word, cost=0.0):
+        """
+        Apply every stage to a word, adding up the weights of the rules used.
+
+        Args:
+            word (str): The base word
+            cost (float): Cost of the base word itself
+
+        Returns:
+            list: (candidate, cost) tuples with the lowest cost of every unique candidate
+        """
+        variations = {word: cost}
+        for stage, (kind, plan) in zip(self.stages, self._plan):
+            results = {}
+            if kind == 'suffixes':
+                for variation, base_cost in variations.items():
+                    for suffix, weight in plan.items():
+                        candidate = variation + suffix
+                        candidate_cost = base_cost + weight
+                        previous = results.get(candidate)
+                        if previous is None or candidate_cost < previous:
+                            results[candidate] = candidate_cost
+            else:
+                for variation, base_cost in variations.items():
+                    for alternative in stage:
+                        for candidate, weight in alternative.expand_scored(variation):
+                            candidate_cost = base_cost + weight
+                            previous = results.get(candidate)
+                            if previous is None or candidate_cost < previous:
+                                results[candidate] = candidate_cost
+            variations = results
+        return list(variations.items())
+
+def load_rule_files(filepaths):
+    """
+    Load rule files and chain them, each file forming one stage.
+
+    Args:
+        filepaths (list): Paths to .rule files
+
+    Returns:
+        RuleSet: The chained ruleset
+    """
+    stages = []
+    for filepath in filepaths:
+        stages.extend(RuleSet.from_file(filepath).stages)
+    return RuleSet(stages)
+
+@lru_cache(maxsize=4)
+def _build_default_ruleset(year, leet_budget):
+    # Leetspeak substitutions by position, as apply_leetspeak does. The hashcat
+    # language has no equivalent, so the enumerator is plugged in as a stage.
+    leet_stage = [LeetEnumerator(leet_budget)]
+
+    # Case variations as in create_case_variations, with weights for ranking
+    case_stage = [Rule(':'), Rule('c', 0.2), Rule('l', 0.3), Rule('u', 1.0), Rule('E', 0.5)]
+
+    # Suffixes from append_years and append_special_chars. Years closer to now
+    # are more likely, and the shortest special suffixes are the most common.
+    suffix_stage = [Rule(':')]
+    years = get_common_years()
+    for position, suffix in enumerate(years):
+        # Future years are half as likely per year of distance as past ones
+        distance = year - int(years[position % (len(years) // 2)])
+        distance = distance if distance >= 0 else -2 * distance
+        weight = 0.5 + 0.05 * distance + (0.3 if len(suffix) == 2 else 0.0)
+        suffix_stage.append(Rule(_append_rule(suffix), weight))
+    for position, suffix in enumerate(YEAR_PATTERNS):
+        suffix_stage.append(Rule(_append_rule(suffix), 0.6 + 0.2 * position))
+    for suffix in SPECIAL_CHARS:
+        suffix_stage.append(Rule(_append_rule(suffix), 0.6 if suffix == '!' else 1.2))
+    for suffix in SPECIAL_CHAR_COMBINATIONS:
+        suffix_stage.append(Rule(_append_rule(suffix), 1.5))
+
+    return RuleSet([leet_stage, case_stage, suffix_stage])
+
+def _append_rule(suffix):
+    """Get the rule that appends a string, e.g. $1$2$3 for "123"."""
+    return ''.join(f"${char}" for char in suffix)
+
+def default_ruleset(leet_budget=2):
+    """
+    Get the built-in ruleset reproducing apply_leetspeak, create_case_variations,
+    append_years and append_special_chars as one fused plan.
+
+    Args:
+        leet_budget (int, optional): Maximum leetspeak substitutions per variation
+
+    Returns:
+        RuleSet: The built-in ruleset for the current year
+    """
+    return _build_default_ruleset(datetime.datetime.now().year, leet_budget)
@@ -0,0 +1,172 @@
+import re
+import datetime
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Date layouts people use in passwords, as field sequences. Year-first layouts
+# cover the reversed forms.
+DATE_FORMATS = (
+    ('dd', 'mm', 'yyyy'),
+    ('mm', 'dd', 'yyyy'),
+    ('dd', 'mm', 'yy'),
+    ('mm', 'dd', 'yy'),
+    ('yyyy', 'mm', 'dd'),
+    ('yy', 'mm', 'dd'),
+    ('dd', 'mm'),
+    ('mm', 'dd'),
+    ('d', 'm', 'yy'),
+    ('yyyy',),
+    ('yy',),
+)
+
+# Rows of a US QWERTY keyboard, left to right
+KEYBOARD_ROWS = ("1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm")
+
+# The most common keyboard walks, listed before the generated ones
+COMMON_KEYBOARD_WALKS = (
+    "qwerty", "123qwe", "1qaz2wsx", "qwertyuiop", "asdfgh", "zxcvbnm", "1q2w3e4r",
+    "qazwsx", "zaq12wsx", "asdfghjkl", "qweasd", "1q2w3e", "zxcvbn", "qwer", "asdf",
+)
+
+def _build_keyboard_walks(min_length=4):
+    """
+    Build the table of keyboard walks once: row runs in both directions,
+    column runs, pairs of neighbouring columns and alternations of the
+    number and top letter rows.
+    """
+    walks = list(COMMON_KEYBOARD_WALKS)
+
+    for row in KEYBOARD_ROWS:
+        for start in range(len(row)):
+            for end in range(start + min_length, len(row) + 1):
+                walks.append(row[start:end])
+                walks.append(row[start:end][::-1])
+
+    columns = []
+    for index in range(len(KEYBOARD_ROWS[0])):
+        columns.append(''.join(row[index] for row in KEYBOARD_ROWS if index < len(row)))
+    for first, second in zip(columns, columns[1:]):
+        if len(first) >= 3 and len(second) >= 3:
+            # 1qaz2wsx, zaq12wsx and qazwsx
+            walks.append(first + second)
+            walks.append(first[::-1] + second)
+            walks.append(first[1:] + second[1:])
+
+    # 1q2w3e4r and q1w2e3r4 style alternation of the top two rows
+    digits, letters = KEYBOARD_ROWS[0], KEYBOARD_ROWS[1]
+    for pairs in range(2, len(digits) + 1):
+        walks.append(''.join(d + l for d, l in zip(digits[:pairs], letters[:pairs])))
+        walks.append(''.join(l + d for d, l in zip(digits[:pairs], letters[:pairs])))
+
+    return tuple(walk for walk in dict.fromkeys(walks) if len(walk) >= min_length)
+
+# Built once at import and shared by every generator
+KEYBOARD_WALKS = _build_keyboard_walks()
+
+def keyboard_walks(limit=None):
+    """
+    Get keyboard walks, the most common ones first.
+
+    Args:
+        limit (int, optional): Maximum number of walks
+
+    Returns:
+        tuple: The walks
+    """
+    return KEYBOARD_WALKS if limit is None else KEYBOARD_WALKS[:limit]
+
+def _full_year(year):
+    """Expand a two-digit year to the most recent matching year that is not in the future."""
+    current = datetime.datetime.now().year
+    full = current - current % 100 + year
+    return full - 100 if full > current else full
+
+def _valid_date(day, month, year=None):
+    try:
+        datetime.date(year or 2000, month, day)
+        return True
+    except (ValueError, OverflowError):
+        return False
+
+def parse_dates(value):
+    """
+    Find the dates a free-form answer may describe.
+
+    Separated dates (15/03/1990, 1990-03-15, 3.15.90) and compact digits
+    (15031990, 031590, 1503, 1990) are read in every day/month order that
+    gives a valid date, so ambiguous input yields several dates.
+
+    Args:
+        value (str): The answer, e.g. "15031990" or "born 15.03.1990"
+
+    Returns:
+        list: (day, month, year) tuples; day and month or year may be None
+    """
+    dates = []
+    for text in re.findall(r'\d+(?:[./\-]\d+){0,2}', value):
+        groups = re.split(r'[./\-]', text)
+        # Day, month and year have at most 4 digits unless they are written together
+        if len(groups) > 1 and any(len(group) > 4 for group in groups):
+            continue
+        if len(groups) == 1:
+            digits = groups[0]
+            if len(digits) == 8:
+                layouts = [(digits[:2], digits[2:4], digits[4:]), (digits[2:4], digits[:2], digits[4:]),
+                           (digits[6:], digits[4:6], digits[:4])]
+            elif len(digits) == 6:
+                layouts = [(digits[:2], digits[2:4], digits[4:]), (digits[2:4], digits[:2], digits[4:]),
+                           (digits[4:], digits[2:4], digits[:2])]
+            elif len(digits) == 4 and 1900 <= int(digits) <= 2099:
+                layouts = [(None, None, digits)]
+            elif len(digits) == 4:
+                layouts = [(digits[:2], digits[2:], None), (digits[2:], digits[:2], None)]
+            else:
+                layouts = []
+        elif len(groups) == 3:
+            first, middle, last = groups
+            if len(first) == 4:
+                layouts = [(last, middle, first)]
+            else:
+                layouts = [(first, middle, last), (middle, first, last)]
+        else:
+            first, last = groups
+            layouts = [(first, last, None), (last, first, None)]
+
+        for day, month, year in layouts:
+            year = None if year is None else int(year)
+            if year is not None and year < 100:
+                year = _full_year(year)
+            if day is None:
+                date = (None, None, year)
+            elif _valid_date(int(day), int(month), year):
+                date = (int(day), int(month), year)
+            else:
+                continue
+            if date not in dates:
+                dates.append(date)
+    return dates
+
+def expand_date(value):
+    """
+    Render the dates found in an answer in every layout of DATE_FORMATS.
+
+    Args:
+        value (str): The answer, e.g. "15031990"
+
+    Returns:
+        list: Unique date strings such as 15031990, 03151990, 19900315, 1503 and 90
+    """
+    forms = {}
+    for day, month, year in parse_dates(value):
+        fields = {}
+        if year is not None:
+            fields['yyyy'] = f"{year:04d}"
+            fields['yy'] = f"{year % 100:02d}"
+        if day is not None:
+            fields.update(dd=f"{day:02d}", mm=f"{month:02d}", d=str(day), m=str(month))
+        for layout in DATE_FORMATS:
+            if all(field in fields for field in layout):
+                forms[''.join(fields[field] for field in layout)] = None
+    return list(forms)
@@ -0,0 +1,156 @@
+import os
+import sys
+import mmap
+import struct
+import logging
+import threading
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# A word file is a header, count + 1 offsets into the blob, and the UTF-8 blob of
+# all words concatenated; word i is blob[offsets[i]:offsets[i + 1]]
+_MAGIC = b'PWWL'
+_HEADER = struct.Struct('<4sII')  # magic, version, word count
+_OFFSET = struct.Struct('<I')
+_VERSION = 1
+
+def read_word_lines(path):
+    """
+    Read the words of a text wordlist, one per line.
+
+    Diceware lists such as the EFF long list ("11111\tabacus") are accepted;
+    only the last field of each line is kept. Blank lines and '#' comments are skipped.
+
+    Args:
+        path (str): Path of the text file
+
+    Returns:
+        list: The words in file order
+    """
+    words = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                words.append(line.split()[-1])
+    return words
+
+def build_word_file(words, path):
+    """
+    Write words to a compact word file, dropping duplicates.
+
+    Args:
+        words (iterable): The words; the first occurrence of each is kept
+        path (str): Path of the output file
+
+    Returns:
+        int: The number of unique words written
+    """
+    encoded = [word.encode('utf-8') for word in dict.fromkeys(words) if word]
+    if not encoded:
+        raise ValueError("A word file needs at least one word")
+
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(encoded)))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.write(b''.join(encoded))
+
+    logger.info(f"Wrote {len(encoded)} words to {path}")
+    return len(encoded)
+
+class WordFile:
+    """
+    Read-only sequence of the words of a word file.
+
+    Nothing is read until the first word is requested; the file is then
+    memory-mapped, so lookups are O(1) and processes using the same file share
+    its pages instead of each holding a copy of the list.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of a file written by build_word_file
+        """
+        self.path = path
+        self._data = None
+        self._count = None
+        self._blob_start = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"WordFile({self.path!r})"
+
+    def _open(self):
+        """Memory-map the file and check its header."""
+        with self._lock:
+            if self._data is not None:
+                return
+            with open(self.path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(data) < _HEADER.size:
+                data.close()
+                raise ValueError(f"{self.path} is not a word file")
+            magic, version, count = _HEADER.unpack_from(data, 0)
+            if magic != _MAGIC or version != _VERSION:
+                data.close()
+                raise ValueError(f"{self.path} is not a word file; build one with "
+                                 f"python -m utils.word_file <wordlist.txt> <output>")
+            self._blob_start = _HEADER.size + (count + 1) * _OFFSET.size
+            self._count = count
+            self._data = data
+            logger.info(f"Mapped {count} words from {self.path}")
+
+    def __len__(self):
+        if self._data is None:
+            self._open()
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        Get the word at an index.
+
+        Args:
+            index (int): Position of the word; negative indexes count from the end
+
+        Returns:
+            str: The word
+        """
+        if self._data is None:
+            self._open()
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Word index out of range")
+        start, end = struct.unpack_from('<II', self._data, _HEADER.size + index * _OFFSET.size)
+        return self._data[self._blob_start + start:self._blob_start + end].decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """Unmap the file; it is mapped again on the next lookup."""
+        with self._lock:
+            if self._data is not None:
+                self._data.close()
+                self._data = None
+
+def main(argv=None):
+    """Build a word file from a text wordlist: python -m utils.word_file <wordlist.txt> <output>"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Usage: python -m utils.word_file <wordlist.txt> <output>", file=sys.stderr)
+        return 2
+    source, target = argv
+    count = build_word_file(read_word_lines(source), target)
+    print(f"Wrote {count} words ({os.path.getsize(target)} bytes) to {target}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())